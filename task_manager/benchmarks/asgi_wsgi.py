@@ -0,0 +1,159 @@
+"""Requests/sec and latency of the task API under gunicorn (WSGI, DRF views) vs uvicorn (ASGI, async views).
+
+Each server runs against its own seeded SQLite file; the load is a mix of
+per-user list reads, detail reads and task creation at a fixed number of
+concurrent connections. Run from the project directory::
+
+    python -m benchmarks.asgi_wsgi --concurrency 200 --duration 15
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import aiohttp
+
+USERS = 200
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def seed(env: dict, tasks: int) -> None:
+    script = (
+        "from datetime import timedelta\n"
+        "from django.core.management import call_command\n"
+        "from django.utils import timezone\n"
+        "from tasks.models import Task\n"
+        "call_command('migrate', verbosity=0)\n"
+        "now = timezone.now()\n"
+        f"Task.objects.bulk_create([Task(title=f'Задача {{i}}', deadline=now + timedelta(hours=1 + i % 500),"
+        f" telegram_user_id=1 + i % {USERS}) for i in range({tasks})], batch_size=500)\n"
+    )
+    subprocess.run([sys.executable, 'manage.py', 'shell', '-c', script], env=env, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def server_command(mode: str, port: int, workers: int, threads: int) -> list:
+    if mode == 'wsgi':
+        return [sys.executable, '-m', 'gunicorn', 'task_manager.wsgi:application', '--bind', f'127.0.0.1:{port}',
+                '--workers', str(workers), '--worker-class', 'gthread', '--threads', str(threads),
+                '--log-level', 'warning']
+    return [sys.executable, '-m', 'uvicorn', 'task_manager.asgi:application', '--port', str(port),
+            '--workers', str(workers), '--log-level', 'warning', '--no-access-log']
+
+
+async def wait_ready(url: str, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as session:
+        while time.monotonic() < deadline:
+            try:
+                async with session.get(url) as response:
+                    if response.status == 200:
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f'Server did not start: {url}')
+
+
+async def load(base_url: str, concurrency: int, duration: float, write_ratio: float, max_id: int) -> dict:
+    latencies, errors = [], 0
+    stop_at = time.perf_counter() + duration
+    deadline = time.time() + 86400
+    connector = aiohttp.TCPConnector(limit=concurrency)
+
+    async def client(seed_value: int) -> None:
+        nonlocal errors
+        rng = random.Random(seed_value)
+        async with aiohttp.ClientSession(connector=connector, connector_owner=False) as session:
+            while time.perf_counter() < stop_at:
+                roll = rng.random()
+                started = time.perf_counter()
+                if roll < write_ratio:
+                    request = session.post(f'{base_url}/api/tasks/', json={
+                        'title': 'Новая', 'telegram_user_id': rng.randint(1, USERS),
+                        'deadline_input': time.strftime('%d.%m.%Y %H:%M', time.localtime(deadline)),
+                    })
+                elif roll < write_ratio + 0.2:
+                    request = session.get(f'{base_url}/api/tasks/{rng.randint(1, max_id)}/')
+                else:
+                    request = session.get(f'{base_url}/api/tasks/?telegram_user_id={rng.randint(1, USERS)}')
+                try:
+                    async with request as response:
+                        await response.read()
+                        if response.status >= 500:
+                            errors += 1
+                            continue
+                except aiohttp.ClientError:
+                    errors += 1
+                    continue
+                latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    await connector.close()
+
+    latencies.sort()
+
+    def percentile(fraction: float) -> float:
+        return round(latencies[min(len(latencies) - 1, int(len(latencies) * fraction))] * 1000, 1) if latencies else 0.0
+
+    return {
+        'requests_per_s': round(len(latencies) / elapsed, 1),
+        'p50_ms': percentile(0.50),
+        'p99_ms': percentile(0.99),
+        'errors': errors,
+    }
+
+
+def run_mode(mode: str, args) -> dict:
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(os.environ, SQLITE_PATH=os.path.join(directory, 'db.sqlite3'),
+                   DJANGO_SETTINGS_MODULE='task_manager.settings')
+        env['ASYNC_API_VIEWS'] = '1' if mode == 'asgi' else '0'
+        seed(env, args.tasks)
+        port = free_port()
+        server = subprocess.Popen(server_command(mode, port, args.workers, args.threads), env=env,
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            base_url = f'http://127.0.0.1:{port}'
+            asyncio.run(wait_ready(f'{base_url}/api/tasks/?telegram_user_id=1'))
+            return asyncio.run(load(base_url, args.concurrency, args.duration, args.write_ratio, args.tasks))
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--concurrency', type=int, default=200)
+    parser.add_argument('--duration', type=float, default=15, help='Seconds per server')
+    parser.add_argument('--workers', type=int, default=2, help='Server processes (both modes)')
+    parser.add_argument('--threads', type=int, default=8, help='Threads per gunicorn worker')
+    parser.add_argument('--tasks', type=int, default=20000, help='Rows seeded before the run')
+    parser.add_argument('--write-ratio', type=float, default=0.1, help='Share of POST /api/tasks/')
+    parser.add_argument('--mode', choices=('wsgi', 'asgi'), action='append', help='Defaults to both')
+    args = parser.parse_args()
+
+    print(json.dumps({
+        'benchmark': 'asgi_wsgi',
+        'concurrency': args.concurrency,
+        'workers': args.workers,
+        'duration_s': args.duration,
+        'modes': {mode: run_mode(mode, args) for mode in args.mode or ('wsgi', 'asgi')},
+    }))
+
+
+if __name__ == '__main__':
+    main()
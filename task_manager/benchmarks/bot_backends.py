@@ -0,0 +1,120 @@
+"""Per-command latency of the bot's task backends: HTTP to the API vs. the ORM in-process.
+
+Both backends work on the same seeded SQLite file; the HTTP one talks to a
+gunicorn-served API, the direct one calls the ORM and tasks/services from the
+benchmark process. Commands run one after another, so the numbers are latency,
+not throughput. Run from the project directory::
+
+    python -m benchmarks.bot_backends --commands 500
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import timedelta
+
+import django
+
+from benchmarks.asgi_wsgi import free_port, wait_ready
+
+USERS = 200
+
+
+def seed(tasks: int) -> None:
+    from django.core.management import call_command
+    from django.utils import timezone
+    from tasks.models import Task
+
+    call_command('migrate', verbosity=0)
+    now = timezone.now()
+    Task.objects.bulk_create([Task(title=f'Задача {i}', description='Описание задачи',
+                                   deadline=now + timedelta(hours=1 + i % 500), telegram_user_id=1 + i % USERS)
+                              for i in range(tasks)], batch_size=500)
+
+
+def percentile(values: list, fraction: float) -> float:
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(len(values) * fraction))] * 1000, 2) if values else 0.0
+
+
+async def measure(backend, commands: int, max_id: int, count_queries: bool) -> dict:
+    from asgiref.sync import sync_to_async
+    from django.db import connection
+
+    queries = {'mytasks': 0, 'done': 0}
+    command = 'mytasks'
+
+    def count(execute, sql, params, many, context):
+        queries[command] += 1
+        return execute(sql, params, many, context)
+
+    rng = random.Random(0)
+    timings = {'mytasks': [], 'done': []}
+    await backend.start()
+    if count_queries:
+        # Соединение принадлежит sync-потоку, в котором DirectTaskBackend выполняет запросы
+        await sync_to_async(lambda: connection.execute_wrappers.append(count))()
+    for _ in range(commands):
+        command = 'mytasks'
+        started = time.perf_counter()
+        assert await backend.get_user_tasks_page(rng.randint(1, USERS)) is not None
+        timings['mytasks'].append(time.perf_counter() - started)
+
+        command = 'done'
+        started = time.perf_counter()
+        assert await backend.update_tasks_status([rng.randint(1, max_id)]) is not None
+        timings['done'].append(time.perf_counter() - started)
+    if count_queries:
+        await sync_to_async(lambda: connection.execute_wrappers.remove(count))()
+    await backend.close()
+
+    result = {name: {'p50_ms': percentile(values, 0.5), 'p99_ms': percentile(values, 0.99)}
+              for name, values in timings.items()}
+    if count_queries:
+        for name, total in queries.items():
+            result[name]['queries'] = round(total / commands, 2)
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--commands', type=int, default=500, help='/mytasks and /done commands per backend')
+    parser.add_argument('--tasks', type=int, default=10000, help='Rows seeded before the run')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ['SQLITE_PATH'] = os.path.join(directory, 'db.sqlite3')
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'task_manager.settings')
+        django.setup()
+        seed(args.tasks)
+
+        from telegram_bot.backends import DirectTaskBackend, HttpTaskBackend
+
+        port = free_port()
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', 'task_manager.wsgi:application', '--bind', f'127.0.0.1:{port}',
+             '--workers', '1', '--worker-class', 'gthread', '--threads', '4', '--log-level', 'warning'],
+            env=dict(os.environ), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            base_url = f'http://127.0.0.1:{port}/api'
+            asyncio.run(wait_ready(f'{base_url}/tasks/?telegram_user_id=1'))
+            results = {
+                'http': asyncio.run(measure(HttpTaskBackend(base_url), args.commands, args.tasks, False)),
+                'direct': asyncio.run(measure(DirectTaskBackend(), args.commands, args.tasks, True)),
+            }
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+    print(json.dumps({'benchmark': 'bot_backends', 'commands': args.commands, 'tasks': args.tasks,
+                      'backends': results}))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""Update throughput of the bot with many concurrent users and a slow task API.
+
+Run from the project directory::
+
+    python -m benchmarks.bot_http --users 500 --api-delay 0.2
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.types import Update
+
+from benchmarks.fake_servers import make_bot_api, make_command_update, make_task_api, serve_in_thread
+from telegram_bot.core import TelegramBot
+
+BOT_TOKEN = '123456:BENCHMARK'
+
+
+async def run(users: int, api_delay: float, tasks_per_user: int) -> dict:
+    bot_api_stats = {}
+    api_port, stop_api = serve_in_thread(make_task_api(api_delay, tasks_per_user))
+    bot_api_port, stop_bot_api = serve_in_thread(make_bot_api(bot_api_stats))
+
+    telegram_bot = TelegramBot(token=BOT_TOKEN, api_url=f'http://127.0.0.1:{api_port}/api/')
+    telegram_bot.bot = Bot(
+        token=BOT_TOKEN,
+        session=AiohttpSession(api=TelegramAPIServer.from_base(f'http://127.0.0.1:{bot_api_port}')),
+    )
+    updates = [
+        Update.model_validate(make_command_update(i, 1000 + i, '/mytasks'), context={'bot': telegram_bot.bot})
+        for i in range(users)
+    ]
+
+    await telegram_bot.dp.emit_startup(bot=telegram_bot.bot)
+    started = time.perf_counter()
+    await asyncio.gather(*(telegram_bot.dp.feed_update(telegram_bot.bot, update) for update in updates))
+    elapsed = time.perf_counter() - started
+    await telegram_bot.dp.emit_shutdown(bot=telegram_bot.bot)
+
+    await telegram_bot.bot.session.close()
+    stop_api()
+    stop_bot_api()
+
+    return {
+        'benchmark': 'bot_http',
+        'users': users,
+        'api_delay_s': api_delay,
+        'elapsed_s': round(elapsed, 3),
+        'updates_per_s': round(users / elapsed, 1),
+        'messages_sent': bot_api_stats.get('sendMessage', 0),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument('--api-delay', type=float, default=0.2, help='Task API response delay, seconds')
+    parser.add_argument('--tasks-per-user', type=int, default=5)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.users, args.api_delay, args.tasks_per_user))))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+"""Load test of the bot's outbound queue against a flood-controlled Bot API stand-in.
+
+The stand-in answers 429 with retry_after like Telegram once its global or
+per-chat limit is exceeded. Interactive replies arrive at --rate per second
+for --seconds while a --bulk backlog is sent under ``bulk()`` and --edits
+messages are edited five times in a row each. The same load runs once
+through the Outbox and once with plain Bot calls. Run from the project
+directory::
+
+    python -m benchmarks.bot_outbox --rate 27 --seconds 20 --bulk 300
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.exceptions import TelegramAPIError
+
+from benchmarks.fake_servers import FloodControl, make_bot_api, serve_in_thread
+from telegram_bot.outbox import Outbox, bulk
+
+BOT_TOKEN = '123456:BENCHMARK'
+EDITS_PER_MESSAGE = 5
+
+
+def percentile(values: list, fraction: float) -> float:
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(len(values) * fraction))] * 1000, 1) if values else 0.0
+
+
+async def run(args, use_outbox: bool) -> dict:
+    stats = {}
+    flood = FloodControl(args.global_rate, args.per_chat_rate, args.per_chat_burst)
+    port, stop_api = serve_in_thread(make_bot_api(stats, flood))
+    bot = Bot(token=BOT_TOKEN, session=AiohttpSession(api=TelegramAPIServer.from_base(f'http://127.0.0.1:{port}')))
+    outbox = Outbox(global_rate=args.send_rate, per_chat_rate=args.per_chat_rate,
+                    per_chat_burst=args.per_chat_burst)
+    if use_outbox:
+        bot.session.middleware(outbox)
+        await outbox.start()
+
+    latencies = {'interactive': [], 'bulk': [], 'edit': []}
+    dropped = {name: 0 for name in latencies}
+
+    async def call(kind: str, coroutine) -> None:
+        started = time.perf_counter()
+        try:
+            await coroutine
+        except TelegramAPIError:
+            dropped[kind] += 1
+            return
+        latencies[kind].append(time.perf_counter() - started)
+
+    async def send_bulk() -> None:
+        with bulk():
+            await asyncio.gather(*(call('bulk', bot.send_message(100_000 + i % args.chats, f'Рассылка {i}'))
+                                   for i in range(args.bulk)))
+
+    async def edit_burst(i: int) -> None:
+        # Пять правок одного сообщения подряд, как при быстром листании страниц
+        chat_id = 200_000 + i
+        await asyncio.gather(*(call('edit', bot.edit_message_text(f'Страница {n}', chat_id=chat_id, message_id=1))
+                               for n in range(EDITS_PER_MESSAGE)))
+
+    started = time.perf_counter()
+    background = [asyncio.create_task(send_bulk())] + [asyncio.create_task(edit_burst(i)) for i in range(args.edits)]
+    interactive = []
+    for i in range(int(args.rate * args.seconds)):
+        # Равномерный поток ответов на команды: по одному каждые 1/rate секунды
+        await asyncio.sleep(max(0.0, started + i / args.rate - time.perf_counter()))
+        interactive.append(asyncio.create_task(call('interactive', bot.send_message(i % args.chats, f'Ответ {i}'))))
+    await asyncio.gather(*interactive, *background)
+    elapsed = time.perf_counter() - started
+
+    if use_outbox:
+        await outbox.close()
+    await bot.session.close()
+    stop_api()
+
+    return {
+        'elapsed_s': round(elapsed, 2),
+        'delivered_per_s': round(sum(len(values) for values in latencies.values()) / elapsed, 1),
+        'dropped': dropped,
+        'rate_limited_by_api': stats.get('rate_limited', 0),
+        'edit_requests': stats.get('editMessageText', 0),
+        'latency_ms': {kind: {'p50': percentile(values, 0.5), 'p99': percentile(values, 0.99)}
+                       for kind, values in latencies.items()},
+        **({'outbox': outbox.stats} if use_outbox else {}),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rate', type=float, default=27, help='Interactive replies per second')
+    parser.add_argument('--seconds', type=float, default=20, help='Duration of the interactive stream')
+    parser.add_argument('--bulk', type=int, default=300, help='Bulk messages queued at the start')
+    parser.add_argument('--edits', type=int, default=50, help='Messages edited five times in a row')
+    parser.add_argument('--chats', type=int, default=500, help='Distinct chats of interactive and bulk messages')
+    parser.add_argument('--global-rate', type=float, default=30, help='Bot API limit, calls per second')
+    parser.add_argument('--send-rate', type=float, default=27,
+                        help='Outbox global rate; a little under the API limit absorbs network jitter')
+    parser.add_argument('--per-chat-rate', type=float, default=1, help='Bot API limit per chat, calls per second')
+    parser.add_argument('--per-chat-burst', type=float, default=3)
+    args = parser.parse_args()
+
+    print(json.dumps({
+        'benchmark': 'bot_outbox',
+        'rate': args.rate,
+        'seconds': args.seconds,
+        'bulk': args.bulk,
+        'edits': args.edits,
+        'global_rate': args.global_rate,
+        'send_rate': args.send_rate,
+        'outbox': asyncio.run(run(args, True)),
+        'direct': asyncio.run(run(args, False)),
+    }))
+
+
+if __name__ == '__main__':
+    main()
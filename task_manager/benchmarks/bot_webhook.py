@@ -0,0 +1,131 @@
+"""Updates per second handled by one webhook replica of the bot.
+
+The replica (TelegramBot.make_webhook_app) runs on its own thread and event
+loop against local stand-ins for the task API and the Bot API; Update payloads
+are POSTed to it over HTTP the way Telegram delivers them. Recorded updates can
+be replayed with --updates (one JSON Update per line). Run from the project
+directory::
+
+    python -m benchmarks.bot_webhook --users 2000 --connections 40 --max-concurrency 100
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import aiohttp
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+
+from benchmarks.fake_servers import make_bot_api, make_command_update, make_task_api, serve_in_thread
+from telegram_bot.core import TelegramBot
+from telegram_bot.outbox import Outbox
+
+BOT_TOKEN = '123456:BENCHMARK'
+WEBHOOK_PATH = '/telegram/webhook'
+SECRET = 'benchmark-secret'
+UNLIMITED = 1e9
+
+
+def load_updates(path: str, users: int) -> list:
+    if path:
+        with open(path, encoding='utf-8') as f:
+            return [json.loads(line) for line in f if line.strip()]
+    return [make_command_update(i, 1000 + i, '/mytasks') for i in range(users)]
+
+
+async def post_updates(url: str, updates: list, connections: int) -> tuple:
+    """Как Telegram: не больше connections одновременных запросов к webhook."""
+    latencies, errors = [], 0
+    queue = iter(updates)
+    connector = aiohttp.TCPConnector(limit=connections)
+
+    async def sender(session: aiohttp.ClientSession) -> None:
+        nonlocal errors
+        for update in queue:
+            started = time.perf_counter()
+            try:
+                async with session.post(url, json=update,
+                                        headers={'X-Telegram-Bot-Api-Secret-Token': SECRET}) as response:
+                    await response.read()
+                    response.raise_for_status()
+            except aiohttp.ClientError:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+
+    async with aiohttp.ClientSession(connector=connector) as session:
+        await asyncio.gather(*(sender(session) for _ in range(connections)))
+    return latencies, errors
+
+
+async def run(args) -> dict:
+    updates = load_updates(args.updates, args.users)
+    bot_api_stats = {}
+    api_port, stop_api = serve_in_thread(make_task_api(args.api_delay, args.tasks_per_user))
+    bot_api_port, stop_bot_api = serve_in_thread(make_bot_api(bot_api_stats))
+
+    # Лимиты Telegram здесь не моделируются: меряется обработка, а не темп отправки (см. bot_outbox)
+    telegram_bot = TelegramBot(token=BOT_TOKEN, api_url=f'http://127.0.0.1:{api_port}/api/',
+                               outbox=Outbox(global_rate=UNLIMITED))
+    telegram_bot.bot = Bot(
+        token=BOT_TOKEN,
+        session=AiohttpSession(api=TelegramAPIServer.from_base(f'http://127.0.0.1:{bot_api_port}')),
+    )
+    handled_updates = 0
+
+    async def count_handled(handler, event, data):
+        nonlocal handled_updates
+        try:
+            return await handler(event, data)
+        finally:
+            handled_updates += 1
+
+    telegram_bot.dp.update.outer_middleware(count_handled)
+    replica_port, stop_replica = serve_in_thread(
+        telegram_bot.make_webhook_app(WEBHOOK_PATH, secret_token=SECRET, max_concurrency=args.max_concurrency)
+    )
+
+    started = time.perf_counter()
+    latencies, errors = await post_updates(f'http://127.0.0.1:{replica_port}{WEBHOOK_PATH}', updates, args.connections)
+    acked = time.perf_counter() - started
+    # Ответ webhook — только подтверждение; обработка идёт в фоне реплики
+    while handled_updates < len(latencies) and time.perf_counter() - started < args.timeout:
+        await asyncio.sleep(0.01)
+    handled = time.perf_counter() - started
+
+    stop_replica()
+    stop_api()
+    stop_bot_api()
+
+    latencies.sort()
+    return {
+        'benchmark': 'bot_webhook',
+        'updates': len(updates),
+        'connections': args.connections,
+        'max_concurrency': args.max_concurrency,
+        'api_delay_s': args.api_delay,
+        'acked_per_s': round(len(latencies) / acked, 1),
+        'ack_p99_ms': round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 1) if latencies else 0.0,
+        'handled_per_s': round(handled_updates / handled, 1),
+        'messages_sent': bot_api_stats.get('sendMessage', 0),
+        'errors': errors,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=2000, help='Synthetic /mytasks updates (without --updates)')
+    parser.add_argument('--updates', help='File with recorded Update payloads, one JSON object per line')
+    parser.add_argument('--connections', type=int, default=40, help='Concurrent webhook requests (setWebhook max_connections)')
+    parser.add_argument('--max-concurrency', type=int, default=100, help='Updates handled at once by the replica')
+    parser.add_argument('--api-delay', type=float, default=0.05, help='Task API response delay, seconds')
+    parser.add_argument('--tasks-per-user', type=int, default=5)
+    parser.add_argument('--timeout', type=float, default=120)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args))))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""Updates per second handled by the chat-sharded bot with 1..N worker processes.
+
+Each run starts a ShardedRunner (telegram_bot/sharding.py) whose workers talk
+to local stand-ins for the task API and the Bot API, waits until every worker
+is up and then routes synthetic /mytasks updates from --users chats to them by
+chat id, as the polling process does. Timing stops when all workers have
+handled everything they were given. Run from the project directory::
+
+    python -m benchmarks.bot_workers --updates 5000 --workers 1 2 4
+"""
+import argparse
+import asyncio
+import functools
+import json
+import multiprocessing
+import os
+import time
+
+from aiogram.types import Update
+
+from benchmarks.fake_servers import make_bot_api, make_command_update, make_task_api, serve_in_thread
+from telegram_bot.sharding import ShardedRunner
+
+BOT_TOKEN = '123456:BENCHMARK'
+# Лимиты Telegram здесь не моделируются: меряется обработка, а не темп отправки (см. bot_outbox)
+UNLIMITED = 1e9
+
+
+def make_worker_bot(api_port: int, bot_api_port: int, ready: multiprocessing.Queue):
+    """Фабрика бота для процесса-воркера: сообщает о готовности, когда импорты и сборка закончены."""
+    from aiogram import Bot
+    from aiogram.client.session.aiohttp import AiohttpSession
+    from aiogram.client.telegram import TelegramAPIServer
+
+    from telegram_bot.core import TelegramBot
+    from telegram_bot.outbox import Outbox
+
+    telegram_bot = TelegramBot(token=BOT_TOKEN, api_url=f'http://127.0.0.1:{api_port}/api/',
+                               outbox=Outbox(global_rate=UNLIMITED))
+    telegram_bot.bot = Bot(
+        token=BOT_TOKEN,
+        session=AiohttpSession(api=TelegramAPIServer.from_base(f'http://127.0.0.1:{bot_api_port}')),
+    )
+    ready.put(os.getpid())
+    return telegram_bot
+
+
+def run(args, workers: int, updates: list) -> dict:
+    context = multiprocessing.get_context('spawn')
+    bot_api_stats = {}
+    api_port, stop_api = serve_in_thread(make_task_api(args.api_delay, args.tasks_per_user))
+    bot_api_port, stop_bot_api = serve_in_thread(make_bot_api(bot_api_stats))
+    ready, results = context.Queue(), context.Queue()
+
+    runner = ShardedRunner(functools.partial(make_worker_bot, api_port, bot_api_port, ready), workers,
+                           max_concurrency=args.max_concurrency, results=results, context=context)
+    runner.start()
+    for _ in range(workers):
+        ready.get(timeout=60)
+
+    async def dispatch_all() -> None:
+        for update in updates:
+            await runner.dispatch(update)
+
+    started = time.perf_counter()
+    asyncio.run(dispatch_all())
+    # stop() ждёт, пока воркеры доделают всё, что им отдали
+    runner.stop(timeout=args.timeout)
+    elapsed = time.perf_counter() - started
+    per_worker = dict(results.get(timeout=10) for _ in range(workers))
+
+    stop_api()
+    stop_bot_api()
+    handled = sum(per_worker.values())
+    return {
+        'handled': handled,
+        'per_worker': [per_worker[index] for index in sorted(per_worker)],
+        'handled_per_s': round(handled / elapsed, 1),
+        'messages_sent': bot_api_stats.get('sendMessage', 0),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--updates', type=int, default=5000, help='Synthetic /mytasks updates per run')
+    parser.add_argument('--users', type=int, default=2000, help='Distinct chats the updates come from')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--max-concurrency', type=int, default=100, help='Updates handled at once by one worker')
+    parser.add_argument('--api-delay', type=float, default=0.005, help='Task API response delay, seconds')
+    parser.add_argument('--tasks-per-user', type=int, default=5)
+    parser.add_argument('--timeout', type=float, default=300)
+    args = parser.parse_args()
+
+    updates = [Update.model_validate(make_command_update(i, 1000 + i % args.users, '/mytasks'))
+               for i in range(args.updates)]
+    results = {workers: run(args, workers, updates) for workers in args.workers}
+    baseline = results[args.workers[0]]['handled_per_s']
+    for result in results.values():
+        result['speedup'] = round(result['handled_per_s'] / baseline, 2) if baseline else 0.0
+
+    print(json.dumps({
+        'benchmark': 'bot_workers',
+        'updates': args.updates,
+        'users': args.users,
+        'api_delay_s': args.api_delay,
+        'cpus': os.cpu_count(),
+        'workers': results,
+    }))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""Seeded synthetic Task data: skewed per-user counts and deadlines spread around now.
+
+The same --seed, --rows and --users always produce the same rows (deadlines are
+offsets from the moment of generation). Used by benchmarks.suite; standalone it
+fills the database configured by SQLITE_PATH::
+
+    SQLITE_PATH=/tmp/bench.sqlite3 python -m benchmarks.datagen --rows 1000000
+"""
+import argparse
+import bisect
+import itertools
+import json
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Iterator, Optional
+
+# Telegram ID первого синтетического пользователя
+USER_ID_BASE = 100_000_000
+# Показатель Zipf: у самого активного пользователя задач на порядки больше, чем у медианного
+USER_SKEW = 1.1
+PAST_SHARE = 0.45
+PAST_MEAN = timedelta(days=10)
+FUTURE_MEAN = timedelta(days=3)
+DONE_SHARE_PAST = 0.8
+DONE_SHARE_FUTURE = 0.1
+DESCRIPTION_SHARE = 0.3
+# Доля задач с несколькими напоминаниями; остальные — с одним за 10 минут
+MULTI_REMINDER_SHARE = 0.3
+MULTI_REMINDER_OFFSETS = [1440, 60, 10]
+
+WORDS = ('купить', 'позвонить', 'отчёт', 'встреча', 'проект', 'оплатить', 'счёт', 'написать',
+         'письмо', 'клиент', 'ремонт', 'врач', 'билеты', 'презентация', 'договор', 'квартальный',
+         'собрание', 'код', 'ревью', 'релиз', 'документы', 'подготовить', 'проверить', 'отправить')
+
+
+def user_ids(users: int, rng: random.Random) -> list:
+    """Telegram ID пользователей в порядке убывания активности (ранг Zipf → ID перемешаны)."""
+    ids = list(range(USER_ID_BASE, USER_ID_BASE + users))
+    rng.shuffle(ids)
+    return ids
+
+
+def generate_tasks(rows: int, users: int, seed: int, now: datetime) -> Iterator:
+    """Несохранённые Task: распределение по пользователям — Zipf, дедлайны — экспоненциально от now."""
+    from tasks.models import Task
+    from tasks.services.task_notifications import schedule_next_notification
+
+    rng = random.Random(seed)
+    # Отдельный генератор: остальные поля при том же seed совпадают с данными без напоминаний
+    reminders_rng = random.Random(seed + 1)
+    ranked = user_ids(users, rng)
+    cumulative = list(itertools.accumulate(1 / rank ** USER_SKEW for rank in range(1, users + 1)))
+    total = cumulative[-1]
+    now = now.replace(second=0, microsecond=0)
+
+    for _ in range(rows):
+        user = ranked[min(bisect.bisect_left(cumulative, rng.random() * total), users - 1)]
+        past = rng.random() < PAST_SHARE
+        offset = rng.expovariate(1 / (PAST_MEAN if past else FUTURE_MEAN).total_seconds())
+        # Дедлайн с точностью до минуты, как его вводят в боте, — много совпадающих дедлайнов
+        deadline = now + timedelta(minutes=round((-offset if past else offset) / 60))
+        done = rng.random() < (DONE_SHARE_PAST if past else DONE_SHARE_FUTURE)
+        description = ' '.join(rng.choices(WORDS, k=rng.randint(5, 40))) if rng.random() < DESCRIPTION_SHARE else ''
+        task = Task(
+            title=' '.join(rng.choices(WORDS, k=rng.randint(1, 5))).capitalize(),
+            description=description,
+            deadline=deadline,
+            telegram_user_id=user,
+            status=Task.Status.DONE if done else Task.Status.UNDONE,
+            notification_sent=past,
+            reminder_offsets=MULTI_REMINDER_OFFSETS if reminders_rng.random() < MULTI_REMINDER_SHARE else [10],
+        )
+        schedule_next_notification(task, now)
+        yield task
+
+
+def populate(rows: int, users: int, seed: int, now: Optional[datetime] = None, batch_size: int = 5000) -> int:
+    """Записывает rows задач пачками по batch_size; в памяти только одна пачка."""
+    from django.db import transaction
+    from django.utils import timezone
+    from tasks.models import Task
+
+    tasks = generate_tasks(rows, users, seed, now or timezone.now())
+    written = 0
+    while batch := list(itertools.islice(tasks, batch_size)):
+        with transaction.atomic():
+            Task.objects.bulk_create(batch)
+        written += len(batch)
+    return written
+
+
+def main() -> None:
+    import os
+
+    import django
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--users', type=int, default=20_000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'task_manager.settings')
+    django.setup()
+    from django.core.management import call_command
+
+    call_command('migrate', verbosity=0)
+    started = time.perf_counter()
+    written = populate(args.rows, args.users, args.seed)
+    print(json.dumps({'benchmark': 'datagen', 'rows': written, 'users': args.users, 'seed': args.seed,
+                      'seconds': round(time.perf_counter() - started, 1)}))
+
+
+if __name__ == '__main__':
+    main()
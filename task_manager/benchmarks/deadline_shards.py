@@ -0,0 +1,97 @@
+"""Wall time of the check_deadlines reconcile scan split into N shards on N worker processes.
+
+Each shard count runs against its own copy of one seeded SQLite file with
+--due reminders falling due; every worker process runs check_deadlines_shard
+for its shard, as a Celery worker would for one chord header task. Broker
+publishing is stubbed out. Run from the project directory::
+
+    python -m benchmarks.deadline_shards --due 20000 --shards 1 2 4
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from datetime import timedelta
+
+import django
+
+USERS = 5000
+
+
+def setup_django(path: str) -> None:
+    os.environ['SQLITE_PATH'] = path
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'task_manager.settings')
+    django.setup()
+
+
+def prepare(path: str, due: int, background: int) -> None:
+    setup_django(path)
+    from django.core.management import call_command
+    from django.utils import timezone
+    from tasks.models import Task
+
+    call_command('migrate', verbosity=0)
+    now = timezone.now()
+    Task.objects.bulk_create(
+        [Task(title=f'Задача {i}', deadline=now + timedelta(minutes=5), telegram_user_id=i % USERS)
+         for i in range(due)]
+        + [Task(title=f'Задача {i}', deadline=now + timedelta(hours=1 + i % 500), telegram_user_id=i % USERS)
+           for i in range(background)],
+        batch_size=500,
+    )
+
+
+def scan(path: str, shard: int, shards: int, start_at: float) -> dict:
+    setup_django(path)
+    from unittest import mock
+
+    from tasks import tasks as celery_tasks
+
+    # Все воркеры стартуют одновременно, без учёта времени запуска процесса
+    time.sleep(max(0.0, start_at - time.time()))
+    started = time.time()
+    with mock.patch.object(celery_tasks.send_telegram_notifications, 'delay'):
+        claimed = celery_tasks.check_deadlines_shard(shard, shards)
+    return {'claimed': claimed, 'started': started, 'finished': time.time()}
+
+
+def run(context, template: str, shards: int) -> dict:
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'db.sqlite3')
+        shutil.copy(template, path)
+        with context.Pool(shards) as pool:
+            start_at = time.time() + 2
+            results = pool.starmap(scan, [(path, shard, shards, start_at) for shard in range(shards)])
+    return {
+        'claimed': sum(result['claimed'] for result in results),
+        'wall_s': round(max(r['finished'] for r in results) - min(r['started'] for r in results), 3),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--due', type=int, default=20000, help='Reminders due at scan time')
+    parser.add_argument('--background', type=int, default=100000, help='Tasks not due yet')
+    parser.add_argument('--shards', type=int, nargs='+', default=[1, 2, 4])
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context('spawn')
+    with tempfile.TemporaryDirectory() as directory:
+        template = os.path.join(directory, 'template.sqlite3')
+        with context.Pool(1) as pool:
+            pool.apply(prepare, (template, args.due, args.background))
+        results = {shards: run(context, template, shards) for shards in args.shards}
+
+    print(json.dumps({
+        'benchmark': 'deadline_shards',
+        'due': args.due,
+        'cpus': os.cpu_count(),
+        'shards': results,
+    }))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+"""Local stand-ins for the task API and the Telegram Bot API used by the bot benchmarks."""
+import asyncio
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from aiohttp import web
+
+
+def make_tasks(count: int) -> List[Dict]:
+    return [
+        {
+            'id': i,
+            'title': f'Задача {i}',
+            'description': 'Описание задачи',
+            'deadline_local': '31.12.2030 23:59',
+            'status': 'undone',
+            'notification_sent': False,
+            'reminder_offsets': [10],
+            'created_at': '2025-05-20T21:17:00+03:00',
+        }
+        for i in range(1, count + 1)
+    ]
+
+
+def make_task_api(delay: float, tasks_per_user: int) -> web.Application:
+    """Task API that answers after a fixed delay, like a slow backend."""
+    tasks = make_tasks(tasks_per_user)
+
+    async def list_tasks(request: web.Request) -> web.Response:
+        await asyncio.sleep(delay)
+        return web.json_response({'next': None, 'previous': None, 'results': tasks})
+
+    async def update_tasks_status(request: web.Request) -> web.Response:
+        await asyncio.sleep(delay)
+        data = await request.json()
+        return web.json_response({'changed': data['ids'], 'unchanged': [], 'missing': []})
+
+    app = web.Application()
+    app.router.add_get('/api/tasks/', list_tasks)
+    app.router.add_patch('/api/tasks/status/', update_tasks_status)
+    return app
+
+
+class FloodControl:
+    """Telegram-like flood control of the Bot API stand-in: global and per-chat token buckets."""
+
+    def __init__(self, global_rate: float, per_chat_rate: float, per_chat_burst: float) -> None:
+        self.limits = {'global': (global_rate, global_rate)}
+        self.per_chat = (per_chat_rate, per_chat_burst)
+        self.buckets: Dict[str, List[float]] = {}
+
+    def _available(self, key: str, rate: float, capacity: float, now: float) -> float:
+        tokens, updated = self.buckets.get(key, (capacity, now))
+        return min(capacity, tokens + (now - updated) * rate)
+
+    def retry_after(self, chat_id: str) -> int:
+        """0 if the call is allowed (and counted), else seconds to wait, rounded up like Telegram does."""
+        now = time.monotonic()
+        limits = dict(self.limits, **{f'chat:{chat_id}': self.per_chat})
+        available = {key: self._available(key, rate, capacity, now) for key, (rate, capacity) in limits.items()}
+        wait = max(((1 - tokens) / limits[key][0] for key, tokens in available.items() if tokens < 1), default=0)
+        if wait:
+            return max(1, int(wait + 0.999))
+        for key, tokens in available.items():
+            self.buckets[key] = [tokens - 1, now]
+        return 0
+
+
+def make_bot_api(stats: Dict[str, int], flood: Optional[FloodControl] = None) -> web.Application:
+    """Bot API that accepts every method and counts calls in ``stats``.
+
+    With ``flood`` set, calls over its limits get 429 with ``retry_after`` (counted as 'rate_limited').
+    """
+
+    async def handle(request: web.Request) -> web.Response:
+        method = request.match_info['method']
+        stats[method] = stats.get(method, 0) + 1
+        data = await request.post()
+        if flood is not None and 'chat_id' in data:
+            retry_after = flood.retry_after(data['chat_id'])
+            if retry_after:
+                stats['rate_limited'] = stats.get('rate_limited', 0) + 1
+                return web.json_response({
+                    'ok': False, 'error_code': 429, 'description': f'Too Many Requests: retry after {retry_after}',
+                    'parameters': {'retry_after': retry_after},
+                }, status=429)
+        if method in ('sendMessage', 'editMessageText'):
+            return web.json_response({'ok': True, 'result': {
+                'message_id': int(data.get('message_id') or stats[method]),
+                'date': int(time.time()),
+                'chat': {'id': int(data.get('chat_id', 0)), 'type': 'private'},
+                'text': data.get('text', ''),
+            }})
+        return web.json_response({'ok': True, 'result': True})
+
+    app = web.Application()
+    app.router.add_post('/bot{token}/{method}', handle)
+    return app
+
+
+def serve_in_thread(app: web.Application) -> Tuple[int, Callable[[], None]]:
+    """Serve ``app`` on localhost from its own thread and event loop.
+
+    A separate loop keeps the stand-in responsive even when the code under test
+    blocks its own loop. Returns the bound port and a function that stops the server.
+    """
+    loop = asyncio.new_event_loop()
+    started = threading.Event()
+    runner = web.AppRunner(app, access_log=None)
+
+    def serve() -> None:
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(runner.setup())
+        loop.run_until_complete(web.TCPSite(runner, '127.0.0.1', 0).start())
+        started.set()
+        loop.run_forever()
+
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+    started.wait()
+
+    def stop() -> None:
+        asyncio.run_coroutine_threadsafe(runner.cleanup(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+
+    return runner.addresses[0][1], stop
+
+
+def make_command_update(update_id: int, user_id: int, text: str) -> Dict:
+    command = text.split()[0]
+    return {
+        'update_id': update_id,
+        'message': {
+            'message_id': update_id,
+            'date': int(time.time()),
+            'chat': {'id': user_id, 'type': 'private'},
+            'from': {'id': user_id, 'is_bot': False, 'first_name': f'User {user_id}'},
+            'text': text,
+            'entities': [{'type': 'bot_command', 'offset': 0, 'length': len(command)}],
+        },
+    }
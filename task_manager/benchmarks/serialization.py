@@ -0,0 +1,66 @@
+"""Serialization time of the task list: ModelSerializer path vs. the values_list fast path.
+
+Run from the project directory::
+
+    python -m benchmarks.serialization --tasks 10000
+"""
+import argparse
+import json
+import os
+import time
+from datetime import timedelta
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'task_manager.settings')
+django.setup()
+
+from django.utils import timezone  # noqa: E402
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+
+from tasks.models import Task  # noqa: E402
+from tasks.renderers import FastJSONRenderer  # noqa: E402
+from tasks.serializers import TASK_READ_FIELDS, TaskSerializer, serialize_task_rows  # noqa: E402
+
+
+def best_of(repeat: int, func) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def run(count: int, repeat: int) -> dict:
+    now = timezone.now()
+    tasks = [
+        Task(id=i, title=f'Задача {i}', description='Описание задачи', deadline=now + timedelta(minutes=i),
+             telegram_user_id=1, status=Task.Status.UNDONE, notification_sent=False, created_at=now)
+        for i in range(1, count + 1)
+    ]
+    rows = [tuple(getattr(task, field) for field in TASK_READ_FIELDS) for task in tasks]
+
+    model_serializer = best_of(repeat, lambda: JSONRenderer().render(TaskSerializer(tasks, many=True).data))
+    fast_path = best_of(repeat, lambda: FastJSONRenderer().render(serialize_task_rows(rows)))
+
+    per_10k = 10000 / count * 1000
+    return {
+        'benchmark': 'serialization',
+        'tasks': count,
+        'model_serializer_ms_per_10k': round(model_serializer * per_10k, 1),
+        'fast_path_ms_per_10k': round(fast_path * per_10k, 1),
+        'speedup': round(model_serializer / fast_path, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tasks', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    print(json.dumps(run(args.tasks, args.repeat)))
+
+
+if __name__ == '__main__':
+    main()
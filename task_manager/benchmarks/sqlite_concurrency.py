@@ -0,0 +1,142 @@
+"""Mixed API writes and deadline scans from several processes against one SQLite file.
+
+Compares Django's default SQLite connection (rollback journal, deferred
+transactions, 5 s timeout) with the tuned profile from settings.DATABASES
+(WAL, pragmas, IMMEDIATE transactions). Run from the project directory::
+
+    python -m benchmarks.sqlite_concurrency --writers 6 --scanners 2 --duration 10
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+from datetime import timedelta
+
+import django
+
+PROFILES = ('default', 'tuned')
+
+
+def setup_django(profile: str, path: str) -> None:
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'task_manager.settings')
+    from django.conf import settings
+
+    database = dict(settings.DATABASES['default'], NAME=path)
+    if profile == 'default':
+        database.pop('OPTIONS', None)
+    settings.DATABASES = {'default': database}
+    django.setup()
+
+
+def prepare(profile: str, path: str, tasks: int) -> None:
+    setup_django(profile, path)
+    from django.core.management import call_command
+    from django.utils import timezone
+    from tasks.models import Task
+
+    call_command('migrate', verbosity=0)
+    now = timezone.now()
+    Task.objects.bulk_create(
+        [Task(title=f'Задача {i}', deadline=now + timedelta(minutes=i % 600), telegram_user_id=i % 100)
+         for i in range(tasks)],
+        batch_size=500,
+    )
+
+
+def work(profile: str, path: str, role: str, duration: float, seed: int) -> dict:
+    setup_django(profile, path)
+    from django.db import OperationalError, transaction
+    from django.utils import timezone
+    from tasks.models import Task
+    from tasks.serializers import TASK_READ_FIELDS
+    from tasks.services.task_notifications import get_due_tasks
+
+    rng = random.Random(seed)
+    max_id = Task.objects.order_by('-id').values_list('id', flat=True).first()
+    stats = {'ops': 0, 'errors': 0, 'latencies': []}
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            if role == 'writer':
+                # Как PATCH /api/tasks/<id>/ и POST /api/tasks/: чтение и запись в одной транзакции
+                with transaction.atomic():
+                    task = Task.objects.only('id', 'status').get(pk=rng.randint(1, max_id))
+                    new_status = Task.Status.DONE if task.status == Task.Status.UNDONE else Task.Status.UNDONE
+                    Task.objects.filter(pk=task.pk).update(status=new_status)
+                    Task.objects.create(title='Новая', deadline=timezone.now() + timedelta(hours=1),
+                                        telegram_user_id=rng.randrange(100))
+            else:
+                # Как check_deadlines и GET /api/tasks/?telegram_user_id=
+                len(get_due_tasks())
+                len(Task.objects.filter(telegram_user_id=rng.randrange(100))
+                    .order_by('deadline', 'id').values_list(*TASK_READ_FIELDS)[:50])
+        except OperationalError as e:
+            if 'locked' not in str(e):
+                raise
+            stats['errors'] += 1
+            continue
+        stats['ops'] += 1
+        stats['latencies'].append(time.perf_counter() - started)
+    return stats
+
+
+def percentile(values: list, fraction: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def run_profile(context, profile: str, writers: int, scanners: int, duration: float, tasks: int) -> dict:
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'db.sqlite3')
+        # Каждый профиль в своих процессах: настройки Django нельзя сменить после setup()
+        with context.Pool(1) as pool:
+            pool.apply(prepare, (profile, path, tasks))
+        roles = ['writer'] * writers + ['scanner'] * scanners
+        with context.Pool(len(roles)) as pool:
+            results = pool.starmap(work, [(profile, path, role, duration, seed) for seed, role in enumerate(roles)])
+
+    by_role = {}
+    for role, stats in zip(roles, results):
+        merged = by_role.setdefault(role, {'ops': 0, 'errors': 0, 'latencies': []})
+        for key in merged:
+            merged[key] += stats[key]
+    return {
+        role: {
+            'ops_per_s': round(stats['ops'] / duration, 1),
+            'lock_errors': stats['errors'],
+            'p99_ms': round(percentile(stats['latencies'], 0.99) * 1000, 1),
+        }
+        for role, stats in by_role.items()
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--writers', type=int, default=6)
+    parser.add_argument('--scanners', type=int, default=2)
+    parser.add_argument('--duration', type=float, default=10, help='Seconds per profile')
+    parser.add_argument('--tasks', type=int, default=20000, help='Rows seeded before the run')
+    parser.add_argument('--profile', choices=PROFILES, action='append', help='Defaults to all profiles')
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context('spawn')
+    print(json.dumps({
+        'benchmark': 'sqlite_concurrency',
+        'writers': args.writers,
+        'scanners': args.scanners,
+        'duration_s': args.duration,
+        'profiles': {
+            profile: run_profile(context, profile, args.writers, args.scanners, args.duration, args.tasks)
+            for profile in args.profile or PROFILES
+        },
+    }))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,287 @@
+"""Performance suite on a seeded dataset: list pages, create, status updates, check_deadlines.
+
+Seeds a fresh SQLite file with benchmarks.datagen, drives the API in-process
+through the Django test client (full middleware/DRF stack, no network) and
+prints one JSON document with the git commit, environment and results.
+Compare two runs metric by metric with --compare::
+
+    python -m benchmarks.suite --rows 1000000 --output before.json
+    python -m benchmarks.suite --rows 1000000 --output after.json
+    python -m benchmarks.suite --compare before.json after.json
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import tempfile
+import time
+from datetime import timedelta
+from statistics import median
+from unittest import mock
+
+from .datagen import populate
+
+
+def percentile(values: list, fraction: float) -> float:
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(len(values) * fraction))] * 1000, 2) if values else 0.0
+
+
+def git_commit() -> dict:
+    def git(*args):
+        result = subprocess.run(['git', *args], capture_output=True, text=True)
+        return result.stdout.strip() if result.returncode == 0 else None
+
+    commit = git('rev-parse', 'HEAD')
+    return {'commit': commit, 'dirty': bool(git('status', '--porcelain', '--untracked-files=no')) if commit else None}
+
+
+def redis_available() -> bool:
+    from tasks.services.redis_client import get_redis
+
+    try:
+        return bool(get_redis().ping())
+    except Exception:
+        return False
+
+
+def sample_users(count: int) -> dict:
+    """Самый активный, медианный и «лёгкий» пользователь — по числу задач."""
+    from django.db.models import Count
+    from tasks.models import Task
+
+    ranked = list(Task.objects.values_list('telegram_user_id').annotate(n=Count('id')).order_by('-n', 'telegram_user_id'))
+    return {
+        'heavy': ranked[0],
+        'median': ranked[len(ranked) // 2],
+        'light': ranked[-1],
+        'random': random.Random(count).sample(ranked, min(count, len(ranked))),
+    }
+
+
+def bench_list(client, users: dict, pages: int, repeat: int) -> dict:
+    """Латентность каждой страницы при проходе по курсору и первой страницы у случайных пользователей."""
+    def walk(user_id: int) -> list:
+        timings, url = [], f'/api/tasks/?telegram_user_id={user_id}'
+        while url and len(timings) < pages:
+            started = time.perf_counter()
+            response = client.get(url)
+            timings.append(time.perf_counter() - started)
+            assert response.status_code == 200, response.status_code
+            url = response.json()['next']
+        return timings
+
+    walk(users['heavy'][0])  # Прогрев: импорт URLconf, кэш страниц SQLite
+    result = {}
+    for name in ('heavy', 'median', 'light'):
+        user_id, tasks = users[name]
+        runs = [walk(user_id) for _ in range(repeat)]
+        result[name] = {
+            'tasks': tasks,
+            'page_ms': [round(median(run[page] for run in runs) * 1000, 2) for page in range(len(runs[0]))],
+        }
+
+    first_page = []
+    for user_id, _ in users['random']:
+        started = time.perf_counter()
+        client.get(f'/api/tasks/?telegram_user_id={user_id}')
+        first_page.append(time.perf_counter() - started)
+    result['first_page'] = {'users': len(first_page), 'p50_ms': percentile(first_page, 0.5),
+                            'p99_ms': percentile(first_page, 0.99)}
+    return result
+
+
+def bench_create(client, count: int, bulk_size: int, rng: random.Random, user_ids: list) -> dict:
+    deadline = time.strftime('%d.%m.%Y %H:%M', time.localtime(time.time() + 7 * 86400))
+
+    def payload(i: int) -> dict:
+        return {'title': f'Бенчмарк {i}', 'telegram_user_id': rng.choice(user_ids), 'deadline_input': deadline}
+
+    started = time.perf_counter()
+    for i in range(count):
+        response = client.post('/api/tasks/', payload(i), content_type='application/json')
+        assert response.status_code == 201, response.content
+    single = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for offset in range(0, count, bulk_size):
+        batch = [payload(i) for i in range(offset, min(count, offset + bulk_size))]
+        response = client.post('/api/tasks/bulk/', batch, content_type='application/json')
+        assert response.status_code == 201, response.content
+    bulk = time.perf_counter() - started
+
+    return {'tasks': count, 'single_per_s': round(count / single, 1),
+            'bulk_per_s': round(count / bulk, 1), 'bulk_size': bulk_size}
+
+
+def bench_status(client, count: int, bulk_size: int, rng: random.Random) -> dict:
+    from tasks.models import Task
+
+    max_id = Task.objects.order_by('-id').values_list('id', flat=True).first()
+    ids = rng.sample(range(1, max_id + 1), count)
+    current = dict(Task.objects.filter(id__in=ids).values_list('id', 'status'))
+
+    started = time.perf_counter()
+    for task_id, status in current.items():
+        new_status = Task.Status.UNDONE if status == Task.Status.DONE else Task.Status.DONE
+        response = client.patch(f'/api/tasks/{task_id}/', {'status': new_status}, content_type='application/json')
+        assert response.status_code == 200, response.content
+    single = time.perf_counter() - started
+
+    ids = rng.sample(range(1, max_id + 1), count)
+    started = time.perf_counter()
+    for offset in range(0, count, bulk_size):
+        response = client.patch('/api/tasks/status/', {'ids': ids[offset:offset + bulk_size], 'status': 'done'},
+                                content_type='application/json')
+        assert response.status_code == 200, response.content
+    bulk = time.perf_counter() - started
+
+    return {'tasks': len(current), 'single_per_s': round(len(current) / single, 1),
+            'bulk_per_s': round(count / bulk, 1), 'bulk_size': bulk_size}
+
+
+def bench_check_deadlines(sizes: list, rng: random.Random, offsets: tuple = (10,)) -> list:
+    """
+    Время check_deadlines при due-наборе заданного размера. Постановка в брокер
+    (send_telegram_notifications.delay) подменена — измеряются захват в БД и Redis.
+    При нескольких offsets у каждой задачи после отправки остаётся следующее напоминание:
+    захват переносит next_notification_at, а не обнуляет его.
+    """
+    from django.utils import timezone
+    from tasks import tasks as celery_tasks
+    from tasks.models import Task
+    from tasks.services.task_notifications import get_due_tasks
+
+    results = []
+    for size in sizes:
+        now = timezone.now()
+        # Напоминания, наступившие по сгенерированным дедлайнам, в замер не входят
+        get_due_tasks(now).update(next_notification_at=None)
+        candidates = list(Task.objects.filter(status=Task.Status.UNDONE, next_notification_at__isnull=False,
+                                              deadline__gt=now + timedelta(days=1))
+                          .values_list('id', flat=True)[:size * 4])
+        due_ids = rng.sample(candidates, min(size, len(candidates)))
+        # Дедлайн посередине между двумя последними напоминаниями: после захвата остаётся следующее
+        deadline = now + timedelta(minutes=sum(sorted(offsets)[:2]) / 2)
+        Task.objects.filter(id__in=due_ids).update(deadline=deadline, reminder_offsets=list(offsets),
+                                                   next_notification_at=now)
+
+        with mock.patch.object(celery_tasks.send_telegram_notifications, 'delay') as delay:
+            started = time.perf_counter()
+            celery_tasks.check_deadlines()
+            elapsed = time.perf_counter() - started
+        claimed = sum(len(call.args[0]) for call in delay.call_args_list)
+        results.append({'due': len(due_ids), 'claimed': claimed, 'seconds': round(elapsed, 3)})
+    return results
+
+
+def run(args) -> dict:
+    import django
+    from django.conf import settings
+    from django.core.management import call_command
+    from django.test import Client
+    from django.test.utils import setup_test_environment
+
+    django.setup()
+    setup_test_environment(debug=False)  # ALLOWED_HOSTS=testserver, без записи SQL в connection.queries
+    call_command('migrate', verbosity=0)
+    rng = random.Random(args.seed)
+
+    started = time.perf_counter()
+    populate(args.rows, args.users, args.seed)
+    seed_seconds = time.perf_counter() - started
+
+    client = Client()
+    users = sample_users(args.first_page_users)
+    user_ids = [user_id for user_id, _ in users['random']]
+    results = {
+        'list': bench_list(client, users, args.pages, args.repeat),
+        'create': bench_create(client, args.writes, args.bulk_size, rng, user_ids),
+        'status_update': bench_status(client, args.writes, args.bulk_size, rng),
+        'check_deadlines': bench_check_deadlines(args.due_sizes, rng),
+        'check_deadlines_multi': bench_check_deadlines(args.due_sizes, rng, offsets=(1440, 60, 10)),
+    }
+    return {
+        'benchmark': 'suite',
+        'git': git_commit(),
+        'environment': {
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'redis': redis_available(),
+            'async_views': bool(settings.ASYNC_API_VIEWS),
+        },
+        'dataset': {'rows': args.rows, 'users': args.users, 'seed': args.seed, 'seed_seconds': round(seed_seconds, 1)},
+        'results': results,
+    }
+
+
+def flatten(data, prefix: str = '') -> dict:
+    if isinstance(data, dict):
+        return {key: value for name, item in data.items() for key, value in flatten(item, f'{prefix}{name}.').items()}
+    if isinstance(data, list):
+        return {key: value for i, item in enumerate(data) for key, value in flatten(item, f'{prefix}{i}.').items()}
+    if isinstance(data, (int, float)) and not isinstance(data, bool):
+        return {prefix.rstrip('.'): data}
+    return {}
+
+
+def compare(base_path: str, new_path: str) -> dict:
+    with open(base_path, encoding='utf-8') as f:
+        base = json.load(f)
+    with open(new_path, encoding='utf-8') as f:
+        new = json.load(f)
+    base_metrics, new_metrics = flatten(base['results']), flatten(new['results'])
+    return {
+        'benchmark': 'suite_compare',
+        'base': base['git'], 'new': new['git'],
+        # Сравнивать имеет смысл только прогоны на одинаковом наборе данных
+        'same_dataset': {k: v for k, v in base['dataset'].items() if k != 'seed_seconds'}
+        == {k: v for k, v in new['dataset'].items() if k != 'seed_seconds'},
+        'metrics': {
+            name: {'base': value, 'new': new_metrics[name],
+                   'change_pct': round((new_metrics[name] - value) / value * 100, 1) if value else None}
+            for name, value in base_metrics.items() if name in new_metrics
+        },
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--users', type=int, default=20_000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--pages', type=int, default=20, help='Pages walked per sampled user')
+    parser.add_argument('--repeat', type=int, default=5, help='Walks per sampled user (median per page)')
+    parser.add_argument('--first-page-users', type=int, default=200)
+    parser.add_argument('--writes', type=int, default=2000, help='Tasks created and status changes per mode')
+    parser.add_argument('--bulk-size', type=int, default=500)
+    parser.add_argument('--due-sizes', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--output', help='Also write the JSON document to this file')
+    parser.add_argument('--compare', nargs=2, metavar=('BASE', 'NEW'), help='Compare two saved runs and exit')
+    args = parser.parse_args()
+
+    if args.compare:
+        print(json.dumps(compare(*args.compare), ensure_ascii=False))
+        return
+
+    logging.disable(logging.WARNING)  # Предупреждения о недоступном Redis и пр. не смешиваем с JSON
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ['SQLITE_PATH'] = os.path.join(directory, 'db.sqlite3')
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'task_manager.settings')
+        report = json.dumps(run(args), ensure_ascii=False)
+
+    print(report)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(report + '\n')
+
+
+if __name__ == '__main__':
+    main()
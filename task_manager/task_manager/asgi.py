@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'task_manager.settings')
+# Под ASGI список, карточка, создание и смена статуса обслуживаются async-представлениями
+os.environ.setdefault('ASYNC_API_VIEWS', '1')
 
 application = get_asgi_application()
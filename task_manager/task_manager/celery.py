@@ -2,6 +2,9 @@ from __future__ import absolute_import
 
 import os
 from celery import Celery
+from celery.signals import task_postrun, task_prerun
+
+from task_manager.db_router import pinning_scope
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'task_manager.settings')
 
@@ -11,6 +14,24 @@ app.autodiscover_tasks()
 app.conf.timezone = 'UTC'
 app.conf.enable_utc = True
 
+
+# Закрепление за основной БД — на одну задачу, как в ReplicaPinningMiddleware на один запрос.
+# Иначе после первой записи воркер читал бы из основной БД до перезапуска. Область хранится
+# в контексте самого вызова (task.request): у повторной доставки и вложенного eager-вызова он свой.
+@task_prerun.connect
+def _enter_pinning_scope(task=None, **kwargs):
+    task.request.pinning_scope = pinning_scope()
+    task.request.pinning_scope.__enter__()
+
+
+@task_postrun.connect
+def _exit_pinning_scope(task=None, **kwargs):
+    scope = getattr(task.request, 'pinning_scope', None)
+    if scope is not None:
+        task.request.pinning_scope = None
+        scope.__exit__(None, None, None)
+
+
 @app.task(bind=True)
 def debug_task(self):
     print(f'Request: {self.request!r}')
\ No newline at end of file
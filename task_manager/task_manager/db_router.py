@@ -0,0 +1,102 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Запрос (или задача Celery), который уже писал в основную БД, дальше читает только из неё:
+# реплика может ещё не получить его изменения.
+_primary_pinned: ContextVar[bool] = ContextVar('primary_pinned', default=False)
+_wrote_primary: ContextVar[bool] = ContextVar('wrote_primary', default=False)
+
+
+def pin_primary() -> None:
+    _primary_pinned.set(True)
+
+
+def is_primary_pinned() -> bool:
+    return _primary_pinned.get()
+
+
+def wrote_primary() -> bool:
+    return _wrote_primary.get()
+
+
+@contextmanager
+def pinning_scope():
+    """Отдельная область закрепления — на время одного запроса."""
+    pinned_token, wrote_token = _primary_pinned.set(False), _wrote_primary.set(False)
+    try:
+        yield
+    finally:
+        _primary_pinned.reset(pinned_token)
+        _wrote_primary.reset(wrote_token)
+
+
+class PrimaryReplicaRouter:
+    """
+    Чтение — со случайной реплики из DATABASE_REPLICAS, запись — в основную БД.
+    На основную БД читают также после записи в текущем запросе и внутри транзакций
+    (SELECT ... FOR UPDATE при захвате задач, чтение перед UPDATE в сервисах).
+    """
+
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if not replicas or is_primary_pinned() or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        _wrote_primary.set(True)
+        pin_primary()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики содержат те же данные, что и основная БД
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Схема реплик приходит вместе с данными из основной БД
+        return db not in settings.DATABASE_REPLICAS
+
+
+class ReplicaPinningMiddleware:
+    """
+    Ограничивает закрепление одним запросом. После записи ставит cookie на REPLICA_PIN_SECONDS,
+    чтобы следующие запросы того же клиента тоже читали свои изменения из основной БД.
+    """
+    COOKIE_NAME = 'primary_pin'
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with pinning_scope():
+            self._pin_from_cookie(request)
+            response = self.get_response(request)
+            wrote = wrote_primary()
+        return self._set_cookie(response, wrote)
+
+    async def __acall__(self, request):
+        with pinning_scope():
+            self._pin_from_cookie(request)
+            response = await self.get_response(request)
+            wrote = wrote_primary()
+        return self._set_cookie(response, wrote)
+
+    def _pin_from_cookie(self, request) -> None:
+        if request.COOKIES.get(self.COOKIE_NAME):
+            pin_primary()
+
+    def _set_cookie(self, response, wrote: bool):
+        if wrote and settings.DATABASE_REPLICAS and settings.REPLICA_PIN_SECONDS:
+            response.set_cookie(self.COOKIE_NAME, '1', max_age=settings.REPLICA_PIN_SECONDS, httponly=True)
+        return response
@@ -53,6 +53,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'tasks.metrics.MetricsMiddleware',
+    'task_manager.db_router.ReplicaPinningMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -80,18 +82,61 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'task_manager.wsgi.application'
+ASGI_APPLICATION = 'task_manager.asgi.application'
+# Нативные async-представления API (включается в asgi.py; под WSGI остаются представления DRF)
+ASYNC_API_VIEWS = os.getenv('ASYNC_API_VIEWS', '0') == '1'
 
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# В один файл SQLite одновременно пишут Django, воркеры Celery и рассыльщики.
+# WAL не блокирует чтение во время записи, synchronous=NORMAL в WAL безопасен
+# (при сбое питания теряется только последняя транзакция), а кэш и mmap сокращают чтение с диска.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': int(os.getenv('SQLITE_CACHE_SIZE_KB', '65536')) * -1,  # отрицательное значение — в КБ
+    'mmap_size': int(os.getenv('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024))),
+    'temp_store': 'MEMORY',
+}
+# Сколько писатель ждёт освобождения блокировки (это и есть busy_timeout), секунд
+SQLITE_BUSY_TIMEOUT = int(os.getenv('SQLITE_BUSY_TIMEOUT', '20'))
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': os.getenv('SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+        'OPTIONS': {
+            'init_command': ';'.join(f'PRAGMA {name}={value}' for name, value in SQLITE_PRAGMAS.items()),
+            # Блокировка на запись берётся в начале транзакции: без этого чтение, переходящее в запись,
+            # получает "database is locked" сразу, не дожидаясь busy_timeout
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': SQLITE_BUSY_TIMEOUT,
+        },
     }
 }
 
+# Реплики только для чтения: пути к копиям файла БД через запятую (локально их обновляет
+# `manage.py sync_replicas`). Чтения API и бота идут на реплики, запись и захват задач — в default.
+DATABASE_REPLICAS = []
+for index, replica_path in enumerate(filter(None, os.getenv('SQLITE_REPLICA_PATHS', '').split(','))):
+    alias = f'replica_{index}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'NAME': replica_path.strip(),
+        'OPTIONS': {
+            **DATABASES['default']['OPTIONS'],
+            'init_command': DATABASES['default']['OPTIONS']['init_command'] + ';PRAGMA query_only=ON',
+        },
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['task_manager.db_router.PrimaryReplicaRouter']
+# Сколько после записи клиент читает из основной БД — должно покрывать отставание реплик, секунд
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', '5'))
+
 
 
 # Password validation
@@ -136,19 +181,105 @@ CELERY_TIMEZONE = os.environ.get("CELERY_TIMEZONE", TIME_ZONE)
 CELERY_TASK_ACKS_LATE = True  # Подтверждение задач после выполнения
 CELERY_WORKER_PREFETCH_MULTIPLIER = 1  # Распределение задач равномерно
 
+# Напоминания ставятся в расписание (Redis) при создании/изменении задачи;
+# тик только забирает наступившие, а сверка с БД — страховка на случай сбоев.
+REMINDER_TICK_INTERVAL = float(os.getenv('REMINDER_TICK_INTERVAL', '1'))
+REMINDER_RECONCILE_INTERVAL = float(os.getenv('REMINDER_RECONCILE_INTERVAL', '300'))
+# За сколько минут до дедлайна напоминать, если у задачи не задан свой набор (reminder_offsets),
+# например TASK_REMINDER_OFFSETS=1440,60,10 — за сутки, за час и за 10 минут
+TASK_REMINDER_OFFSETS = [int(minutes) for minutes in os.getenv('TASK_REMINDER_OFFSETS', '10').split(',') if minutes]
+TASK_MAX_REMINDERS = int(os.getenv('TASK_MAX_REMINDERS', '5'))
+
+# Circuit breaker отправки в Telegram (tasks/services/circuit_breaker.py): после N сбоев подряд
+# (таймаут, сеть, 5xx) отправка на OPEN_SECONDS прекращается, напоминания ждут в очереди deferred;
+# затем один пробный вызов. Очередь возвращается в отправку пачками раз в DRAIN_INTERVAL секунд.
+TELEGRAM_BREAKER_FAILURE_THRESHOLD = int(os.getenv('TELEGRAM_BREAKER_FAILURE_THRESHOLD', '5'))
+TELEGRAM_BREAKER_FAILURE_WINDOW = float(os.getenv('TELEGRAM_BREAKER_FAILURE_WINDOW', '60'))  # сбои старше забываются
+TELEGRAM_BREAKER_OPEN_SECONDS = float(os.getenv('TELEGRAM_BREAKER_OPEN_SECONDS', '30'))
+TELEGRAM_DEFERRED_DRAIN_INTERVAL = float(os.getenv('TELEGRAM_DEFERRED_DRAIN_INTERVAL', '10'))
+TELEGRAM_DEFERRED_DRAIN_BATCH = int(os.getenv('TELEGRAM_DEFERRED_DRAIN_BATCH', '200'))
+
 CELERY_BEAT_SCHEDULE = {
-    'check-deadlines-every-minute': {
+    'dispatch-due-reminders': {
+        'task': 'tasks.tasks.dispatch_due_reminders',
+        'schedule': REMINDER_TICK_INTERVAL,
+    },
+    'reconcile-deadlines': {
         'task': 'tasks.tasks.check_deadlines',
-        # 'schedule': crontab(minute='*'),
-        'schedule': 30.0,
+        # 'schedule': crontab(minute='*/5'),
+        'schedule': REMINDER_RECONCILE_INTERVAL,
+    },
+    'drain-deferred-notifications': {
+        'task': 'tasks.tasks.drain_deferred_notifications',
+        'schedule': TELEGRAM_DEFERRED_DRAIN_INTERVAL,
+    },
+    'archive-old-tasks': {
+        'task': 'tasks.tasks.archive_old_tasks',
+        'schedule': crontab(hour=3, minute=30),
     },
 }
 
+# Сколько задач check_deadlines захватывает за одну транзакцию
+DEADLINE_CLAIM_BATCH_SIZE = int(os.getenv('DEADLINE_CLAIM_BATCH_SIZE', '500'))
+# На сколько шардов (по telegram_user_id) делится сверка check_deadlines; шарды идут на разные воркеры
+DEADLINE_SCAN_SHARDS = int(os.getenv('DEADLINE_SCAN_SHARDS', '1'))
+
+# Архивация: задачи, выполненные больше N дней назад, и задачи с дедлайном старше N дней
+# переносятся из Task в ArchivedTask пачками (manage.py archive_tasks или ежедневно через beat)
+TASKS_ARCHIVE_AFTER_DAYS = int(os.getenv('TASKS_ARCHIVE_AFTER_DAYS', '30'))
+TASKS_ARCHIVE_BATCH_SIZE = int(os.getenv('TASKS_ARCHIVE_BATCH_SIZE', '500'))
+
+# Размер страницы списка задач (?page_size= может менять его в пределах максимума)
+TASKS_PAGE_SIZE = int(os.getenv('TASKS_PAGE_SIZE', '50'))
+TASKS_MAX_PAGE_SIZE = int(os.getenv('TASKS_MAX_PAGE_SIZE', '500'))
+
+# Пакетное создание задач (POST /api/tasks/bulk/)
+TASKS_BULK_MAX_ITEMS = int(os.getenv('TASKS_BULK_MAX_ITEMS', '1000'))
+TASKS_BULK_CREATE_BATCH_SIZE = int(os.getenv('TASKS_BULK_CREATE_BATCH_SIZE', '200'))
+
 API_URL = os.getenv('API_URL', 'http://localhost:8000/api/')
 TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_TOKEN')
 
+# Redis для общих счётчиков и лимитов (по умолчанию тот же, что и брокер Celery)
+REDIS_URL = os.getenv('REDIS_URL', CELERY_BROKER_URL)
+
+# Отправка напоминаний в Telegram
+TELEGRAM_REQUEST_TIMEOUT = int(os.getenv('TELEGRAM_REQUEST_TIMEOUT', '10'))
+TELEGRAM_HTTP_POOL_SIZE = int(os.getenv('TELEGRAM_HTTP_POOL_SIZE', '10'))
+TELEGRAM_SEND_BATCH_SIZE = int(os.getenv('TELEGRAM_SEND_BATCH_SIZE', '100'))
+TELEGRAM_GLOBAL_RATE = float(os.getenv('TELEGRAM_GLOBAL_RATE', '30'))  # сообщений в секунду на бота
+TELEGRAM_PER_CHAT_RATE = float(os.getenv('TELEGRAM_PER_CHAT_RATE', '1'))  # сообщений в секунду в один чат
+
 
 API_REQUEST_TIMEOUT = int(os.getenv('API_REQUEST_TIMEOUT', '10'))
+BOT_API_MAX_CONNECTIONS = int(os.getenv('BOT_API_MAX_CONNECTIONS', '100'))
+BOT_TASKS_CACHE_TTL = int(os.getenv('BOT_TASKS_CACHE_TTL', '3600'))  # страховка, если инвалидация потерялась
+BOT_TASKS_PAGE_SIZE = int(os.getenv('BOT_TASKS_PAGE_SIZE', '10'))  # задач на странице /mytasks
+
+# Откуда бот берёт задачи: http — через API_URL, direct — ORM и tasks/services в процессе бота
+BOT_BACKEND = os.getenv('BOT_BACKEND', 'http')
+
+# Получение обновлений ботом: polling (один процесс) или webhook (любое число реплик за балансировщиком)
+BOT_MODE = os.getenv('BOT_MODE', 'polling')
+BOT_WEBHOOK_URL = os.getenv('BOT_WEBHOOK_URL')  # публичный URL для setWebhook; пусто — не регистрировать
+BOT_WEBHOOK_PATH = os.getenv('BOT_WEBHOOK_PATH', '/telegram/webhook')
+BOT_WEBHOOK_HOST = os.getenv('BOT_WEBHOOK_HOST', '0.0.0.0')
+BOT_WEBHOOK_PORT = int(os.getenv('BOT_WEBHOOK_PORT', '8081'))
+BOT_WEBHOOK_SECRET = os.getenv('BOT_WEBHOOK_SECRET')
+BOT_WEBHOOK_MAX_CONNECTIONS = int(os.getenv('BOT_WEBHOOK_MAX_CONNECTIONS', '40'))  # соединений от Telegram
+BOT_MAX_CONCURRENT_UPDATES = int(os.getenv('BOT_MAX_CONCURRENT_UPDATES', '100'))  # на одну реплику
+
+# Исходящие вызовы бота (telegram_bot/outbox.py). Общий лимит Telegram на бота — TELEGRAM_GLOBAL_RATE:
+# его корзину в Redis делят все воркеры, webhook-реплики и напоминания Celery. BOT_SEND_RATE — потолок
+# на процесс бота (воркеры делят его поровну), BOT_SEND_PER_CHAT_* — лимит на чат со всплеском.
+BOT_SEND_RATE = float(os.getenv('BOT_SEND_RATE', '25'))
+BOT_SEND_PER_CHAT_RATE = float(os.getenv('BOT_SEND_PER_CHAT_RATE', '1'))
+BOT_SEND_PER_CHAT_BURST = int(os.getenv('BOT_SEND_PER_CHAT_BURST', '3'))
+
+# Хранилище FSM: memory — в процессе, redis — общее для реплик и воркеров (REDIS_URL)
+BOT_FSM_STORAGE = os.getenv('BOT_FSM_STORAGE', 'memory')
+# Процессы-обработчики в режиме polling: обновления распределяются по ним по chat id
+BOT_WORKERS = int(os.getenv('BOT_WORKERS', '1'))
 
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
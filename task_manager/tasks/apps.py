@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class TasksConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'tasks'
+
+    def ready(self):
+        # Учёт SQL-запросов подключается к каждому новому соединению с БД
+        from . import metrics  # noqa: F401
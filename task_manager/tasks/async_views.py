@@ -0,0 +1,171 @@
+"""
+Нативные async-представления для ASGI (ASYNC_API_VIEWS=1): список, карточка, создание задачи
+и смена статуса. Правила, формат ответов и политика доступа (аутентификация, права, троттлинг)
+те же, что у TaskViewSet; остальные эндпоинты (пакетные операции, deadline_soon) остаются синхронными.
+"""
+import json
+from typing import Any, Dict, Optional
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django_filters.filterset import filterset_factory
+from django_filters.rest_framework import FilterSet
+from django_filters.utils import translate_validation
+from rest_framework import status
+from rest_framework.exceptions import APIException, MethodNotAllowed, NotFound, ParseError, UnsupportedMediaType
+
+from task_manager.db_router import pin_primary
+from .etags import etag_matches, make_etag, wants_archived
+from .models import ArchivedTask, Task
+from .pagination import DeadlineCursorPagination
+from .renderers import FastJSONRenderer
+from .serializers import TASK_READ_FIELDS, TaskSerializer, TaskStatusUpdateSerializer, serialize_task_rows
+from .services.task_crud import acreate_task
+from .services.task_status import aupdate_task_status
+from .services.task_versions import get_task_version, get_user_version, recently_written
+from .views import TaskViewSet
+
+# Те же фильтры, что DjangoFilterBackend строит для TaskViewSet
+FILTERSETS = {
+    model: filterset_factory(model, filterset=FilterSet, fields=TaskViewSet.filterset_fields)
+    for model in (Task, ArchivedTask)
+}
+
+
+def _json_response(data: Any, status_code: int = status.HTTP_200_OK, etag: Optional[str] = None) -> HttpResponse:
+    response = HttpResponse(FastJSONRenderer().render(data), status=status_code, content_type='application/json')
+    if etag and status_code == status.HTTP_200_OK:
+        response['ETag'] = etag
+    return response
+
+
+def _not_modified(etag: str) -> HttpResponse:
+    response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+    response['ETag'] = etag
+    return response
+
+
+def _api_view(*methods: str):
+    """
+    Обёртка с той же политикой, что у TaskViewSet: до обработчика выполняется APIView.initial —
+    аутентификация, права, троттлинг и выбор формата по authentication_classes, permission_classes,
+    throttle_classes и renderer_classes вьюсета. Ошибки проходят через его handle_exception
+    (EXCEPTION_HANDLER, WWW-Authenticate, Retry-After). Запросы не за JSON (Browsable API)
+    целиком обслуживает синхронный TaskViewSet.
+    """
+    def decorator(handlers):
+        # Имена действий как у TaskViewSet.as_view — для меток метрик
+        actions = {method.lower(): handler.__name__.lstrip('_') for method, handler in handlers.items()}
+        viewset_view = TaskViewSet.as_view(actions)
+
+        def render_with_viewset(request, *args, **kwargs):
+            # Browsable API может обращаться к БД при отрисовке — рендерим здесь же, в потоке ORM
+            return viewset_view(request, *args, **kwargs).render()
+
+        @csrf_exempt
+        async def view(request, *args, **kwargs):
+            drf_view = TaskViewSet(action_map=actions, args=args, kwargs=kwargs, format_kwarg=None)
+            drf_view.headers = drf_view.default_response_headers
+            drf_request = drf_view.request = drf_view.initialize_request(request, *args, **kwargs)
+            handler = handlers.get(request.method)
+            try:
+                # Аутентификация может читать сессию и пользователя из БД — в потоке ORM
+                await sync_to_async(drf_view.initial)(drf_request, *args, **kwargs)
+                if handler is None:
+                    raise MethodNotAllowed(request.method)
+                if not isinstance(drf_request.accepted_renderer, FastJSONRenderer):
+                    return await sync_to_async(render_with_viewset)(request, *args, **kwargs)
+                return await handler(request, *args, **kwargs)
+            except APIException as exc:
+                error = await sync_to_async(drf_view.handle_exception)(exc)
+                response = _json_response(error.data, error.status_code)
+                for header in ('WWW-Authenticate', 'Retry-After'):
+                    if header in error:
+                        response[header] = error[header]
+                if isinstance(exc, MethodNotAllowed):
+                    response['Allow'] = ', '.join(methods)
+                return response
+        view.actions = actions
+        return view
+    return decorator
+
+
+def _parse_json(request) -> Any:
+    if request.content_type != 'application/json':
+        raise UnsupportedMediaType(request.content_type)
+    try:
+        return json.loads(request.body or b'null')
+    except ValueError as e:
+        raise ParseError(f'JSON parse error - {e}')
+
+
+def _filter(queryset, request):
+    filterset = FILTERSETS[queryset.model](request.GET, queryset=queryset, request=request)
+    if not filterset.is_valid():
+        raise translate_validation(filterset.errors)
+    return filterset.qs
+
+
+async def _in_thread(func, *args, **kwargs):
+    # Синхронный Redis-клиент — в пул потоков, чтобы не блокировать event loop
+    return await sync_to_async(func, thread_sensitive=False)(*args, **kwargs)
+
+
+async def _get_task(pk: int) -> Task:
+    try:
+        return await Task.objects.aget(pk=pk)
+    except Task.DoesNotExist:
+        raise NotFound(f"No {Task._meta.object_name} matches the given query.")
+
+
+async def _list(request) -> HttpResponse:
+    etag = None
+    user_id = request.GET.get('telegram_user_id')
+    if user_id and user_id.isdigit():
+        etag = make_etag(request, f"user{user_id}", await _in_thread(get_user_version, int(user_id)))
+        if settings.DATABASE_REPLICAS and await _in_thread(recently_written, user_id=int(user_id)):
+            pin_primary()
+    if etag_matches(request, etag):
+        return _not_modified(etag)
+
+    querysets = [_filter(Task.objects.all(), request)]
+    if wants_archived(request.GET):
+        querysets.append(_filter(ArchivedTask.objects.all(), request))
+    paginator = DeadlineCursorPagination()
+    page = await paginator.apaginate_querysets(
+        [queryset.values_list(*TASK_READ_FIELDS, named=True) for queryset in querysets], request)
+    return _json_response(paginator.get_paginated_data(serialize_task_rows(page)), etag=etag)
+
+
+async def _create(request) -> HttpResponse:
+    serializer = TaskSerializer(data=_parse_json(request))
+    serializer.is_valid(raise_exception=True)
+    task = await acreate_task(dict(serializer.validated_data))
+    return _json_response(TaskSerializer(task).data, status.HTTP_201_CREATED)
+
+
+async def _retrieve(request, pk: int) -> HttpResponse:
+    etag = make_etag(request, f"task{pk}", await _in_thread(get_task_version, pk))
+    if settings.DATABASE_REPLICAS and await _in_thread(recently_written, task_id=pk):
+        pin_primary()
+    if etag_matches(request, etag):
+        return _not_modified(etag)
+    return _json_response(TaskSerializer(await _get_task(pk)).data, etag=etag)
+
+
+async def _partial_update(request, pk: int) -> HttpResponse:
+    task = await _get_task(pk)
+    data: Dict[str, Any] = _parse_json(request)
+    if not isinstance(data, dict) or set(data.keys()) != {'status'}:
+        return _json_response({"error": "Only 'status' field is allowed"}, status.HTTP_400_BAD_REQUEST)
+
+    serializer = TaskStatusUpdateSerializer(task, data=data, partial=True)
+    serializer.is_valid(raise_exception=True)
+    await aupdate_task_status(task, serializer.validated_data['status'])
+    return _json_response({'status': task.status})
+
+
+task_list_create = _api_view('GET', 'POST')({'GET': _list, 'POST': _create})
+task_detail = _api_view('GET', 'PATCH')({'GET': _retrieve, 'PATCH': _partial_update})
@@ -0,0 +1,29 @@
+import hashlib
+from typing import Optional
+
+from django.utils.http import parse_etags
+
+
+def make_etag(request, scope: str, version: Optional[int], fmt: str = 'json') -> Optional[str]:
+    """
+    Слабый ETag из версии в Redis. Версия читается до запроса в БД, поэтому ETag
+    может оказаться только старее содержимого (лишний 200), но не новее (ложный 304).
+    """
+    if version is None:
+        return None
+    # Ответ зависит и от параметров запроса (фильтры, курсор, размер страницы) и формата
+    variant = f"{request.build_absolute_uri()}|{fmt}"
+    return f'W/"{scope}-{version}-{hashlib.md5(variant.encode()).hexdigest()[:12]}"'
+
+
+def etag_matches(request, etag: Optional[str]) -> bool:
+    header = request.headers.get('If-None-Match')
+    if not etag or not header:
+        return False
+    # If-None-Match сравнивает ETag слабо — без префикса W/
+    client_etags = {tag.removeprefix('W/') for tag in parse_etags(header)}
+    return '*' in client_etags or etag.removeprefix('W/') in client_etags
+
+
+def wants_archived(query_params) -> bool:
+    return query_params.get('include_archived', '').lower() in ('1', 'true', 'yes')
@@ -0,0 +1,20 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from tasks.services.task_archive import archive_tasks
+
+
+class Command(BaseCommand):
+    help = "Переносит выполненные и давно просроченные задачи в архив (ArchivedTask) пачками."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.TASKS_ARCHIVE_AFTER_DAYS,
+                            help="Возраст задачи в днях (по умолчанию TASKS_ARCHIVE_AFTER_DAYS)")
+        parser.add_argument('--batch-size', type=int, default=settings.TASKS_ARCHIVE_BATCH_SIZE,
+                            help="Задач в одной транзакции (по умолчанию TASKS_ARCHIVE_BATCH_SIZE)")
+
+    def handle(self, *args, **options):
+        archived = archive_tasks(older_than=timedelta(days=options['days']), batch_size=options['batch_size'])
+        self.stdout.write(f"Перенесено в архив задач: {archived}")
@@ -0,0 +1,32 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Копирует основную SQLite-БД в файлы реплик (SQLITE_REPLICA_PATHS). "
+        "Локальная замена репликации: запускайте по расписанию, интервал и есть отставание реплик."
+    )
+
+    def handle(self, *args, **options):
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError("Реплики не настроены: задайте SQLITE_REPLICA_PATHS")
+
+        primary = settings.DATABASES['default']
+        if primary['ENGINE'] != 'django.db.backends.sqlite3':
+            raise CommandError("Команда работает только с SQLite")
+
+        source = sqlite3.connect(primary['NAME'], timeout=settings.SQLITE_BUSY_TIMEOUT)
+        try:
+            for alias in settings.DATABASE_REPLICAS:
+                target = sqlite3.connect(settings.DATABASES[alias]['NAME'])
+                try:
+                    # Онлайн-бэкап: согласованный снимок, писатели основной БД не блокируются надолго
+                    source.backup(target)
+                finally:
+                    target.close()
+                self.stdout.write(f"{alias}: {settings.DATABASES[alias]['NAME']}")
+        finally:
+            source.close()
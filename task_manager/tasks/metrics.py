@@ -0,0 +1,142 @@
+"""
+Метрики Prometheus: латентность API по действиям TaskViewSet, SQL-запросы на запрос к API,
+сканирование дедлайнов и отправка напоминаний в Telegram.
+
+Несколько процессов (воркеры gunicorn/uvicorn, Celery на том же хосте) должны писать в общий
+каталог PROMETHEUS_MULTIPROC_DIR — тогда /metrics суммирует значения всех процессов.
+Каталог задаётся до запуска процессов и очищается при каждом деплое.
+"""
+import os
+import time
+from contextvars import ContextVar
+from datetime import datetime
+from typing import List, Optional
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse
+from prometheus_client import REGISTRY, CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, generate_latest
+from prometheus_client import multiprocess
+
+REQUEST_LATENCY = Histogram(
+    'task_api_request_duration_seconds', 'Время обработки запроса к API задач', ['action', 'status'],
+)
+DB_QUERIES = Histogram(
+    'task_api_db_queries', 'Число SQL-запросов за один запрос к API', ['action'],
+    buckets=(0, 1, 2, 3, 4, 5, 8, 13, 21, 34, 55),
+)
+DB_DURATION = Histogram(
+    'task_api_db_duration_seconds', 'Суммарное время SQL-запросов за один запрос к API', ['action'],
+)
+SCAN_DURATION = Histogram(
+    'reminder_scan_duration_seconds', 'Длительность прохода check_deadlines / dispatch_due_reminders', ['task'],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+CLAIM_BATCH_SIZE = Histogram(
+    'reminder_claim_batch_size', 'Задач захвачено за одну пачку', ['task'],
+    buckets=(0, 1, 10, 50, 100, 250, 500, 1000, 2500, 5000),
+)
+TELEGRAM_SEND_LATENCY = Histogram('telegram_send_duration_seconds', 'Время одного вызова sendMessage')
+TELEGRAM_SEND_RESULTS = Counter(
+    'telegram_send', 'Результаты отправки напоминаний: sent, rate_limited, retryable_error, failed, dropped',
+    ['outcome'],
+)
+TELEGRAM_RETRIES = Counter(
+    'telegram_send_retries', 'Перезапуски пачек напоминаний: повтор после ошибки или отложенная отправка', ['reason'],
+)
+TELEGRAM_BREAKER_TRANSITIONS = Counter(
+    'telegram_breaker_transitions', 'Переходы circuit breaker отправки в Telegram по новому состоянию', ['state'],
+)
+TELEGRAM_DEFERRED = Counter(
+    'telegram_deferred_notifications', 'Напоминания в очереди deferred: parked — отложены, drained — забраны, expired — сняты после дедлайна', ['action'],
+)
+REMINDER_LAG = Histogram(
+    'reminder_lag_seconds', 'Задержка отправки напоминания относительно запланированного момента (next_notification_at)',
+    buckets=(1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600),
+)
+
+# Длительности SQL-запросов текущего запроса к API; None — вне MetricsMiddleware.
+# Список общий для потоков sync_to_async: контекст копируется, сам список — нет.
+_request_queries: ContextVar[Optional[List[float]]] = ContextVar('request_queries', default=None)
+
+
+def observe_reminder_lag(target: datetime) -> None:
+    """target — момент, когда напоминание должно было уйти (дедлайн минус его смещение)."""
+    REMINDER_LAG.observe(max(0.0, time.time() - target.timestamp()))
+
+
+def _record_query(execute, sql, params, many, context):
+    timings = _request_queries.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.append(time.perf_counter() - started)
+
+
+def _install_query_recorder(sender, connection, **kwargs) -> None:
+    # Сигнал приходит при каждом переподключении того же DatabaseWrapper
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+connection_created.connect(_install_query_recorder)
+
+
+class MetricsMiddleware:
+    """
+    Латентность и SQL-запросы для представлений с действиями (TaskViewSet.as_view и async_views).
+    Остальные URL (админка, /metrics) не учитываются, чтобы не плодить метки.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        queries: List[float] = []
+        token = _request_queries.set(queries)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_queries.reset(token)
+        self._observe(request, response, time.perf_counter() - started, queries)
+        return response
+
+    async def __acall__(self, request):
+        queries: List[float] = []
+        token = _request_queries.set(queries)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_queries.reset(token)
+        self._observe(request, response, time.perf_counter() - started, queries)
+        return response
+
+    def _observe(self, request, response, elapsed: float, queries: List[float]) -> None:
+        match = request.resolver_match
+        action = getattr(match.func, 'actions', {}).get(request.method.lower()) if match else None
+        if action is None:
+            return
+        REQUEST_LATENCY.labels(action, str(response.status_code)).observe(elapsed)
+        DB_QUERIES.labels(action).observe(len(queries))
+        DB_DURATION.labels(action).observe(sum(queries))
+
+
+def metrics_view(request) -> HttpResponse:
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        # Свежий реестр на каждый scrape: значения читаются из файлов всех процессов
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
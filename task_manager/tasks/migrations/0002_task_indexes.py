@@ -0,0 +1,21 @@
+# Generated by Django 5.2.1 on 2026-10-18 02:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('notification_sent', False), ('status', 'undone')), fields=['status', 'deadline', 'notification_sent'], name='task_due_scan_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['telegram_user_id', 'deadline'], name='task_user_deadline_idx'),
+        ),
+    ]
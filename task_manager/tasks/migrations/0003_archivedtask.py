@@ -0,0 +1,33 @@
+# Generated by Django 5.2.1 on 2026-10-18 02:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0002_task_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedTask',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('title', models.CharField(max_length=255, verbose_name='Название задачи')),
+                ('description', models.TextField(blank=True, verbose_name='Описание')),
+                ('deadline', models.DateTimeField(verbose_name='Срок выполнения')),
+                ('telegram_user_id', models.IntegerField(verbose_name='ID пользователя Telegram')),
+                ('status', models.CharField(choices=[('done', 'Выполнено'), ('undone', 'Не выполнено')], max_length=6, verbose_name='Статус')),
+                ('notification_sent', models.BooleanField(default=False, verbose_name='Уведомление отправлено')),
+                ('created_at', models.DateTimeField(verbose_name='Дата создания')),
+                ('archived_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата архивации')),
+            ],
+            options={
+                'verbose_name': 'Архивная задача',
+                'verbose_name_plural': 'Архивные задачи',
+                'ordering': ['deadline'],
+                'indexes': [models.Index(fields=['telegram_user_id', 'deadline'], name='archived_user_deadline_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.1 on 2026-10-18 03:32
+
+from datetime import timedelta
+
+import tasks.models
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def schedule_pending_reminders(apps, schema_editor):
+    """Ставит ближайшее напоминание задачам, по которым оно ещё не отправлено (правило как в task_notifications)."""
+    Task = apps.get_model('tasks', 'Task')
+    now = timezone.now()
+    pending = Task.objects.filter(status='undone', notification_sent=False, deadline__gt=now).order_by('id')
+    batch = []
+    for task in pending.only('id', 'deadline', 'reminder_offsets').iterator(chunk_size=2000):
+        times = sorted(task.deadline - timedelta(minutes=minutes) for minutes in task.reminder_offsets)
+        upcoming = [moment for moment in times if moment > now]
+        task.next_notification_at = upcoming[0] if upcoming else (times[-1] if times else None)
+        batch.append(task)
+        if len(batch) == 2000:
+            Task.objects.bulk_update(batch, ['next_notification_at'])
+            batch = []
+    Task.objects.bulk_update(batch, ['next_notification_at'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0003_archivedtask'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedtask',
+            name='reminder_offsets',
+            field=models.JSONField(default=list, verbose_name='Напоминания (минут до дедлайна)'),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='next_notification_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Следующее напоминание'),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='reminder_offsets',
+            field=models.JSONField(default=tasks.models.default_reminder_offsets, verbose_name='Напоминания (минут до дедлайна)'),
+        ),
+        migrations.RunPython(schedule_pending_reminders, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('next_notification_at__isnull', False)), fields=['next_notification_at'], name='task_next_notification_idx'),
+        ),
+        migrations.RemoveIndex(
+            model_name='task',
+            name='task_due_scan_idx',
+        ),
+    ]
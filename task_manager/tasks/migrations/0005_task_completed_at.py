@@ -0,0 +1,31 @@
+# Generated by Django 5.2.1 on 2026-10-18 03:59
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def mark_done_tasks_completed_now(apps, schema_editor):
+    """Когда выполнены уже сделанные задачи, неизвестно: срок хранения до архива отсчитывается с миграции."""
+    Task = apps.get_model('tasks', 'Task')
+    Task.objects.filter(status='done', completed_at__isnull=True).update(completed_at=timezone.now())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0004_task_reminder_offsets'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedtask',
+            name='completed_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Дата выполнения'),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='completed_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Дата выполнения'),
+        ),
+        migrations.RunPython(mark_done_tasks_completed_now, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,11 @@
+from django.conf import settings
 from django.db import models
 
+
+def default_reminder_offsets():
+    return list(settings.TASK_REMINDER_OFFSETS)
+
+
 class Task(models.Model):
     class Status(models.TextChoices):
         DONE = 'done', 'Выполнено'
@@ -23,13 +29,93 @@ class Task(models.Model):
     )
     notification_sent = models.BooleanField(default=False,
                                             verbose_name='Уведомление отправлено')
+    reminder_offsets = models.JSONField(default=default_reminder_offsets,
+                                        verbose_name='Напоминания (минут до дедлайна)')
+    # Момент ближайшего напоминания; пересчитывается сервисами при смене дедлайна,
+    # статуса и набора напоминаний и после каждой отправки (см. task_notifications)
+    next_notification_at = models.DateTimeField(null=True,
+                                                blank=True,
+                                                verbose_name='Следующее напоминание')
     created_at = models.DateTimeField(auto_now_add=True,
                                       verbose_name='Дата создания')
+    # Ставится сервисами task_status при переводе в done и сбрасывается при возврате в работу;
+    # по нему выполненные задачи стареют для архива
+    completed_at = models.DateTimeField(null=True,
+                                        blank=True,
+                                        verbose_name='Дата выполнения')
 
     class Meta:
         verbose_name = 'Задача'
         verbose_name_plural = 'Задачи'
         ordering = ['deadline']
+        indexes = [
+            # Сканирование напоминаний в check_deadlines: один диапазон next_notification_at <= now.
+            # Выполненные задачи и задачи без оставшихся напоминаний (NULL) в индекс не попадают,
+            # поэтому его размер не зависит от числа напоминаний у задачи.
+            models.Index(
+                fields=['next_notification_at'],
+                name='task_next_notification_idx',
+                condition=models.Q(next_notification_at__isnull=False),
+            ),
+            # Список задач пользователя (?telegram_user_id=) с сортировкой по дедлайну
+            models.Index(
+                fields=['telegram_user_id', 'deadline'],
+                name='task_user_deadline_idx',
+            ),
+            # Архивация (task_archive): диапазоны deadline < cutoff и completed_at < cutoff.
+            # completed_at есть только у выполненных задач, остальные в индекс не попадают.
+            models.Index(
+                fields=['deadline'],
+                name='task_deadline_idx',
+            ),
+            models.Index(
+                fields=['completed_at'],
+                name='task_completed_idx',
+                condition=models.Q(completed_at__isnull=False),
+            ),
+        ]
+
+    def __str__(self):
+        return f'#{self.id} {self.title} ({self.get_status_display()})'
+
+
+class ArchivedTask(models.Model):
+    """
+    Выполненные и давно просроченные задачи, перенесённые из Task командой archive_tasks.
+    ID сохраняется, поэтому ссылки на задачу остаются однозначными.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    title = models.CharField(max_length=255,
+                             verbose_name='Название задачи')
+    description = models.TextField(blank=True,
+                                   verbose_name='Описание')
+    deadline = models.DateTimeField(verbose_name='Срок выполнения')
+    telegram_user_id = models.IntegerField(verbose_name='ID пользователя Telegram')
+    status = models.CharField(max_length=6,
+                              choices=Task.Status.choices,
+                              verbose_name='Статус')
+    notification_sent = models.BooleanField(default=False,
+                                            verbose_name='Уведомление отправлено')
+    reminder_offsets = models.JSONField(default=list,
+                                        verbose_name='Напоминания (минут до дедлайна)')
+    created_at = models.DateTimeField(verbose_name='Дата создания')
+    completed_at = models.DateTimeField(null=True,
+                                        blank=True,
+                                        verbose_name='Дата выполнения')
+    archived_at = models.DateTimeField(auto_now_add=True,
+                                       verbose_name='Дата архивации')
+
+    class Meta:
+        verbose_name = 'Архивная задача'
+        verbose_name_plural = 'Архивные задачи'
+        ordering = ['deadline']
+        indexes = [
+            # Список задач пользователя с ?include_archived=1
+            models.Index(
+                fields=['telegram_user_id', 'deadline'],
+                name='archived_user_deadline_idx',
+            ),
+        ]
 
     def __str__(self):
-        return f'#{self.id} {self.title} ({self.get_status_display()})'
\ No newline at end of file
+        return f'#{self.id} {self.title} (в архиве)'
@@ -0,0 +1,178 @@
+import base64
+import binascii
+import heapq
+import struct
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+from typing import Any, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+from django.db.models import Q, QuerySet
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+# Позиция курсора в токене: флаг направления, дедлайн в микросекундах от эпохи (UTC), id.
+# 17 байт — 23 символа base64, курсор помещается и в callback_data кнопок бота (до 64 байт).
+_TOKEN = struct.Struct('>?qQ')
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def _query_params(request):
+    # DRF Request в синхронных представлениях и HttpRequest в async-представлениях
+    return getattr(request, 'query_params', request.GET)
+
+
+class DeadlineCursorPagination(BasePagination):
+    """
+    Keyset-пагинация по (deadline, id): каждая страница — диапазонный поиск по индексу
+    от позиции из курсора, без OFFSET. Курсор непрозрачен для клиента.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_page_size(self, request) -> int:
+        page_size = settings.TASKS_PAGE_SIZE
+        params = _query_params(request)
+        if self.page_size_query_param in params:
+            try:
+                page_size = int(params[self.page_size_query_param])
+            except ValueError:
+                pass
+        return max(1, min(page_size, settings.TASKS_MAX_PAGE_SIZE))
+
+    def page_queryset(self, queryset: QuerySet, cursor: Optional[Tuple[bool, Tuple[datetime, int]]]) -> QuerySet:
+        """Упорядоченный запрос страницы после (или, для обратного курсора, до) позиции курсора."""
+        if cursor is None:
+            return queryset.order_by('deadline', 'id')
+
+        reverse, (deadline, pk) = cursor
+        if reverse:
+            # deadline <= X ограничивает диапазон индекса, вторая часть отсекает уже показанное
+            queryset = queryset.filter(Q(deadline__lte=deadline) & (Q(deadline__lt=deadline) | Q(id__lt=pk)))
+            return queryset.order_by('-deadline', '-id')
+        queryset = queryset.filter(Q(deadline__gte=deadline) & (Q(deadline__gt=deadline) | Q(id__gt=pk)))
+        return queryset.order_by('deadline', 'id')
+
+    def paginate_queryset(self, queryset: QuerySet, request, view=None) -> List[Any]:
+        return self.paginate_querysets([queryset], request)
+
+    def paginate_querysets(self, querysets: Sequence[QuerySet], request) -> List[Any]:
+        """
+        Одна страница из нескольких таблиц с общим порядком (задачи и архив): из каждой
+        берётся не больше страницы от позиции курсора, результаты сливаются по (deadline, id).
+        """
+        cursor = self._start(request)
+        return self._finish([list(page) for page in self._page_slices(querysets, cursor)], cursor)
+
+    async def apaginate_querysets(self, querysets: Sequence[QuerySet], request) -> List[Any]:
+        """То же для async-представлений: страницы читаются асинхронным ORM."""
+        cursor = self._start(request)
+        pages = [[row async for row in page] for page in self._page_slices(querysets, cursor)]
+        return self._finish(pages, cursor)
+
+    def paginate_from_token(self, querysets: Sequence[QuerySet], token: Optional[str], page_size: int) -> List[Any]:
+        """
+        Страница по токену курсора без HTTP-запроса (бот, работающий через ORM).
+        Токены соседних страниц — next_token() и previous_token(); формат тот же, что в ссылках API.
+        """
+        self.request = None
+        self.page_size = max(1, min(page_size, settings.TASKS_MAX_PAGE_SIZE))
+        cursor = self.decode_token(token) if token else None
+        return self._finish([list(page) for page in self._page_slices(querysets, cursor)], cursor)
+
+    def _start(self, request) -> Optional[Tuple[bool, Tuple[datetime, int]]]:
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        return self.decode_cursor(request)
+
+    def _page_slices(self, querysets: Sequence[QuerySet], cursor) -> List[QuerySet]:
+        # Одна лишняя строка показывает, есть ли что-то дальше
+        return [self.page_queryset(queryset, cursor)[:self.page_size + 1] for queryset in querysets]
+
+    def _finish(self, pages: List[List[Any]], cursor) -> List[Any]:
+        reverse = cursor is not None and cursor[0]
+        rows = list(islice(heapq.merge(*pages, key=self._position, reverse=reverse), self.page_size + 1))
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        self.page = rows
+        self.has_next = has_more if not reverse else True
+        self.has_previous = cursor is not None if not reverse else has_more
+        return rows
+
+    def get_paginated_data(self, data) -> dict:
+        return {
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        }
+
+    def get_paginated_response(self, data) -> Response:
+        return Response(self.get_paginated_data(data))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def next_token(self) -> Optional[str]:
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_token(False, self.page[-1])
+
+    def previous_token(self) -> Optional[str]:
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_token(True, self.page[0])
+
+    def get_next_link(self) -> Optional[str]:
+        return self._link(self.next_token())
+
+    def get_previous_link(self) -> Optional[str]:
+        return self._link(self.previous_token())
+
+    def _link(self, token: Optional[str]) -> Optional[str]:
+        if token is None:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, token)
+
+    @staticmethod
+    def _position(row: Any) -> Tuple[datetime, int]:
+        if isinstance(row, dict):
+            return row['deadline'], row['id']
+        return row.deadline, row.id
+
+    def encode_token(self, reverse: bool, row: Any) -> str:
+        deadline, pk = self._position(row)
+        raw = _TOKEN.pack(reverse, (deadline - _EPOCH) // timedelta(microseconds=1), pk)
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def decode_cursor(self, request) -> Optional[Tuple[bool, Tuple[datetime, int]]]:
+        token = _query_params(request).get(self.cursor_query_param)
+        if not token:
+            return None
+        return self.decode_token(token)
+
+    def decode_token(self, token: str) -> Tuple[bool, Tuple[datetime, int]]:
+        try:
+            raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+            if len(raw) == _TOKEN.size:
+                reverse, micros, pk = _TOKEN.unpack(raw)
+                return reverse, (_EPOCH + timedelta(microseconds=micros), pk)
+            # Прежний текстовый формат «направление|ISO-дедлайн|id» — из уже выданных ссылок и кнопок
+            reverse, deadline, pk = raw.decode().split('|')
+            return reverse == '1', (datetime.fromisoformat(deadline), int(pk))
+        except (binascii.Error, UnicodeDecodeError, ValueError, OverflowError):
+            raise NotFound(self.invalid_cursor_message)
@@ -0,0 +1,22 @@
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # orjson необязателен: без него остаётся стандартный JSONRenderer
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer на orjson. Вывод совпадает со стандартным (компактный, без экранирования
+    не-ASCII); для ?indent= и при отсутствии orjson используется обычная реализация.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if orjson is None or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        # Ленивые строки переводов, Decimal и т.п. обрабатывает кодировщик DRF.
+        # Ошибки элементов ListField приходят с int-ключами ({0: [...]}) — json превращает их в строки
+        return orjson.dumps(data, default=self.encoder_class().default, option=orjson.OPT_NON_STR_KEYS)
@@ -1,12 +1,58 @@
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Iterable, List, Optional
 
+from django.conf import settings
 from rest_framework import serializers
 from django.utils import timezone
 
 from .models import Task
-from .services.task_validation import validate_status_or_raise, normalize_deadline_input, validate_telegram_user_id
-from .services.task_crud import create_task, update_task
-from .services.task_status import update_task_status
+from .services.task_validation import (
+    MAX_REMINDER_OFFSET, validate_status_or_raise, normalize_deadline_input, validate_reminder_offsets, validate_telegram_user_id,
+)
+from .services.task_crud import bulk_create_tasks, create_task, update_task
+from .services.task_status import bulk_update_task_status, update_task_status
+
+
+# Колонки для быстрого пути чтения (list/deadline_soon) — см. serialize_task_rows
+TASK_READ_FIELDS = ('id', 'title', 'description', 'deadline', 'status', 'notification_sent', 'reminder_offsets',
+                    'created_at')
+
+
+def serialize_task_rows(rows: Iterable[tuple]) -> List[Dict[str, Any]]:
+    """
+    Быстрый путь чтения: строки values_list(*TASK_READ_FIELDS) в тот же вид, что отдаёт TaskSerializer,
+    без создания моделей и полей DRF. Часовой пояс определяется один раз на весь список.
+    """
+    tz = timezone.get_current_timezone()
+    result = []
+    for task_id, title, description, deadline, status, notification_sent, reminder_offsets, created_at in rows:
+        # Формат DateTimeField DRF: ISO 8601 в текущем поясе, UTC как 'Z'
+        created = created_at.astimezone(tz).isoformat()
+        if created.endswith('+00:00'):
+            created = created[:-6] + 'Z'
+        result.append({
+            'id': task_id,
+            'title': title,
+            'description': description,
+            'deadline_local': deadline.astimezone(tz).strftime('%d.%m.%Y %H:%M') if deadline else None,
+            'status': status,
+            'notification_sent': notification_sent,
+            'reminder_offsets': reminder_offsets,
+            'created_at': created,
+        })
+    return result
+
+
+class TaskBulkListSerializer(serializers.ListSerializer):
+    """Пакетное создание: ошибки возвращаются списком, по одному элементу на каждую задачу."""
+
+    def run_child_validation(self, data: Any) -> Dict[str, Any]:
+        validated = super().run_child_validation(data)
+        if not validated.get('deadline_input'):
+            raise serializers.ValidationError({'deadline_input': ['Обязательное поле.']})
+        return validated
+
+    def create(self, validated_data: List[Dict[str, Any]]) -> List[Task]:
+        return bulk_create_tasks(validated_data)
 
 
 class TaskSerializer(serializers.ModelSerializer):
@@ -16,18 +62,22 @@ class TaskSerializer(serializers.ModelSerializer):
         required=False,
         input_formats=['%d.%m.%Y %H:%M', 'iso-8601']
     )
+    # Минуты до дедлайна, например [1440, 60, 10]; без поля — TASK_REMINDER_OFFSETS
+    reminder_offsets = serializers.ListField(
+        child=serializers.IntegerField(min_value=1, max_value=MAX_REMINDER_OFFSET), required=False)
 
     class Meta:
         model = Task
         fields = [
             'id', 'title', 'description', 'deadline_input', 'deadline_local',
-            'telegram_user_id', 'status', 'notification_sent', 'created_at'
+            'telegram_user_id', 'status', 'notification_sent', 'reminder_offsets', 'created_at'
         ]
         read_only_fields = ['id', 'status', 'notification_sent', 'created_at', 'deadline', 'deadline_local']
         extra_kwargs = {
             'telegram_user_id': {'write_only': True},
             'deadline': {'required': False, 'write_only': True}
         }
+        list_serializer_class = TaskBulkListSerializer
 
     def validate_status(self, value: str) -> str:
         try:
@@ -47,6 +97,12 @@ class TaskSerializer(serializers.ModelSerializer):
         except ValueError as e:
             raise serializers.ValidationError(str(e))
 
+    def validate_reminder_offsets(self, value: List[int]) -> List[int]:
+        try:
+            return validate_reminder_offsets(value)
+        except ValueError as e:
+            raise serializers.ValidationError(str(e))
+
     def get_deadline_local(self, obj: Task) -> Optional[str]:
         if obj.deadline:
             return timezone.localtime(obj.deadline).strftime('%d.%m.%Y %H:%M')
@@ -74,3 +130,22 @@ class TaskStatusUpdateSerializer(serializers.ModelSerializer):
 
     def update(self, instance: Task, validated_data: Dict[str, Any]) -> Task:
         return update_task_status(instance, validated_data['status'])
+
+
+class TaskBulkStatusUpdateSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), allow_empty=False)
+    status = serializers.CharField(required=True)
+
+    def validate_ids(self, value: List[int]) -> List[int]:
+        if len(value) > settings.TASKS_BULK_MAX_ITEMS:
+            raise serializers.ValidationError(f"Не больше {settings.TASKS_BULK_MAX_ITEMS} задач за запрос")
+        return value
+
+    def validate_status(self, value: str) -> str:
+        try:
+            return validate_status_or_raise(value)
+        except ValueError as e:
+            raise serializers.ValidationError(str(e))
+
+    def save(self) -> Dict[str, List[int]]:
+        return bulk_update_task_status(self.validated_data['ids'], self.validated_data['status'])
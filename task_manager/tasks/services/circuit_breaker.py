@@ -0,0 +1,173 @@
+# app/services/circuit_breaker.py
+
+import json
+import logging
+from typing import Dict, List, Optional
+
+import redis
+from django.conf import settings
+
+from ..metrics import TELEGRAM_BREAKER_TRANSITIONS, TELEGRAM_DEFERRED
+
+logger = logging.getLogger(__name__)
+
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+# Все скрипты получают одни и те же ключи:
+# KEYS[1] — состояние, KEYS[2] — метка «открыт до» (TTL = время открытого состояния),
+# KEYS[3] — блокировка пробного запроса, KEYS[4] — счётчик ошибок подряд.
+# Каждый возвращает {разрешено/новое состояние, состояние до вызова}.
+
+# ARGV[1] — TTL блокировки пробного запроса, мс
+_ALLOW_SCRIPT = """
+local state = redis.call('GET', KEYS[1]) or 'closed'
+if state == 'closed' then
+  return {1, state}
+end
+if redis.call('EXISTS', KEYS[2]) == 1 then
+  return {0, state}
+end
+-- Открытое состояние истекло: пропускаем ровно один пробный запрос
+if redis.call('SET', KEYS[3], 1, 'NX', 'PX', ARGV[1]) then
+  redis.call('SET', KEYS[1], 'half_open')
+  return {1, state}
+end
+return {0, state}
+"""
+
+# ARGV[1] — порог ошибок, ARGV[2] — окно забывания ошибок, мс, ARGV[3] — время открытого состояния, мс
+_FAILURE_SCRIPT = """
+local state = redis.call('GET', KEYS[1]) or 'closed'
+if state == 'open' then
+  return {state, state}
+end
+local failures = 0
+if state == 'closed' then
+  failures = redis.call('INCR', KEYS[4])
+  redis.call('PEXPIRE', KEYS[4], ARGV[2])
+end
+-- Неудачная проба в half_open открывает цепь сразу
+if state == 'half_open' or failures >= tonumber(ARGV[1]) then
+  redis.call('SET', KEYS[1], 'open')
+  redis.call('SET', KEYS[2], 1, 'PX', ARGV[3])
+  redis.call('DEL', KEYS[3], KEYS[4])
+  return {'open', state}
+end
+return {state, state}
+"""
+
+_SUCCESS_SCRIPT = """
+local state = redis.call('GET', KEYS[1]) or 'closed'
+if state == 'half_open' then
+  redis.call('SET', KEYS[1], 'closed')
+  redis.call('DEL', KEYS[3])
+end
+redis.call('DEL', KEYS[4])
+if state == 'half_open' then
+  return {'closed', state}
+end
+return {state, state}
+"""
+
+
+class TelegramCircuitBreaker:
+    """
+    Общий для всех воркеров автомат closed → open → half_open → closed в Redis
+    вокруг вызовов Bot API.
+
+    closed: вызовы идут, ошибки подряд считаются; после порога цепь размыкается.
+    open: вызовы не делаются вовсе (напоминания откладываются в очередь deferred).
+    half_open: по истечении open_seconds один воркер делает пробный вызов;
+    успех замыкает цепь, ошибка снова размыкает её.
+    """
+
+    prefix = 'telegram:breaker'
+
+    def __init__(self, client: redis.Redis,
+                 failure_threshold: Optional[int] = None,
+                 failure_window: Optional[float] = None,
+                 open_seconds: Optional[float] = None) -> None:
+        self.client = client
+        self.failure_threshold = failure_threshold or settings.TELEGRAM_BREAKER_FAILURE_THRESHOLD
+        self.failure_window = failure_window or settings.TELEGRAM_BREAKER_FAILURE_WINDOW
+        self.open_seconds = open_seconds or settings.TELEGRAM_BREAKER_OPEN_SECONDS
+        self.keys = [f'{self.prefix}:{name}' for name in ('state', 'open', 'probe', 'failures')]
+        self._allow = client.register_script(_ALLOW_SCRIPT)
+        self._failure = client.register_script(_FAILURE_SCRIPT)
+        self._success = client.register_script(_SUCCESS_SCRIPT)
+
+    def allow_request(self) -> bool:
+        """Можно ли сейчас вызывать Telegram. В half_open разрешает только один пробный вызов."""
+        # Проба держит блокировку не дольше одного запроса с запасом
+        probe_ms = int((settings.TELEGRAM_REQUEST_TIMEOUT + 5) * 1000)
+        allowed, before = self._allow(keys=self.keys, args=[probe_ms])
+        if allowed and self._decode(before) != CLOSED:
+            self._transition(self._decode(before), HALF_OPEN)
+        return bool(allowed)
+
+    def record_failure(self) -> None:
+        """Telegram недоступен: таймаут, сетевая ошибка или 5xx."""
+        after, before = self._failure(
+            keys=self.keys,
+            args=[self.failure_threshold, int(self.failure_window * 1000), int(self.open_seconds * 1000)],
+        )
+        self._transition(self._decode(before), self._decode(after))
+
+    def record_success(self) -> None:
+        """Telegram ответил (в том числе 4xx — это ошибка запроса, а не недоступность)."""
+        after, before = self._success(keys=self.keys)
+        self._transition(self._decode(before), self._decode(after))
+
+    def state(self) -> str:
+        """Текущее состояние; open с истёкшей меткой — уже half_open: можно пробовать."""
+        state, is_open = self.client.pipeline().get(self.keys[0]).exists(self.keys[1]).execute()
+        state = self._decode(state) if state else CLOSED
+        if state == OPEN and not is_open:
+            return HALF_OPEN
+        return state
+
+    @staticmethod
+    def _decode(value) -> str:
+        return value.decode() if isinstance(value, bytes) else value
+
+    def _transition(self, before: str, after: str) -> None:
+        if before == after:
+            return
+        TELEGRAM_BREAKER_TRANSITIONS.labels(after).inc()
+        if after == OPEN:
+            logger.warning(f"Telegram circuit breaker: {before} -> open, отправка приостановлена "
+                           f"на {self.open_seconds} с")
+        else:
+            logger.info(f"Telegram circuit breaker: {before} -> {after}")
+
+
+DEFERRED_KEY = 'telegram:deferred'
+
+# LPOP с количеством появился только в Redis 6.2 — LRANGE + LTRIM атомарно работают и на 5.x.
+# ARGV[1] — сколько забрать
+_TAKE_SCRIPT = """
+local items = redis.call('LRANGE', KEYS[1], 0, tonumber(ARGV[1]) - 1)
+if #items > 0 then
+  redis.call('LTRIM', KEYS[1], #items, -1)
+end
+return items
+"""
+
+
+def defer_notifications(client: redis.Redis, notifications: List[Dict]) -> None:
+    """Откладывает напоминания, пока цепь разомкнута: они ждут в Redis, а не занимают воркеры."""
+    if not notifications:
+        return
+    client.rpush(DEFERRED_KEY, *(json.dumps(item) for item in notifications))
+    TELEGRAM_DEFERRED.labels('parked').inc(len(notifications))
+
+
+def take_deferred(client: redis.Redis, count: int) -> List[Dict]:
+    """Забирает из очереди не больше count отложенных напоминаний, старые первыми."""
+    items = client.register_script(_TAKE_SCRIPT)(keys=[DEFERRED_KEY], args=[count])
+    TELEGRAM_DEFERRED.labels('drained').inc(len(items))
+    return [json.loads(item) for item in items]
+
+
+def deferred_count(client: redis.Redis) -> int:
+    return client.llen(DEFERRED_KEY)
@@ -0,0 +1,118 @@
+# app/services/rate_limit.py
+
+import logging
+from typing import Optional
+
+import redis
+import redis.asyncio as aioredis
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Атомарно пополняет и списывает токены сразу из нескольких корзин.
+# KEYS[1] — ключ паузы (после 429), KEYS[2..] — корзины; ARGV — пары (rate, capacity) для корзин.
+# Возвращает 0, если токены списаны, иначе сколько миллисекунд подождать.
+_ACQUIRE_SCRIPT = """
+local pause = redis.call('PTTL', KEYS[1])
+if pause > 0 then
+  return pause
+end
+
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local tokens = {}
+local wait = 0
+
+for i = 2, #KEYS do
+  local rate = tonumber(ARGV[2 * i - 3])
+  local capacity = tonumber(ARGV[2 * i - 2])
+  local bucket = redis.call('HMGET', KEYS[i], 'tokens', 'ts')
+  local available = tonumber(bucket[1]) or capacity
+  local ts = tonumber(bucket[2]) or now
+  available = math.min(capacity, available + (now - ts) * rate / 1000)
+  tokens[i] = available
+  if available < 1 then
+    wait = math.max(wait, math.ceil((1 - available) * 1000 / rate))
+  end
+end
+
+if wait > 0 then
+  return wait
+end
+
+for i = 2, #KEYS do
+  local rate = tonumber(ARGV[2 * i - 3])
+  local capacity = tonumber(ARGV[2 * i - 2])
+  redis.call('HSET', KEYS[i], 'tokens', tokens[i] - 1, 'ts', now)
+  redis.call('PEXPIRE', KEYS[i], math.ceil(capacity * 1000 / rate) + 1000)
+end
+return 0
+"""
+
+
+class TelegramRateLimiter:
+    """
+    Общий для всех воркеров token bucket в Redis: глобальный лимит бота
+    и отдельный лимит на каждый чат.
+    """
+
+    prefix = 'telegram:rate'
+
+    def __init__(self, client: redis.Redis,
+                 global_rate: Optional[float] = None,
+                 per_chat_rate: Optional[float] = None) -> None:
+        self.client = client
+        self.global_rate = global_rate or settings.TELEGRAM_GLOBAL_RATE
+        self.per_chat_rate = per_chat_rate or settings.TELEGRAM_PER_CHAT_RATE
+        self._acquire = client.register_script(_ACQUIRE_SCRIPT)
+
+    def try_acquire(self, chat_id: int) -> float:
+        """Пытается занять слот на отправку в чат. Возвращает 0 или сколько секунд подождать."""
+        wait_ms = self._acquire(
+            keys=[f'{self.prefix}:pause', f'{self.prefix}:global', f'{self.prefix}:chat:{chat_id}'],
+            args=[self.global_rate, self.global_rate, self.per_chat_rate, self.per_chat_rate],
+        )
+        return int(wait_ms) / 1000
+
+    def pause(self, seconds: float) -> None:
+        """Останавливает все отправки на время, которое Telegram указал в retry_after."""
+        logger.warning(f"Telegram ограничил частоту запросов, пауза отправки на {seconds} с")
+        self.client.set(f'{self.prefix}:pause', 1, px=int(seconds * 1000))
+
+
+class AsyncTelegramRateLimiter:
+    """
+    Та же глобальная корзина и пауза, что у TelegramRateLimiter, для asyncio-клиента бота:
+    ответы бота и напоминания из Celery расходуют один лимит Telegram на всех процессах.
+    Лимит на чат бот держит сам (telegram_bot/outbox.py) — там разрешён всплеск.
+    """
+
+    prefix = TelegramRateLimiter.prefix
+
+    def __init__(self, client: aioredis.Redis, global_rate: Optional[float] = None) -> None:
+        self.client = client
+        self.global_rate = global_rate or settings.TELEGRAM_GLOBAL_RATE
+        self._acquire = client.register_script(_ACQUIRE_SCRIPT)
+        self._available = True
+
+    async def try_acquire(self) -> float:
+        """Занимает токен общей корзины. Возвращает 0 или сколько секунд подождать; без Redis — 0."""
+        try:
+            wait_ms = await self._acquire(
+                keys=[f'{self.prefix}:pause', f'{self.prefix}:global'],
+                args=[self.global_rate, self.global_rate],
+            )
+        except aioredis.RedisError as e:
+            if self._available:
+                logger.warning(f"Общий лимит Telegram недоступен, действует только лимит процесса: {e}")
+            self._available = False
+            return 0.0
+        self._available = True
+        return int(wait_ms) / 1000
+
+    async def pause(self, seconds: float) -> None:
+        """Останавливает отправку во всех процессах, включая напоминания из Celery."""
+        try:
+            await self.client.set(f'{self.prefix}:pause', 1, px=int(seconds * 1000))
+        except aioredis.RedisError as e:
+            logger.warning(f"Не удалось передать паузу Telegram другим процессам: {e}")
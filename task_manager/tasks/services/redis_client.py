@@ -0,0 +1,16 @@
+# app/services/redis_client.py
+
+from functools import lru_cache
+
+import redis
+from django.conf import settings
+
+
+@lru_cache(maxsize=None)
+def _client(url: str) -> redis.Redis:
+    return redis.Redis.from_url(url)
+
+
+def get_redis() -> redis.Redis:
+    """Общий для процесса клиент Redis (пул соединений внутри клиента)."""
+    return _client(settings.REDIS_URL)
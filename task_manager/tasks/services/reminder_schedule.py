@@ -0,0 +1,84 @@
+# app/services/reminder_schedule.py
+
+import logging
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+import redis
+from django.db import transaction
+from django.utils import timezone
+from ..models import Task
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Sorted set: member — ID задачи, score — unix-время, когда пора отправить напоминание
+SCHEDULE_KEY = 'reminders:schedule'
+
+# Забирает и удаляет из расписания наступившие напоминания одной атомарной операцией,
+# поэтому параллельные диспетчеры не получат одну задачу дважды.
+_POP_DUE_SCRIPT = """
+local ids = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[2])
+if #ids > 0 then
+  redis.call('ZREM', KEYS[1], unpack(ids))
+end
+return ids
+"""
+
+
+def sync_reminders(tasks: Iterable[Task]) -> None:
+    """
+    Ставит, переносит или снимает напоминания по next_notification_at задач — один round-trip в Redis.
+    Ошибки Redis не пробрасываются: пропущенное напоминание подберёт сверка check_deadlines.
+    """
+    tasks = list(tasks)
+    if not tasks:
+        return
+    scheduled = {task.id: task.next_notification_at.timestamp() for task in tasks if task.next_notification_at}
+    cancelled = [task.id for task in tasks if task.id not in scheduled]
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        if scheduled:
+            pipe.zadd(SCHEDULE_KEY, scheduled)
+        if cancelled:
+            pipe.zrem(SCHEDULE_KEY, *cancelled)
+        pipe.execute()
+    except redis.RedisError as e:
+        logger.warning(f"Не удалось обновить расписание напоминаний задач {[task.id for task in tasks]}: {e}")
+
+
+def sync_reminder(task: Task) -> None:
+    sync_reminders([task])
+
+
+def sync_reminders_on_commit(tasks: Iterable[Task]) -> None:
+    """Обновляет расписание только после коммита, чтобы диспетчер не увидел незакоммиченные задачи."""
+    tasks = list(tasks)
+    transaction.on_commit(lambda: sync_reminders(tasks))
+
+
+def sync_reminder_on_commit(task: Task) -> None:
+    sync_reminders_on_commit([task])
+
+
+def reschedule_claimed(claimed: Iterable[Dict[str, Any]]) -> None:
+    """После захвата (claim_due_tasks): следующее напоминание задачи — в расписание, без следующего — снять."""
+    sync_reminders(Task(id=row['id'], next_notification_at=row['next_notification_at']) for row in claimed)
+
+
+def cancel_reminders(task_ids: Iterable[int]) -> None:
+    task_ids = list(task_ids)
+    if not task_ids:
+        return
+    try:
+        get_redis().zrem(SCHEDULE_KEY, *task_ids)
+    except redis.RedisError as e:
+        logger.warning(f"Не удалось снять напоминания задач {task_ids}: {e}")
+
+
+def pop_due_reminders(limit: int, now: Optional[datetime] = None) -> List[int]:
+    """Забирает из расписания до limit задач, напоминание по которым уже пора отправить."""
+    now = now or timezone.now()
+    client = get_redis()
+    ids = client.register_script(_POP_DUE_SCRIPT)(keys=[SCHEDULE_KEY], args=[now.timestamp(), limit])
+    return [int(task_id) for task_id in ids]
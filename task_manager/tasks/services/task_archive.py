@@ -0,0 +1,70 @@
+# app/services/task_archive.py
+
+import logging
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import QuerySet
+from django.utils import timezone
+from ..models import ArchivedTask, Task
+from .reminder_schedule import cancel_reminders
+from .task_versions import bump_versions_on_commit
+
+logger = logging.getLogger(__name__)
+
+# Поля, переносимые в архив как есть
+ARCHIVE_FIELDS = ('id', 'title', 'description', 'deadline', 'telegram_user_id', 'status',
+                  'notification_sent', 'reminder_offsets', 'created_at', 'completed_at')
+
+
+def get_archivable_tasks(cutoff: datetime) -> List[QuerySet]:
+    """
+    Задачи, выполненные до cutoff, и любые задачи с дедлайном до cutoff — двумя запросами:
+    каждый читает диапазон своего индекса (task_completed_idx, task_deadline_idx).
+    Одно условие через OR индексами не покрывается и проходит по всей таблице.
+    """
+    return [
+        Task.objects.filter(status=Task.Status.DONE, completed_at__lt=cutoff).order_by('completed_at'),
+        Task.objects.filter(deadline__lt=cutoff).order_by('deadline'),
+    ]
+
+
+def _archive_batch(tasks: QuerySet, batch_size: int) -> int:
+    """Переносит в архив первые batch_size задач выборки одной транзакцией."""
+    with transaction.atomic():
+        rows = list(tasks.values(*ARCHIVE_FIELDS)[:batch_size])
+        if not rows:
+            return 0
+        ids = [row['id'] for row in rows]
+        ArchivedTask.objects.bulk_create([ArchivedTask(**row) for row in rows])
+        Task.objects.filter(id__in=ids).delete()
+        transaction.on_commit(lambda: cancel_reminders(ids))
+        bump_versions_on_commit({row['telegram_user_id'] for row in rows}, ids)
+    return len(rows)
+
+
+def archive_tasks(older_than: Optional[timedelta] = None, batch_size: Optional[int] = None,
+                  now: Optional[datetime] = None) -> int:
+    """
+    Переносит старые задачи в ArchivedTask пачками по batch_size: каждая пачка — отдельная
+    транзакция (INSERT в архив + DELETE из Task), в памяти только одна пачка.
+    Перенесённые строки удаляются, поэтому каждая пачка снова берёт начало диапазона по индексу,
+    а не пропускает уже просмотренное. Возвращает число перенесённых задач.
+    """
+    older_than = older_than if older_than is not None else timedelta(days=settings.TASKS_ARCHIVE_AFTER_DAYS)
+    batch_size = batch_size or settings.TASKS_ARCHIVE_BATCH_SIZE
+    cutoff = (now or timezone.now()) - older_than
+
+    archived = 0
+    for tasks in get_archivable_tasks(cutoff):
+        while True:
+            moved = _archive_batch(tasks, batch_size)
+            archived += moved
+            if moved:
+                logger.info(f"Перенесено в архив задач: {moved} (всего {archived})")
+            if moved < batch_size:
+                break
+
+    return archived
@@ -1,52 +1,141 @@
 # app/services/task_crud.py
 
 import logging
-from django.db import DatabaseError
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DatabaseError, transaction
 from rest_framework.exceptions import APIException, ValidationError
-from typing import Dict, Any
+from typing import Dict, Any, List
 from ..models import Task
+from .reminder_schedule import sync_reminder, sync_reminder_on_commit, sync_reminders_on_commit
+from .task_notifications import schedule_next_notification
 from .task_validation import normalize_deadline_input
+from .task_versions import bump_versions, bump_versions_on_commit
 
 logger = logging.getLogger(__name__)
 
 
-def create_task(validated_data: Dict[str, Any]) -> Task:
+def _prepare_new_task(validated_data: Dict[str, Any]) -> Dict[str, Any]:
     deadline = validated_data.pop('deadline_input', None)
     if deadline:
         validated_data['deadline'] = normalize_deadline_input(deadline)
 
     validated_data['status'] = Task.Status.UNDONE
+    return validated_data
+
+
+def _new_task(validated_data: Dict[str, Any]) -> Task:
+    task = Task(**_prepare_new_task(validated_data))
+    schedule_next_notification(task)
+    return task
+
+
+def _publish_change(task: Task) -> None:
+    sync_reminder(task)
+    bump_versions([task.telegram_user_id], [task.id])
+
+
+async def apublish_task_change(task: Task) -> None:
+    """
+    Для async-сервисов: вне транзакции запись уже зафиксирована, поэтому расписание и версии
+    обновляются сразу. Клиент Redis синхронный — вызов уходит в пул потоков, не блокируя event loop.
+    """
+    await sync_to_async(_publish_change, thread_sensitive=False)(task)
+
+
+def create_task(validated_data: Dict[str, Any]) -> Task:
+    task = _new_task(validated_data)
 
     try:
-        task = Task.objects.create(**validated_data)
+        task.save(force_insert=True)
     except DatabaseError as e:
         logger.exception(f"Ошибка при создании задачи: {e}")
         raise APIException("Не удалось создать задачу. Повторите попытку позже.")
 
+    sync_reminder_on_commit(task)
+    bump_versions_on_commit([task.telegram_user_id], [task.id])
     logger.info(f"Создана задача [ID:{task.id}] для TG user {task.telegram_user_id} со сроком {task.deadline}")
     return task
 
 
+async def acreate_task(validated_data: Dict[str, Any]) -> Task:
+    """Async-вариант create_task (ASGI): те же правила, запись через асинхронный ORM."""
+    task = _new_task(validated_data)
+
+    try:
+        await task.asave(force_insert=True)
+    except DatabaseError as e:
+        logger.exception(f"Ошибка при создании задачи: {e}")
+        raise APIException("Не удалось создать задачу. Повторите попытку позже.")
+
+    await apublish_task_change(task)
+    logger.info(f"Создана задача [ID:{task.id}] для TG user {task.telegram_user_id} со сроком {task.deadline}")
+    return task
+
+
+def bulk_create_tasks(validated_items: List[Dict[str, Any]]) -> List[Task]:
+    """
+    Создаёт пачку уже провалидированных задач: bulk_create чанками в одной транзакции.
+    Либо создаются все задачи, либо ни одной.
+    """
+    tasks = [
+        Task(
+            title=item['title'],
+            description=item.get('description', ''),
+            telegram_user_id=item['telegram_user_id'],
+            # deadline_input уже приведён к UTC валидатором сериализатора
+            deadline=item['deadline_input'],
+            status=Task.Status.UNDONE,
+            **({'reminder_offsets': item['reminder_offsets']} if 'reminder_offsets' in item else {}),
+        )
+        for item in validated_items
+    ]
+    for task in tasks:
+        schedule_next_notification(task)
+
+    try:
+        with transaction.atomic():
+            created = Task.objects.bulk_create(tasks, batch_size=settings.TASKS_BULK_CREATE_BATCH_SIZE)
+    except DatabaseError as e:
+        logger.exception(f"Ошибка при пакетном создании задач: {e}")
+        raise APIException("Не удалось создать задачи. Повторите попытку позже.")
+
+    sync_reminders_on_commit(created)
+    bump_versions_on_commit((task.telegram_user_id for task in created), (task.id for task in created))
+    logger.info(f"Создано задач пакетом: {len(created)}")
+    return created
+
+
 def update_task(instance: Task, validated_data: Dict[str, Any]) -> Task:
     deadline = validated_data.pop('deadline_input', None)
     if deadline:
         validated_data['deadline'] = normalize_deadline_input(deadline)
 
+    old_deadline = instance.deadline
     changed = False
     for attr, value in validated_data.items():
         if getattr(instance, attr) != value:
             setattr(instance, attr, value)
             changed = True
 
+    if instance.deadline != old_deadline:
+        # Дедлайн перенесён — напоминание по новому сроку ещё не отправлялось
+        instance.notification_sent = False
+
     if not changed:
         logger.info(f"Обновление задачи ID {instance.id} не требуется — данные не изменились.")
         raise ValidationError({"detail": "Нет изменений для сохранения."})
 
+    # Дедлайн, статус или набор напоминаний могли измениться
+    schedule_next_notification(instance)
+
     try:
         instance.save()
     except DatabaseError as e:
         logger.exception(f"Ошибка при обновлении задачи ID {instance.id}: {e}")
         raise APIException("Не удалось обновить задачу. Повторите попытку позже.")
 
+    sync_reminder_on_commit(instance)
+    bump_versions_on_commit([instance.telegram_user_id], [instance.id])
     logger.info(f"Обновлена задача ID {instance.id}")
     return instance
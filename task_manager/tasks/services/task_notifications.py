@@ -0,0 +1,116 @@
+# app/services/task_notifications.py
+
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from django.db import connection, transaction
+from django.db.models import F, QuerySet
+from django.db.models.functions import Mod
+from django.utils import timezone
+from ..models import Task
+from .task_versions import bump_versions_on_commit
+
+logger = logging.getLogger(__name__)
+
+def reminder_times(deadline: datetime, offsets: Iterable[int]) -> List[datetime]:
+    """Моменты напоминаний задачи по возрастанию; offsets — минуты до дедлайна."""
+    return sorted(deadline - timedelta(minutes=minutes) for minutes in offsets)
+
+
+def next_reminder_offset(deadline: datetime, offsets: Iterable[int], moment: datetime) -> Optional[int]:
+    """Смещение (минут до дедлайна) первого напоминания позже moment; None — напоминаний больше нет."""
+    return max((minutes for minutes in offsets if deadline - timedelta(minutes=minutes) > moment), default=None)
+
+
+def next_reminder_after(deadline: datetime, offsets: Iterable[int], moment: datetime) -> Optional[datetime]:
+    """Первое напоминание позже moment; None — напоминаний больше нет."""
+    minutes = next_reminder_offset(deadline, offsets, moment)
+    return deadline - timedelta(minutes=minutes) if minutes is not None else None
+
+
+def schedule_next_notification(task: Task, now: Optional[datetime] = None) -> Optional[datetime]:
+    """
+    Пересчитывает task.next_notification_at по дедлайну, статусу и набору напоминаний (без сохранения).
+    Уже прошедшие напоминания пропускаются. Если прошли все, а дедлайн ещё впереди и напоминание
+    не отправлялось, последнее из них наступает сразу — задача с дедлайном через 5 минут
+    получает напоминание при создании, как и раньше.
+    """
+    now = now or timezone.now()
+    task.next_notification_at = None
+    if task.status == Task.Status.UNDONE and task.deadline > now:
+        times = reminder_times(task.deadline, task.reminder_offsets)
+        task.next_notification_at = next_reminder_after(task.deadline, task.reminder_offsets, now)
+        if task.next_notification_at is None and times and not task.notification_sent:
+            task.next_notification_at = times[-1]
+    return task.next_notification_at
+
+
+def get_due_tasks(now: Optional[datetime] = None) -> QuerySet:
+    """
+    Задачи, по которым пора отправить напоминание: next_notification_at уже наступил.
+    У выполненных задач и задач без оставшихся напоминаний он пуст, поэтому это один
+    диапазон по частичному индексу task_next_notification_idx — сколько бы напоминаний
+    ни было у задачи, в индексе она занимает одну строку. Порядок — тоже по индексу:
+    сначала самые давно наступившие напоминания (сортировка по дедлайну заставила бы
+    планировщик выбрать task_deadline_idx и пройти его целиком).
+    """
+    now = now or timezone.now()  # Уже в UTC благодаря USE_TZ=True
+    return Task.objects.filter(next_notification_at__lte=now).order_by('next_notification_at')
+
+
+def in_shard(queryset: QuerySet, shard: int, shards: int) -> QuerySet:
+    """
+    Задачи шарда shard из shards. Ключ — telegram_user_id, поэтому напоминания
+    одного чата всегда обрабатывает один шард.
+    """
+    return queryset.alias(shard_key=Mod('telegram_user_id', shards)).filter(shard_key=shard)
+
+
+def claim_due_tasks(limit: int, now: Optional[datetime] = None,
+                    task_ids: Optional[Iterable[int]] = None,
+                    shard: Optional[Tuple[int, int]] = None) -> List[Dict[str, Any]]:
+    """
+    Атомарно захватывает до limit задач, по которым пора отправить напоминание:
+    один SELECT и UPDATE на каждое следующее смещение в пачке, без загрузки моделей.
+    Захват переносит next_notification_at на следующее напоминание задачи или обнуляет его,
+    если напоминаний не осталось.
+    Возвращает только строки, захваченные этим вызовом — параллельные сканеры
+    получают непересекающиеся наборы. В каждой строке remind_at — момент
+    отправляемого напоминания, next_notification_at — момент следующего.
+    task_ids ограничивает захват задачами из расписания напоминаний,
+    shard=(номер, всего шардов) — задачами одного шарда (см. in_shard).
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        due = get_due_tasks(now)
+        if task_ids is not None:
+            due = due.filter(id__in=list(task_ids))
+        if shard is not None:
+            due = in_shard(due, *shard)
+        if connection.features.has_select_for_update_skip_locked:
+            # Строки, уже захваченные другим сканером, пропускаем, а не ждём
+            due = due.select_for_update(skip_locked=True)
+        # На SQLite блокировок строк нет, но транзакция сериализуема: конкурирующий
+        # писатель между нашими SELECT и UPDATE приведёт к ошибке, а не к дублю.
+        claimed = list(due.values('id', 'telegram_user_id', 'title', 'deadline', 'reminder_offsets',
+                                  'next_notification_at')[:limit])
+        by_offset: Dict[Optional[int], List[int]] = defaultdict(list)
+        for row in claimed:
+            minutes = next_reminder_offset(row['deadline'], row.pop('reminder_offsets'), now)
+            row['remind_at'] = row['next_notification_at']
+            row['next_notification_at'] = row['deadline'] - timedelta(minutes=minutes) if minutes is not None else None
+            by_offset[minutes].append(row['id'])
+        # Следующее напоминание — дедлайн минус смещение, поэтому задачи с одинаковым смещением
+        # переносятся одним UPDATE; различных смещений в пачке единицы, а не по одному на задачу
+        for minutes, ids in by_offset.items():
+            Task.objects.filter(id__in=ids).update(
+                next_notification_at=F('deadline') - timedelta(minutes=minutes) if minutes is not None else None,
+                notification_sent=True,
+            )
+        if claimed:
+            # notification_sent виден в API — ETag и кэши этих задач устарели
+            bump_versions_on_commit((row['telegram_user_id'] for row in claimed), (row['id'] for row in claimed))
+
+    return claimed
@@ -1,14 +1,25 @@
 # app/services/task_status.py
 
 import logging
-from django.db import transaction, DatabaseError
+from typing import Dict, Iterable, List
+from asgiref.sync import sync_to_async
+from django.db import connection, transaction, DatabaseError
+from django.utils import timezone
 from rest_framework.exceptions import APIException
 from ..models import Task
+from .reminder_schedule import sync_reminder_on_commit, sync_reminders_on_commit
+from .task_notifications import schedule_next_notification
 from .task_validation import validate_status_or_raise
+from .task_versions import bump_versions_on_commit
 
 logger = logging.getLogger(__name__)
 
 
+def _completed_at(status: str):
+    """Момент выполнения для нового статуса: сейчас для done, None для возврата в работу."""
+    return timezone.now() if status == Task.Status.DONE else None
+
+
 def update_task_status(task: Task, new_status: str) -> Task:
     """
     Обновляет статус задачи, если он изменился и новый статус валиден.
@@ -20,10 +31,70 @@ def update_task_status(task: Task, new_status: str) -> Task:
     try:
         with transaction.atomic():
             task.status = new_status
-            task.save(update_fields=['status'])
+            task.completed_at = _completed_at(new_status)
+            schedule_next_notification(task)
+            task.save(update_fields=['status', 'completed_at', 'next_notification_at'])
+            sync_reminder_on_commit(task)
+            bump_versions_on_commit([task.telegram_user_id], [task.id])
     except DatabaseError as e:
         logger.exception(f"Ошибка при обновлении статуса задачи ID {task.id}: {e}")
         raise APIException("Не удалось обновить статус задачи. Повторите попытку позже.")
 
     logger.info("Статус задачи ID %s обновлён: '%s' → '%s'", task.id, old_status, new_status)
     return task
+
+
+async def aupdate_task_status(task: Task, new_status: str) -> Task:
+    """
+    Async-вариант update_task_status (ASGI): тот же сервис в потоке ORM — одна транзакция,
+    расписание напоминаний и версии обновляются после коммита, как и на синхронном пути.
+    """
+    return await sync_to_async(update_task_status)(task, new_status)
+
+
+def bulk_update_task_status(task_ids: Iterable[int], new_status: str) -> Dict[str, List[int]]:
+    """
+    Переводит задачи в new_status одним условным UPDATE.
+    Возвращает ID, разложенные на changed (статус изменён), unchanged (уже был таким) и missing (нет задачи).
+    """
+    validate_status_or_raise(new_status)
+    task_ids = sorted(set(task_ids))
+
+    try:
+        with transaction.atomic():
+            rows = Task.objects.filter(id__in=task_ids).order_by()
+            if connection.features.has_select_for_update:
+                rows = rows.select_for_update()
+            # Читаем до UPDATE: после него уже не различить изменённые и совпадавшие задачи
+            current = {
+                row['id']: row
+                for row in rows.values('id', 'status', 'telegram_user_id', 'deadline', 'notification_sent',
+                                       'reminder_offsets')
+            }
+            Task.objects.filter(id__in=task_ids).exclude(status=new_status).update(
+                status=new_status, completed_at=_completed_at(new_status), next_notification_at=None)
+
+            changed = [row for row in current.values() if row['status'] != new_status]
+            tasks = [
+                Task(id=row['id'], deadline=row['deadline'], notification_sent=row['notification_sent'],
+                     reminder_offsets=row['reminder_offsets'], telegram_user_id=row['telegram_user_id'],
+                     status=new_status)
+                for row in changed
+            ]
+            # Вернувшимся в работу задачам напоминания пересчитываются по дедлайну
+            reopened = [task for task in tasks if schedule_next_notification(task)]
+            Task.objects.bulk_update(reopened, ['next_notification_at'])
+            sync_reminders_on_commit(tasks)
+            bump_versions_on_commit((row['telegram_user_id'] for row in changed), (row['id'] for row in changed))
+    except DatabaseError as e:
+        logger.exception(f"Ошибка при пакетном обновлении статуса задач {task_ids}: {e}")
+        raise APIException("Не удалось обновить статус задач. Повторите попытку позже.")
+
+    result = {
+        'changed': [row['id'] for row in changed],
+        'unchanged': [task_id for task_id, row in current.items() if row['status'] == new_status],
+        'missing': [task_id for task_id in task_ids if task_id not in current],
+    }
+    logger.info("Пакетное обновление статуса → '%s': изменено %s, без изменений %s, не найдено %s",
+                new_status, result['changed'], result['unchanged'], result['missing'])
+    return result
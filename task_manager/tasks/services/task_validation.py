@@ -4,11 +4,14 @@ import logging
 import pytz
 from django.utils import timezone
 from rest_framework.exceptions import ValidationError
-from task_manager import settings
+from django.conf import settings
 from ..models import Task
 
 logger = logging.getLogger(__name__)
 
+# Самое раннее напоминание — за год до дедлайна (минут)
+MAX_REMINDER_OFFSET = 365 * 24 * 60
+
 
 def validate_status_or_raise(value: str, current_status: str = None) -> str:
     allowed_choices = Task.Status.choices
@@ -48,3 +51,16 @@ def validate_telegram_user_id(value: int) -> int:
         logger.warning(f"Валидация telegram_user_id не пройдена: {error_msg} (введено: {value})")
         raise ValidationError({"telegram_user_id": [error_msg]})
     return value
+
+
+def validate_reminder_offsets(value: list) -> list:
+    """Набор напоминаний в минутах до дедлайна: без повторов, от раннего к позднему."""
+    if len(value) > settings.TASK_MAX_REMINDERS:
+        error_msg = f"Не больше {settings.TASK_MAX_REMINDERS} напоминаний на задачу"
+        logger.warning(f"Валидация напоминаний не пройдена: {error_msg} (введено: {value})")
+        raise ValidationError({"reminder_offsets": [error_msg]})
+    if any(not 0 < minutes <= MAX_REMINDER_OFFSET for minutes in value):
+        error_msg = f"Напоминание задаётся в минутах до дедлайна: от 1 до {MAX_REMINDER_OFFSET}"
+        logger.warning(f"Валидация напоминаний не пройдена: {error_msg} (введено: {value})")
+        raise ValidationError({"reminder_offsets": [error_msg]})
+    return sorted(set(value), reverse=True)
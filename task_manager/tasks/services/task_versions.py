@@ -0,0 +1,92 @@
+# app/services/task_versions.py
+
+import logging
+import secrets
+from typing import Iterable, Optional
+
+import redis
+from django.conf import settings
+from django.db import transaction
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Счётчики изменений: задач пользователя (списки) и отдельной задачи (карточка).
+# Бот сравнивает USER_VERSION_KEY с версией закэшированного списка,
+# поэтому его формат продублирован в telegram_bot/core.py.
+USER_VERSION_KEY = 'tasks:user_version:{user_id}'
+TASK_VERSION_KEY = 'tasks:task_version:{task_id}'
+# Метка недавней записи живёт REPLICA_PIN_SECONDS: пока она есть, читать надо из основной БД
+RECENT_WRITE_KEY = '{key}:recent'
+
+
+def _version_base() -> int:
+    """
+    Случайное начало счётчика (SET NX перед INCR и перед чтением). Счётчик, потерянный при FLUSH,
+    вытеснении или переключении Redis, начнётся с другого числа — ETag, выданный до потери, не совпадёт.
+    """
+    return secrets.randbits(48)
+
+
+def bump_versions(user_ids: Iterable[int], task_ids: Iterable[int] = ()) -> None:
+    """Инвалидирует кэши и ETag пользователей и задач: одна пачка INCR за один round-trip."""
+    keys = {USER_VERSION_KEY.format(user_id=user_id) for user_id in user_ids}
+    keys.update(TASK_VERSION_KEY.format(task_id=task_id) for task_id in task_ids)
+    if not keys:
+        return
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        for key in keys:
+            pipe.set(key, _version_base(), nx=True)
+            pipe.incr(key)
+            if settings.DATABASE_REPLICAS:
+                pipe.set(RECENT_WRITE_KEY.format(key=key), 1, ex=settings.REPLICA_PIN_SECONDS)
+        pipe.execute()
+    except redis.RedisError as e:
+        logger.warning(f"Не удалось обновить версии {sorted(keys)}: {e}")
+
+
+def bump_versions_on_commit(user_ids: Iterable[int], task_ids: Iterable[int] = ()) -> None:
+    """Версия меняется после коммита, иначе кэш успеет заполниться старыми данными."""
+    user_ids, task_ids = list(user_ids), list(task_ids)
+    transaction.on_commit(lambda: bump_versions(user_ids, task_ids))
+
+
+def _get_version(key: str) -> Optional[int]:
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        pipe.set(key, _version_base(), nx=True)
+        pipe.get(key)
+        return int(pipe.execute()[-1])
+    except redis.RedisError as e:
+        logger.warning(f"Не удалось прочитать версию {key}: {e}")
+        return None
+
+
+def get_user_version(user_id: int) -> Optional[int]:
+    """Текущая версия задач пользователя или None, если Redis недоступен."""
+    return _get_version(USER_VERSION_KEY.format(user_id=user_id))
+
+
+def get_task_version(task_id: int) -> Optional[int]:
+    """Текущая версия задачи или None, если Redis недоступен."""
+    return _get_version(TASK_VERSION_KEY.format(task_id=task_id))
+
+
+def recently_written(user_id: Optional[int] = None, task_id: Optional[int] = None) -> bool:
+    """
+    Менялись ли задачи пользователя (или задача) за последние REPLICA_PIN_SECONDS —
+    тогда реплики могут их ещё не видеть. Без реплик и при недоступном Redis — False.
+    """
+    if not settings.DATABASE_REPLICAS:
+        return False
+    keys = []
+    if user_id is not None:
+        keys.append(RECENT_WRITE_KEY.format(key=USER_VERSION_KEY.format(user_id=user_id)))
+    if task_id is not None:
+        keys.append(RECENT_WRITE_KEY.format(key=TASK_VERSION_KEY.format(task_id=task_id)))
+    try:
+        return bool(keys) and get_redis().exists(*keys) > 0
+    except redis.RedisError as e:
+        logger.warning(f"Не удалось проверить недавние изменения {keys}: {e}")
+        return False
@@ -0,0 +1,101 @@
+# app/services/telegram_client.py
+
+import logging
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Any, Dict, Optional, Union
+
+import pytz
+import requests
+from django.conf import settings
+from django.utils import timezone
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+TELEGRAM_API_URL = 'https://api.telegram.org'
+
+
+class TelegramAPIError(Exception):
+    """Ошибка вызова Bot API. retry_after заполнен, если Telegram ответил 429."""
+
+    def __init__(self, description: str, status_code: Optional[int] = None,
+                 retry_after: Optional[int] = None) -> None:
+        super().__init__(description)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+    @property
+    def retryable(self) -> bool:
+        # Сетевые ошибки и 5xx имеет смысл повторить, остальные 4xx — нет (чат удалён, бот заблокирован)
+        return self.status_code is None or self.status_code >= 500 or self.retry_after is not None
+
+
+@lru_cache(maxsize=None)
+def get_session() -> requests.Session:
+    """Сессия с пулом keep-alive соединений, одна на процесс воркера."""
+    session = requests.Session()
+    session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=settings.TELEGRAM_HTTP_POOL_SIZE))
+    return session
+
+
+def send_message(chat_id: int, text: str, parse_mode: str = 'Markdown') -> Dict[str, Any]:
+    try:
+        resp = get_session().post(
+            f"{TELEGRAM_API_URL}/bot{settings.TELEGRAM_BOT_TOKEN}/sendMessage",
+            json={
+                'chat_id': chat_id,
+                'text': text,
+                'parse_mode': parse_mode
+            },
+            timeout=settings.TELEGRAM_REQUEST_TIMEOUT
+        )
+    except requests.RequestException as e:
+        raise TelegramAPIError(str(e)) from e
+
+    if resp.ok:
+        return resp.json()
+
+    try:
+        payload = resp.json()
+    except ValueError:
+        payload = {}
+    raise TelegramAPIError(
+        payload.get('description', resp.reason),
+        status_code=resp.status_code,
+        retry_after=payload.get('parameters', {}).get('retry_after') if resp.status_code == 429 else None,
+    )
+
+
+def format_time_left(left: timedelta) -> str:
+    """«1 д 2 ч», «1 ч 5 мин», «9 мин»: две старшие единицы, с округлением до минуты."""
+    minutes = round(left.total_seconds() / 60)
+    if minutes < 1:
+        return 'меньше минуты'
+    days, minutes = divmod(minutes, 24 * 60)
+    hours, minutes = divmod(minutes, 60)
+    parts = [f'{value} {unit}' for value, unit in ((days, 'д'), (hours, 'ч'), (minutes, 'мин')) if value]
+    return ' '.join(parts[:2])
+
+
+def format_reminder(task_id: int, task_title: str, deadline: Union[str, datetime],
+                    now: Optional[datetime] = None) -> str:
+    # deadline указан в UTC!, пример deadline: 2025-05-21T17:12:00+00:00
+    deadline_dt = datetime.fromisoformat(deadline) if isinstance(deadline, str) else deadline
+
+    # здесь уже переводим в локальное время (настройка локальной зоны в .env)
+    local_deadline = deadline_dt.astimezone(pytz.timezone(settings.TIME_ZONE))
+
+    # formatted_deadline форматирует из "2025-05-21 20:12:00+03:00" в "21.05.2025 20:12"
+    formatted_deadline = local_deadline.strftime('%d.%m.%Y %H:%M')
+
+    # Напоминания бывают за сутки, за час и т. д., а отправка может опоздать — считаем от момента отправки
+    time_left = format_time_left(deadline_dt - (now or timezone.now()))
+
+    return (
+        f"⏰ *Напоминание о задаче*\n"
+        f"*{task_title}*\n"
+        f"Дедлайн: {formatted_deadline}\n"
+        f"Осталось: {time_left}\n"
+        f"ID: {task_id}"
+    )
@@ -1,79 +1,262 @@
-from celery import shared_task
-from django.utils import timezone
-from datetime import timedelta, datetime
-
-from task_manager.settings import TIME_ZONE
-from .models import Task
-import requests
 import logging
+import time
+from datetime import datetime
+from itertools import chain, zip_longest
+from typing import Dict, List, Optional
+
+import redis
+from celery import chord, shared_task
 from django.conf import settings
+from django.utils import timezone
+
+from .metrics import (
+    CLAIM_BATCH_SIZE, SCAN_DURATION, TELEGRAM_DEFERRED, TELEGRAM_RETRIES, TELEGRAM_SEND_LATENCY,
+    TELEGRAM_SEND_RESULTS, observe_reminder_lag,
+)
+from .services.circuit_breaker import (
+    CLOSED, OPEN, TelegramCircuitBreaker, defer_notifications, deferred_count, take_deferred,
+)
+from .services.rate_limit import TelegramRateLimiter
+from .services.redis_client import get_redis
+from .services.reminder_schedule import pop_due_reminders, reschedule_claimed
+from .services.task_archive import archive_tasks
+from .services.task_notifications import claim_due_tasks
+from .services.telegram_client import TelegramAPIError, format_reminder, send_message
 
 logger = logging.getLogger(__name__)
 
+# Дольше этого ждать слот внутри воркера не имеет смысла — остаток пачки откладывается
+MAX_INLINE_WAIT = 1.0
+
+
+def _dispatch_notifications(claimed: List[Dict]) -> None:
+    now = timezone.now()
+    notifications = [
+        {
+            'task_id': task['id'],
+            'chat_id': task['telegram_user_id'],
+            'task_title': task['title'],
+            'deadline': task['deadline'].isoformat(),
+            'remind_at': task['remind_at'].isoformat(),
+        }
+        for task in claimed
+        # Напоминание, опоздавшее дольше самого дедлайна (долгий сбой), уже бесполезно — только снимается
+        if task['deadline'] > now
+    ]
+    send_batch_size = settings.TELEGRAM_SEND_BATCH_SIZE
+    for i in range(0, len(notifications), send_batch_size):
+        send_telegram_notifications.delay(notifications[i:i + send_batch_size])
+
+
+@shared_task(bind=True)
+def dispatch_due_reminders(self):
+    """
+    Частый тик по расписанию напоминаний в Redis. База затрагивается,
+    только когда какое-то напоминание действительно наступило.
+    """
+    batch_size = settings.DEADLINE_CLAIM_BATCH_SIZE
+    total = 0
+
+    with SCAN_DURATION.labels('dispatch_due_reminders').time():
+        while True:
+            due_ids = pop_due_reminders(limit=batch_size)
+            if not due_ids:
+                break
+
+            # Задача могла быть выполнена или перенесена после постановки в расписание — повторная проверка в БД
+            claimed = claim_due_tasks(limit=batch_size, task_ids=due_ids)
+            _dispatch_notifications(claimed)
+            # Следующее напоминание задач с несколькими напоминаниями — обратно в расписание
+            reschedule_claimed(claimed)
+            CLAIM_BATCH_SIZE.labels('dispatch_due_reminders').observe(len(claimed))
+            total += len(claimed)
+            logger.info(f"Из расписания: {len(due_ids)}, захвачено задач для напоминания: {len(claimed)}")
+
+            if len(due_ids) < batch_size:
+                break
+
+    return f"Dispatched {total} reminders"
+
+
+def _scan_due_tasks(label: str, shard: Optional[int] = None, shards: int = 1) -> int:
+    """Захватывает и отправляет наступившие напоминания (все или одного шарда). Возвращает их число."""
+    batch_size = settings.DEADLINE_CLAIM_BATCH_SIZE
+    total = 0
+
+    with SCAN_DURATION.labels(label).time():
+        while True:
+            claimed = claim_due_tasks(limit=batch_size, shard=(shard, shards) if shard is not None else None)
+            _dispatch_notifications(claimed)
+            reschedule_claimed(claimed)
+            CLAIM_BATCH_SIZE.labels(label).observe(len(claimed))
+            total += len(claimed)
+            logger.info(f"Захвачено задач для напоминания: {len(claimed)}")
+
+            if len(claimed) < batch_size:
+                break
+
+    return total
+
 
 @shared_task(bind=True)
 def check_deadlines(self):
-    now = timezone.now()  # Уже в UTC благодаря USE_TZ=True
-    soon_deadline = now + timedelta(minutes=10)
+    """
+    Редкая сверка с БД: подбирает напоминания, не попавшие в расписание (например, при сбое Redis).
+    При DEADLINE_SCAN_SHARDS > 1 только раздаёт шарды свободным воркерам (chord),
+    итог подводит collect_deadline_shards.
+    """
+    shards = settings.DEADLINE_SCAN_SHARDS
+    if shards <= 1:
+        return f"Checked {_scan_due_tasks('check_deadlines')} tasks"
 
-    tasks = Task.objects.filter(
-        status=Task.Status.UNDONE,
-        deadline__range=(now, soon_deadline),  # Сравнение в UTC
-        notification_sent=False
-    )
+    chord(check_deadlines_shard.s(shard, shards) for shard in range(shards))(collect_deadline_shards.s())
+    return f"Started {shards} shards"
 
-    logger.info(f"Сформированный SQL-запрос: {str(tasks.query)}")
 
-    found_tasks = list(tasks)  # Выполняем запрос
-    logger.info(f"Найдено задач: {len(found_tasks)}")
+@shared_task
+def check_deadlines_shard(shard: int, shards: int) -> int:
+    """Сверка одного шарда: задачи пользователей с telegram_user_id % shards == shard."""
+    return _scan_due_tasks('check_deadlines_shard', shard, shards)
 
-    for task in found_tasks:
-        logger.info(f"Обработка задачи ID {task.id}: {task.title} (дедлайн: {task.deadline})")
-        send_telegram_notification.delay(
-            task_id=task.id,
-            chat_id=task.telegram_user_id,
-            task_title=task.title,
-            deadline=task.deadline.isoformat()
-        )
-        task.notification_sent = True
-        task.save()
 
-    return f"Checked {len(found_tasks)} tasks"
+@shared_task
+def collect_deadline_shards(counts: List[int]) -> str:
+    total = sum(counts)
+    logger.info(f"Сверка по {len(counts)} шардам: захвачено задач для напоминания: {total}")
+    return f"Checked {total} tasks in {len(counts)} shards"
+
+
+@shared_task
+def archive_old_tasks():
+    """Периодический перенос выполненных и давно просроченных задач в архив."""
+    return f"Archived {archive_tasks()} tasks"
+
+
+def interleave_by_chat(notifications: List[Dict]) -> List[Dict]:
+    """Чередует напоминания разных чатов, чтобы лимит на чат не тормозил всю пачку."""
+    by_chat: Dict[int, List[Dict]] = {}
+    for item in notifications:
+        by_chat.setdefault(item['chat_id'], []).append(item)
+    return [item for item in chain.from_iterable(zip_longest(*by_chat.values())) if item is not None]
+
+
+def _record_delivery(breaker: TelegramCircuitBreaker, ok: bool) -> None:
+    """Сообщает breaker итог вызова; недоступный Redis не должен останавливать отправку."""
+    try:
+        if ok:
+            breaker.record_success()
+        else:
+            breaker.record_failure()
+    except redis.RedisError as e:
+        logger.warning(f"Circuit breaker unavailable: {e}")
+
+
+def _acquire_slot(limiter: TelegramRateLimiter, chat_id: int) -> float:
+    """Ждёт слот на отправку, если ждать недолго. Возвращает 0 или оставшееся время ожидания."""
+    wait = limiter.try_acquire(chat_id)
+    while 0 < wait <= MAX_INLINE_WAIT:
+        time.sleep(wait)
+        wait = limiter.try_acquire(chat_id)
+    return wait
+
+
+@shared_task(bind=True, max_retries=5)
+def send_telegram_notifications(self, notifications):
+    """
+    Отправляет пачку напоминаний через общий пул соединений, соблюдая лимиты Telegram.
+    notifications — список dict с ключами task_id, chat_id, task_title, deadline.
+    """
+    limiter = TelegramRateLimiter(get_redis())
+    breaker = TelegramCircuitBreaker(get_redis())
+    pending = interleave_by_chat(notifications)
+    failed = []
+    sent = 0
+
+    for i, item in enumerate(pending):
+        try:
+            if not breaker.allow_request():
+                # Telegram недоступен: не держим воркер таймаутами и повторами — остаток ждёт в очереди deferred
+                rest = failed + pending[i:]
+                defer_notifications(get_redis(), rest)
+                TELEGRAM_SEND_RESULTS.labels('deferred').inc(len(rest))
+                return f"Sent {sent}, deferred {len(rest)} until Telegram recovers"
+            wait = _acquire_slot(limiter, item['chat_id'])
+        except redis.RedisError as e:
+            logger.error(f"Rate limiter unavailable: {e}")
+            TELEGRAM_RETRIES.labels('redis_unavailable').inc()
+            raise self.retry(exc=e, args=[failed + pending[i:]], countdown=5)
+
+        if wait:
+            # Долгая пауза (429 у другого воркера) — не держим слот воркера, откладываем остаток
+            TELEGRAM_RETRIES.labels('rate_limit_wait').inc()
+            self.apply_async(args=[failed + pending[i:]], countdown=wait)
+            return f"Sent {sent}, deferred {len(failed) + len(pending) - i}"
+
+        try:
+            with TELEGRAM_SEND_LATENCY.time():
+                send_message(item['chat_id'], format_reminder(item['task_id'], item['task_title'], item['deadline']))
+            _record_delivery(breaker, ok=True)
+            sent += 1
+            TELEGRAM_SEND_RESULTS.labels('sent').inc()
+            if 'remind_at' in item:  # В очередях могут остаться напоминания без него — задержка не считается
+                observe_reminder_lag(datetime.fromisoformat(item['remind_at']))
+        except TelegramAPIError as e:
+            if e.retry_after:
+                TELEGRAM_SEND_RESULTS.labels('rate_limited').inc()
+                TELEGRAM_RETRIES.labels('rate_limited').inc()
+                limiter.pause(e.retry_after)
+                self.apply_async(args=[failed + pending[i:]], countdown=e.retry_after)
+                return f"Sent {sent}, deferred {len(failed) + len(pending) - i}"
+            # 4xx — ответ Telegram, значит он доступен; таймауты, сетевые ошибки и 5xx считаются сбоем
+            _record_delivery(breaker, ok=not e.retryable)
+            if e.retryable:
+                failed.append(item)
+            TELEGRAM_SEND_RESULTS.labels('retryable_error' if e.retryable else 'failed').inc()
+            logger.error(f"Error sending notification for task {item['task_id']}: {e}")
+
+    if failed:
+        if self.request.retries >= self.max_retries:
+            TELEGRAM_SEND_RESULTS.labels('dropped').inc(len(failed))
+            logger.error(f"Dropping {len(failed)} notifications after {self.max_retries} retries")
+        else:
+            TELEGRAM_RETRIES.labels('error').inc()
+            raise self.retry(args=[failed], countdown=2 ** self.request.retries * 10)
+    return f"Sent {sent} notifications"
+
+
+@shared_task
+def drain_deferred_notifications():
+    """
+    Возвращает отложенные напоминания в отправку, когда цепь снова можно пробовать:
+    в half_open — одно напоминание (оно и станет пробным вызовом), в closed — не больше
+    TELEGRAM_DEFERRED_DRAIN_BATCH за тик, чтобы накопленное не ушло в Telegram одним залпом.
+    """
+    client = get_redis()
+    state = TelegramCircuitBreaker(client).state()
+    if state == OPEN:
+        return f"Circuit open, {deferred_count(client)} deferred"
+
+    count = settings.TELEGRAM_DEFERRED_DRAIN_BATCH if state == CLOSED else 1
+    batch, expired = [], 0
+    while not batch:
+        taken = take_deferred(client, count)
+        if not taken:
+            break
+        # Как и в _dispatch_notifications: напоминание после дедлайна уже бесполезно
+        now = timezone.now()
+        batch = [item for item in taken if datetime.fromisoformat(item['deadline']) > now]
+        expired += len(taken) - len(batch)
+    if expired:
+        TELEGRAM_DEFERRED.labels('expired').inc(expired)
+    if batch:
+        send_telegram_notifications.delay(batch)
+    return f"Drained {len(batch)} deferred notifications, dropped {expired} past their deadline"
 
 
 @shared_task(bind=True, max_retries=3)
 def send_telegram_notification(self, task_id, chat_id, task_title, deadline):
-    try:
-        # deadline указан в UTC!, пример deadline: 2025-05-21T17:12:00+00:00
-
-        # deadline_dt форматирует из "2025-05-21T17:12:00+00:00" в "2025-05-21 17:12:00+00:00"
-        deadline_dt = datetime.fromisoformat(deadline) if isinstance(deadline, str) else deadline
-
-        # здесь уже переводим в локальное время (настрйка локальной зоны в .env)
-        local_deadline = deadline_dt.astimezone(TIME_ZONE)
-
-        # formatted_deadline форматирует из "2025-05-21 20:12:00+03:00" в "21.05.2025 20:12"
-        formatted_deadline = local_deadline.strftime('%d.%m.%Y %H:%M')
-
-        message = (
-            f"⏰ *Напоминание о задаче*\n"
-            f"*{task_title}*\n"
-            f"Дедлайн: {formatted_deadline}\n"
-            f"Осталось менее 10 минут!\n"
-            f"ID: {task_id}"
-        )
-
-        resp = requests.post(
-            f"https://api.telegram.org/bot{settings.TELEGRAM_BOT_TOKEN}/sendMessage",
-            json={
-                'chat_id': chat_id,
-                'text': message,
-                'parse_mode': 'Markdown'
-            },
-            timeout=10
-        )
-        resp.raise_for_status()
-        return f"Notification sent to {chat_id}"
-    except Exception as e:
-        logger.error(f"Error sending notification: {str(e)}")
-        raise self.retry(exc=e, countdown=60)
\ No newline at end of file
+    """Одиночная отправка оставлена для уже поставленных в очередь сообщений — уходит в пакетный путь."""
+    send_telegram_notifications.delay([
+        {'task_id': task_id, 'chat_id': chat_id, 'task_title': task_title, 'deadline': deadline}
+    ])
+    return f"Notification queued for {chat_id}"
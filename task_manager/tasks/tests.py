@@ -1,3 +1,1442 @@
-from django.test import TestCase
+import base64
+import asyncio
+import io
+import json
+import re
+import tempfile
+from datetime import datetime, timedelta, timezone as dt_timezone
+from unittest import mock
 
-# Create your tests here.
+import redis
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection, connections
+from django.http import HttpResponse
+from django.test import AsyncRequestFactory, RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from prometheus_client import REGISTRY
+from rest_framework.exceptions import ValidationError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory, APITestCase
+
+from .async_views import task_detail, task_list_create
+from .metrics import MetricsMiddleware
+from .models import ArchivedTask, Task
+from .pagination import DeadlineCursorPagination
+from .serializers import TaskSerializer
+from .services.reminder_schedule import SCHEDULE_KEY, sync_reminder
+from .services.task_archive import archive_tasks, get_archivable_tasks
+from .services.task_crud import create_task, update_task
+from .services.task_notifications import (
+    claim_due_tasks, get_due_tasks, in_shard, next_reminder_after, schedule_next_notification,
+)
+from .services.task_status import aupdate_task_status, bulk_update_task_status, update_task_status
+from .services.task_validation import MAX_REMINDER_OFFSET, validate_reminder_offsets
+from .services.task_versions import TASK_VERSION_KEY, USER_VERSION_KEY, recently_written
+from .services.telegram_client import TelegramAPIError, format_reminder
+from .tasks import (
+    check_deadlines, check_deadlines_shard, collect_deadline_shards, dispatch_due_reminders,
+    drain_deferred_notifications, interleave_by_chat, send_telegram_notifications,
+)
+from .views import TaskViewSet
+from task_manager.db_router import PrimaryReplicaRouter, ReplicaPinningMiddleware, pinning_scope
+
+
+def make_task(**kwargs) -> Task:
+    defaults = {
+        'title': 'Задача',
+        'deadline': timezone.now() + timedelta(minutes=5),
+        'telegram_user_id': 1,
+    }
+    defaults.update(kwargs)
+    task = Task(**defaults)
+    if 'next_notification_at' not in kwargs:
+        schedule_next_notification(task)
+    task.save(force_insert=True)
+    return task
+
+
+class QueryPlanTests(TestCase):
+    """Горячие запросы не должны откатываться к последовательному сканированию таблицы."""
+
+    # Признаки полного прохода по таблице в EXPLAIN каждого бэкенда
+    SEQ_SCAN_PATTERNS = {
+        'sqlite': re.compile(r'\bSCAN tasks_task\b(?! USING (COVERING )?INDEX)'),
+        'postgresql': re.compile(r'Seq Scan on tasks_task\b'),
+    }
+
+    def setUp(self):
+        if connection.vendor not in self.SEQ_SCAN_PATTERNS:
+            self.skipTest(f"EXPLAIN-проверки не поддерживаются для {connection.vendor}")
+        if connection.vendor == 'postgresql':
+            # На маленькой тестовой таблице планировщик всегда выберет Seq Scan —
+            # запрещаем его, чтобы проверить именно наличие подходящего индекса.
+            with connection.cursor() as cursor:
+                cursor.execute('SET enable_seqscan = off')
+
+    def assertNoSeqScan(self, queryset):
+        plan = queryset.explain()
+        self.assertNotRegex(plan, self.SEQ_SCAN_PATTERNS[connection.vendor], f"\n{queryset.query}\n{plan}")
+        return plan
+
+    def _list_queryset(self, **params):
+        view = TaskViewSet(action_map={'get': 'list'}, format_kwarg=None)
+        view.request = view.initialize_request(APIRequestFactory().get('/api/tasks/', params))
+        return view.filter_queryset(view.get_queryset())
+
+    def test_deadline_scan_uses_index(self):
+        plan = self.assertNoSeqScan(get_due_tasks())
+        if connection.vendor == 'sqlite':
+            # Диапазон по next_notification_at должен входить в ключ поиска, а не проверяться построчно
+            self.assertRegex(plan, r'task_next_notification_idx \(next_notification_at<\?\)')
+
+    def test_sharded_deadline_scan_uses_index(self):
+        plan = self.assertNoSeqScan(in_shard(get_due_tasks(), 1, 4))
+        if connection.vendor == 'sqlite':
+            self.assertIn('task_next_notification_idx', plan)
+
+    def test_user_list_uses_index(self):
+        plan = self.assertNoSeqScan(self._list_queryset(telegram_user_id=42))
+        if connection.vendor == 'sqlite':
+            self.assertIn('task_user_deadline_idx', plan)
+            # Сортировка по дедлайну берётся из индекса, без отдельного шага
+            self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_archive_passes_use_indexes(self):
+        done, expired = get_archivable_tasks(timezone.now() - timedelta(days=30))
+        for queryset, index in ((done, 'task_completed_idx'), (expired, 'task_deadline_idx')):
+            plan = self.assertNoSeqScan(queryset)
+            if connection.vendor == 'sqlite':
+                self.assertIn(index, plan)
+                self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_user_list_filtered_by_status_uses_index(self):
+        self.assertNoSeqScan(self._list_queryset(telegram_user_id=42, status=Task.Status.UNDONE))
+
+    def test_cursor_page_is_an_index_range_scan(self):
+        cursor = (False, (timezone.now(), 1))
+        queryset = DeadlineCursorPagination().page_queryset(self._list_queryset(telegram_user_id=42), cursor)
+        plan = self.assertNoSeqScan(queryset)
+        if connection.vendor == 'sqlite':
+            self.assertRegex(plan, r'task_user_deadline_idx \(telegram_user_id=\? AND deadline>\?\)')
+            self.assertNotIn('TEMP B-TREE', plan)
+
+
+class SQLiteProfileTests(TestCase):
+    """Настройки конкурентной записи применяются к каждому новому соединению с файлом БД."""
+
+    def setUp(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest("Профиль относится только к SQLite")
+
+    def test_file_connection_uses_wal_and_immediate_transactions(self):
+        with tempfile.TemporaryDirectory() as directory:
+            default = connections['default']
+            wrapper = type(default)(dict(default.settings_dict, NAME=f'{directory}/db.sqlite3'), 'profile')
+            try:
+                with wrapper.cursor() as cursor:
+                    pragmas = {name: cursor.execute(f'PRAGMA {name}').fetchone()[0]
+                               for name in ('journal_mode', 'synchronous', 'busy_timeout', 'cache_size')}
+            finally:
+                wrapper.close()
+
+        self.assertEqual(wrapper.transaction_mode, 'IMMEDIATE')
+        self.assertEqual(pragmas, {
+            'journal_mode': 'wal',
+            'synchronous': 1,  # NORMAL
+            'busy_timeout': settings.SQLITE_BUSY_TIMEOUT * 1000,
+            'cache_size': settings.SQLITE_PRAGMAS['cache_size'],
+        })
+
+
+class ClaimDueTasksTests(TestCase):
+    def test_claims_only_due_unsent_undone_tasks(self):
+        due = make_task()
+        make_task(deadline=timezone.now() + timedelta(hours=1))
+        make_task(status=Task.Status.DONE)
+        make_task(notification_sent=True)
+
+        claimed = claim_due_tasks(limit=100)
+
+        self.assertEqual([row['id'] for row in claimed], [due.id])
+        due.refresh_from_db()
+        self.assertTrue(due.notification_sent)
+
+    def test_second_claim_returns_nothing(self):
+        make_task()
+        self.assertEqual(len(claim_due_tasks(limit=100)), 1)
+        self.assertEqual(claim_due_tasks(limit=100), [])
+
+    def test_respects_limit(self):
+        for _ in range(5):
+            make_task()
+        self.assertEqual(len(claim_due_tasks(limit=3)), 3)
+        self.assertEqual(len(claim_due_tasks(limit=3)), 2)
+
+    def test_query_count_does_not_grow_with_due_set(self):
+        make_task()
+        with CaptureQueriesContext(connection) as single:
+            claim_due_tasks(limit=100)
+
+        for _ in range(50):
+            make_task()
+        with CaptureQueriesContext(connection) as many:
+            claim_due_tasks(limit=100)
+
+        self.assertEqual(len(single), len(many))
+
+    def test_shards_split_due_tasks_by_user(self):
+        tasks = [make_task(telegram_user_id=user_id) for user_id in (10, 11, 12, 13, 14, 15)]
+
+        claimed = [claim_due_tasks(limit=100, shard=(shard, 3)) for shard in range(3)]
+
+        self.assertEqual([sorted(row['telegram_user_id'] for row in rows) for rows in claimed],
+                         [[12, 15], [10, 13], [11, 14]])
+        self.assertEqual(sorted(row['id'] for rows in claimed for row in rows), [task.id for task in tasks])
+
+    def test_claim_moves_task_to_its_next_reminder(self):
+        task = make_task(deadline=timezone.now() + timedelta(minutes=90), reminder_offsets=[1440, 60, 10])
+        # Напоминание за сутки уже прошло — ближайшее за час
+        self.assertEqual(task.next_notification_at, task.deadline - timedelta(minutes=60))
+
+        hour_before = task.deadline - timedelta(minutes=59)
+        [row] = claim_due_tasks(limit=10, now=hour_before)
+        self.assertEqual(row['remind_at'], task.deadline - timedelta(minutes=60))
+        self.assertEqual(row['next_notification_at'], task.deadline - timedelta(minutes=10))
+        self.assertEqual(claim_due_tasks(limit=10, now=hour_before), [])
+
+        [row] = claim_due_tasks(limit=10, now=task.deadline - timedelta(minutes=9))
+        self.assertIsNone(row['next_notification_at'])
+        task.refresh_from_db()
+        self.assertIsNone(task.next_notification_at)
+        self.assertTrue(task.notification_sent)
+
+    def test_passed_reminders_collapse_into_one(self):
+        # Дедлайн через 5 минут: из трёх прошедших напоминаний уходит одно и сразу
+        make_task(reminder_offsets=[1440, 60, 10])
+        self.assertEqual(len(claim_due_tasks(limit=10)), 1)
+        self.assertEqual(claim_due_tasks(limit=10), [])
+
+    def test_multi_reminder_claim_costs_the_same_queries(self):
+        now = timezone.now()
+        for _ in range(20):
+            make_task()
+        with CaptureQueriesContext(connection) as single:
+            claim_due_tasks(limit=100)
+
+        for _ in range(20):
+            make_task(deadline=now + timedelta(minutes=30), reminder_offsets=[60, 10], next_notification_at=now)
+        with CaptureQueriesContext(connection) as multi:
+            claimed = claim_due_tasks(limit=100, now=now)
+
+        self.assertEqual(len(claimed), 20)
+        self.assertTrue(all(row['next_notification_at'] for row in claimed))
+        self.assertEqual(len(single), len(multi))
+
+    def test_next_reminder_after(self):
+        deadline = timezone.now()
+        self.assertEqual(next_reminder_after(deadline, [10, 60], deadline - timedelta(hours=2)),
+                         deadline - timedelta(minutes=60))
+        self.assertIsNone(next_reminder_after(deadline, [10, 60], deadline - timedelta(minutes=10)))
+        self.assertIsNone(next_reminder_after(deadline, [], deadline - timedelta(days=1)))
+
+
+@override_settings(DEADLINE_CLAIM_BATCH_SIZE=2, TELEGRAM_SEND_BATCH_SIZE=10)
+@mock.patch('tasks.services.reminder_schedule.get_redis', mock.Mock())
+class CheckDeadlinesTests(TestCase):
+    @mock.patch('tasks.tasks.send_telegram_notifications.delay')
+    def test_dispatches_each_due_task_once(self, delay):
+        tasks = [make_task() for _ in range(5)]
+
+        self.assertEqual(check_deadlines(), 'Checked 5 tasks')
+        sent_ids = sorted(item['task_id'] for call in delay.call_args_list for item in call.args[0])
+        self.assertEqual(sent_ids, [task.id for task in tasks])
+
+        delay.reset_mock()
+        check_deadlines()
+        delay.assert_not_called()
+
+    @mock.patch('tasks.tasks.send_telegram_notifications.delay')
+    def test_reminder_later_than_deadline_is_dropped(self, delay):
+        now = timezone.now()
+        task = make_task(deadline=now - timedelta(minutes=1), next_notification_at=now - timedelta(minutes=11))
+
+        self.assertEqual(check_deadlines(), 'Checked 1 tasks')
+        delay.assert_not_called()
+        task.refresh_from_db()
+        self.assertIsNone(task.next_notification_at)
+
+    @override_settings(DEADLINE_SCAN_SHARDS=3)
+    @mock.patch('tasks.tasks.send_telegram_notifications.delay')
+    def test_sharded_scan_fans_out_and_aggregates(self, delay):
+        tasks = [make_task(telegram_user_id=user_id) for user_id in range(7)]
+
+        with mock.patch('tasks.tasks.chord') as chord:
+            self.assertEqual(check_deadlines(), 'Started 3 shards')
+        header = list(chord.call_args.args[0])
+        self.assertEqual([signature.args for signature in header], [(0, 3), (1, 3), (2, 3)])
+        chord.return_value.assert_called_once_with(collect_deadline_shards.s())
+
+        # Воркеры выполняют шарды, затем callback chord суммирует их результаты
+        counts = [check_deadlines_shard(*signature.args) for signature in header]
+        self.assertEqual(counts, [3, 2, 2])
+        self.assertEqual(collect_deadline_shards(counts), 'Checked 7 tasks in 3 shards')
+        sent_ids = sorted(item['task_id'] for call in delay.call_args_list for item in call.args[0])
+        self.assertEqual(sent_ids, [task.id for task in tasks])
+
+
+def make_notification(task_id: int, chat_id: int) -> dict:
+    return {'task_id': task_id, 'chat_id': chat_id, 'task_title': 'Задача',
+            'deadline': '2025-05-21T17:12:00+00:00'}
+
+
+@override_settings(TIME_ZONE='Europe/Moscow')
+class TelegramNotificationTests(TestCase):
+    def setUp(self):
+        limiter_patcher = mock.patch('tasks.tasks.TelegramRateLimiter')
+        self.limiter = limiter_patcher.start().return_value
+        self.limiter.try_acquire.return_value = 0
+        self.addCleanup(limiter_patcher.stop)
+
+        breaker_patcher = mock.patch('tasks.tasks.TelegramCircuitBreaker')
+        self.breaker = breaker_patcher.start().return_value
+        self.breaker.allow_request.return_value = True
+        self.addCleanup(breaker_patcher.stop)
+
+        redis_patcher = mock.patch('tasks.tasks.get_redis')
+        redis_patcher.start()
+        self.addCleanup(redis_patcher.stop)
+
+    def test_format_reminder_uses_local_time(self):
+        self.assertIn('Дедлайн: 21.05.2025 20:12', format_reminder(1, 'Задача', '2025-05-21T17:12:00+00:00'))
+
+    def test_format_reminder_reports_time_left(self):
+        deadline = datetime(2025, 5, 21, 17, 12, tzinfo=dt_timezone.utc)
+        for left, expected in ((timedelta(days=1), 'Осталось: 1 д\n'), (timedelta(minutes=60), 'Осталось: 1 ч\n'),
+                               (timedelta(minutes=85), 'Осталось: 1 ч 25 мин\n'),
+                               (timedelta(minutes=10), 'Осталось: 10 мин\n'),
+                               (timedelta(seconds=20), 'Осталось: меньше минуты\n')):
+            with self.subTest(left=left):
+                self.assertIn(expected, format_reminder(1, 'Задача', deadline.isoformat(), now=deadline - left))
+
+    def test_interleave_by_chat(self):
+        items = [make_notification(1, 10), make_notification(2, 10), make_notification(3, 20)]
+        self.assertEqual([item['task_id'] for item in interleave_by_chat(items)], [1, 3, 2])
+
+    @mock.patch('tasks.tasks.send_message')
+    def test_sends_whole_batch(self, send_message):
+        result = send_telegram_notifications([make_notification(i, i) for i in range(3)])
+
+        self.assertEqual(result, 'Sent 3 notifications')
+        self.assertEqual(send_message.call_count, 3)
+
+    @mock.patch('tasks.tasks.send_message')
+    def test_retry_after_pauses_and_defers_rest(self, send_message):
+        send_message.side_effect = [None, TelegramAPIError('Too Many Requests', status_code=429, retry_after=7)]
+        batch = [make_notification(i, i) for i in range(3)]
+
+        with mock.patch.object(send_telegram_notifications, 'apply_async') as apply_async:
+            send_telegram_notifications(batch)
+
+        self.limiter.pause.assert_called_once_with(7)
+        apply_async.assert_called_once_with(args=[batch[1:]], countdown=7)
+
+    @mock.patch('tasks.tasks.send_message')
+    def test_permanent_errors_are_not_retried(self, send_message):
+        send_message.side_effect = TelegramAPIError('Forbidden: bot was blocked by the user', status_code=403)
+
+        self.assertEqual(send_telegram_notifications([make_notification(1, 1)]), 'Sent 0 notifications')
+        # Ответ 4xx означает, что Telegram доступен
+        self.breaker.record_success.assert_called_once()
+
+    @mock.patch('tasks.tasks.defer_notifications')
+    @mock.patch('tasks.tasks.send_message')
+    def test_open_circuit_parks_rest_of_batch(self, send_message, defer_notifications):
+        send_message.side_effect = [None, TelegramAPIError('Read timed out')]
+        self.breaker.allow_request.side_effect = [True, True, False]
+        batch = [make_notification(i, i) for i in range(4)]
+
+        result = send_telegram_notifications(batch)
+
+        self.assertEqual(result, 'Sent 1, deferred 3 until Telegram recovers')
+        self.breaker.record_failure.assert_called_once()
+        # Неудачное напоминание и ещё не отправленные ждут в очереди, без повторов задачи
+        self.assertEqual(defer_notifications.call_args.args[1], [batch[1], batch[2], batch[3]])
+
+    @override_settings(TELEGRAM_DEFERRED_DRAIN_BATCH=50)
+    @mock.patch('tasks.tasks.take_deferred')
+    @mock.patch('tasks.tasks.send_telegram_notifications.delay')
+    def test_drain_follows_breaker_state(self, delay, take_deferred):
+        upcoming = (timezone.now() + timedelta(hours=1)).isoformat()
+        take_deferred.return_value = [dict(make_notification(1, 1), deadline=upcoming)]
+
+        for state, expected_count in (('open', None), ('half_open', 1), ('closed', 50)):
+            take_deferred.reset_mock()
+            self.breaker.state.return_value = state
+            drain_deferred_notifications()
+            if expected_count is None:
+                take_deferred.assert_not_called()
+            else:
+                self.assertEqual(take_deferred.call_args.args[1], expected_count)
+        self.assertEqual(delay.call_count, 2)
+
+    @mock.patch('tasks.tasks.take_deferred')
+    @mock.patch('tasks.tasks.send_telegram_notifications.delay')
+    def test_drain_drops_reminders_past_deadline(self, delay, take_deferred):
+        self.breaker.state.return_value = 'half_open'
+        upcoming = dict(make_notification(2, 2), deadline=(timezone.now() + timedelta(hours=1)).isoformat())
+        # Первые напоминания уже опоздали: проба уходит с первым ещё актуальным
+        take_deferred.side_effect = [[make_notification(1, 1)], [make_notification(3, 3)], [upcoming]]
+
+        self.assertEqual(drain_deferred_notifications(),
+                         'Drained 1 deferred notifications, dropped 2 past their deadline')
+        delay.assert_called_once_with([upcoming])
+
+        take_deferred.side_effect = [[make_notification(1, 1)], []]
+        drain_deferred_notifications()
+        self.assertEqual(delay.call_count, 1)
+
+
+@mock.patch('tasks.services.task_versions.get_redis', mock.Mock())
+@mock.patch('tasks.services.reminder_schedule.get_redis')
+class ReminderScheduleTests(TestCase):
+    def pipeline(self, get_redis):
+        return get_redis.return_value.pipeline.return_value
+
+    def test_undone_task_is_scheduled_ten_minutes_before_deadline(self, get_redis):
+        task = make_task(deadline=timezone.now() + timedelta(hours=1))
+        sync_reminder(task)
+        self.pipeline(get_redis).zadd.assert_called_once_with(
+            SCHEDULE_KEY, {task.id: (task.deadline - timedelta(minutes=10)).timestamp()})
+
+    def test_done_task_is_unscheduled(self, get_redis):
+        task = make_task(status=Task.Status.DONE)
+        sync_reminder(task)
+        self.pipeline(get_redis).zrem.assert_called_once_with(SCHEDULE_KEY, task.id)
+
+    def test_write_paths_sync_schedule_after_commit(self, get_redis):
+        pipe = self.pipeline(get_redis)
+        with self.captureOnCommitCallbacks(execute=True):
+            task = create_task({'title': 'Задача', 'telegram_user_id': 1,
+                                'deadline_input': timezone.now() + timedelta(hours=1)})
+        pipe.zadd.assert_called_once()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            update_task_status(task, Task.Status.DONE)
+        pipe.zrem.assert_called_once_with(SCHEDULE_KEY, task.id)
+
+    def test_moving_deadline_resets_notification(self, get_redis):
+        task = make_task(notification_sent=True)
+        with self.captureOnCommitCallbacks(execute=True):
+            update_task(task, {'deadline_input': timezone.now() + timedelta(hours=2)})
+        self.assertFalse(task.notification_sent)
+        self.pipeline(get_redis).zadd.assert_called_once()
+
+    @mock.patch('tasks.tasks.send_telegram_notifications.delay')
+    @mock.patch('tasks.tasks.pop_due_reminders')
+    def test_dispatch_rechecks_tasks_in_database(self, pop_due_reminders, delay, get_redis):
+        due = make_task()
+        done = make_task(status=Task.Status.DONE)
+        pop_due_reminders.return_value = [due.id, done.id]
+
+        self.assertEqual(dispatch_due_reminders(), 'Dispatched 1 reminders')
+        self.assertEqual([item['task_id'] for item in delay.call_args.args[0]], [due.id])
+
+    @mock.patch('tasks.tasks.send_telegram_notifications.delay')
+    @mock.patch('tasks.tasks.pop_due_reminders')
+    def test_dispatch_schedules_following_reminder(self, pop_due_reminders, delay, get_redis):
+        now = timezone.now()
+        task = make_task(deadline=now + timedelta(minutes=30), reminder_offsets=[60, 10], next_notification_at=now)
+        pop_due_reminders.return_value = [task.id]
+
+        dispatch_due_reminders()
+
+        self.assertEqual(delay.call_args.args[0][0]['remind_at'], now.isoformat())
+        self.pipeline(get_redis).zadd.assert_called_once_with(
+            SCHEDULE_KEY, {task.id: (task.deadline - timedelta(minutes=10)).timestamp()})
+
+    def test_status_changes_recompute_next_reminder(self, get_redis):
+        task = make_task(deadline=timezone.now() + timedelta(hours=2), reminder_offsets=[60, 10])
+        with self.captureOnCommitCallbacks(execute=True):
+            update_task_status(task, Task.Status.DONE)
+        stored = Task.objects.get(pk=task.pk)
+        self.assertIsNone(stored.next_notification_at)
+        self.assertIsNotNone(stored.completed_at)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            bulk_update_task_status([task.id], Task.Status.UNDONE)
+        stored = Task.objects.get(pk=task.pk)
+        self.assertEqual(stored.next_notification_at, task.deadline - timedelta(minutes=60))
+        self.assertIsNone(stored.completed_at)
+        self.pipeline(get_redis).zadd.assert_called_with(
+            SCHEDULE_KEY, {task.id: (task.deadline - timedelta(minutes=60)).timestamp()})
+
+    @mock.patch('tasks.tasks.claim_due_tasks')
+    @mock.patch('tasks.tasks.pop_due_reminders', return_value=[])
+    def test_idle_tick_does_not_touch_database(self, pop_due_reminders, claim_due_tasks, get_redis):
+        with self.assertNumQueries(0):
+            dispatch_due_reminders()
+        claim_due_tasks.assert_not_called()
+
+
+@mock.patch('tasks.services.reminder_schedule.get_redis', mock.Mock())
+@mock.patch('tasks.services.task_versions.get_redis')
+class TaskVersionTests(TestCase):
+    def bumped_keys(self, get_redis):
+        pipe = get_redis.return_value.pipeline.return_value
+        return [call.args[0] for call in pipe.incr.call_args_list]
+
+    def test_write_paths_bump_versions_after_commit(self, get_redis):
+        with self.captureOnCommitCallbacks() as callbacks:
+            task = create_task({'title': 'Задача', 'telegram_user_id': 7,
+                                'deadline_input': timezone.now() + timedelta(hours=1)})
+        self.assertEqual(self.bumped_keys(get_redis), [])
+
+        for callback in callbacks:
+            callback()
+        self.assertEqual(sorted(self.bumped_keys(get_redis)),
+                         [TASK_VERSION_KEY.format(task_id=task.id), USER_VERSION_KEY.format(user_id=7)])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            update_task_status(task, Task.Status.DONE)
+        self.assertEqual(len(self.bumped_keys(get_redis)), 4)
+
+    @override_settings(DATABASE_REPLICAS=['replica_0'], REPLICA_PIN_SECONDS=5)
+    def test_bump_marks_recent_write_for_replica_reads(self, get_redis):
+        with self.captureOnCommitCallbacks(execute=True):
+            update_task_status(make_task(telegram_user_id=3), Task.Status.DONE)
+        marked = [call.args[0] for call in get_redis.return_value.pipeline.return_value.set.call_args_list]
+        self.assertIn(f'{USER_VERSION_KEY.format(user_id=3)}:recent', marked)
+
+        get_redis.return_value.exists.return_value = 1
+        self.assertTrue(recently_written(user_id=3))
+        get_redis.return_value.exists.assert_called_once_with(f'{USER_VERSION_KEY.format(user_id=3)}:recent')
+
+        with self.settings(DATABASE_REPLICAS=[]):
+            self.assertFalse(recently_written(user_id=3))
+
+    def test_claim_bumps_versions(self, get_redis):
+        task = make_task(telegram_user_id=8)
+        with self.captureOnCommitCallbacks(execute=True):
+            claim_due_tasks(limit=10)
+        self.assertEqual(sorted(self.bumped_keys(get_redis)),
+                         [TASK_VERSION_KEY.format(task_id=task.id), USER_VERSION_KEY.format(user_id=8)])
+
+
+@override_settings(TASKS_PAGE_SIZE=3)
+@mock.patch('tasks.services.task_versions.get_redis', mock.MagicMock())
+class TaskListPaginationTests(APITestCase):
+    def setUp(self):
+        deadline = timezone.now() + timedelta(days=1)
+        # Одинаковые дедлайны проверяют, что id разрешает равенство позиций
+        self.tasks = [make_task(telegram_user_id=5, deadline=deadline + timedelta(hours=i // 2)) for i in range(7)]
+        make_task(telegram_user_id=6)
+
+    def walk(self, url, direction):
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append([task['id'] for task in response.data['results']])
+            url = response.data[direction]
+        return pages
+
+    def test_pages_forward_and_back(self):
+        expected = [task.id for task in self.tasks]
+
+        forward = self.walk('/api/tasks/?telegram_user_id=5', 'next')
+        self.assertEqual([len(page) for page in forward], [3, 3, 1])
+        self.assertEqual(sum(forward, []), expected)
+
+        second_page = self.client.get(self.client.get('/api/tasks/?telegram_user_id=5').data['next'])
+        backward = self.walk(second_page.data['previous'], 'previous')
+        self.assertEqual(backward, [expected[:3]])
+
+    def test_page_size_is_capped(self):
+        with self.settings(TASKS_MAX_PAGE_SIZE=2):
+            response = self.client.get('/api/tasks/?telegram_user_id=5&page_size=100')
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/tasks/?telegram_user_id=5&cursor=garbage')
+        self.assertEqual(response.status_code, 404)
+
+    def test_cursor_fits_bot_button_and_round_trips(self):
+        from telegram_bot.core import TasksPage
+
+        paginator = DeadlineCursorPagination()
+        deadline = datetime(2030, 12, 31, 23, 59, 59, 999999, tzinfo=dt_timezone.utc)
+        token = paginator.encode_token(True, {'deadline': deadline, 'id': 2 ** 63 - 1})
+
+        # Микросекунды и огромный id раньше не помещались в 64 байта callback_data
+        self.assertLessEqual(len(TasksPage(cursor=token).pack().encode()), 64)
+        self.assertEqual(paginator.decode_token(token), (True, (deadline, 2 ** 63 - 1)))
+
+    def test_legacy_text_cursor_still_accepted(self):
+        following = self.tasks[3]
+        legacy = base64.urlsafe_b64encode(f"0|{self.tasks[2].deadline.isoformat()}|{self.tasks[2].id}".encode())
+        response = self.client.get(f'/api/tasks/?telegram_user_id=5&cursor={legacy.decode().rstrip("=")}')
+        self.assertEqual(response.data['results'][0]['id'], following.id)
+
+
+@mock.patch('tasks.services.task_versions.get_redis')
+@mock.patch('tasks.services.reminder_schedule.get_redis')
+class BulkCreateTests(APITestCase):
+    def item(self, **kwargs):
+        item = {'title': 'Задача', 'telegram_user_id': 3,
+                'deadline_input': (timezone.now() + timedelta(days=1)).isoformat()}
+        item.update(kwargs)
+        return item
+
+    @override_settings(TASKS_BULK_CREATE_BATCH_SIZE=2)
+    def test_creates_all_items(self, reminders_redis, versions_redis):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/tasks/bulk/', [self.item(title=f'T{i}') for i in range(5)],
+                                        format='json')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data['ids']), 5)
+        self.assertEqual(sorted(Task.objects.values_list('title', flat=True)), [f'T{i}' for i in range(5)])
+        scheduled = reminders_redis.return_value.pipeline.return_value.zadd.call_args.args[1]
+        self.assertEqual(sorted(scheduled), sorted(response.data['ids']))
+
+    def test_reports_errors_per_item_and_creates_nothing(self, reminders_redis, versions_redis):
+        items = [self.item(), self.item(deadline_input=None), self.item(telegram_user_id=-1)]
+        del items[1]['deadline_input']
+
+        response = self.client.post('/api/tasks/bulk/', items, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data[0], {})
+        self.assertIn('deadline_input', response.data[1])
+        self.assertIn('telegram_user_id', response.data[2])
+        self.assertFalse(Task.objects.exists())
+
+    @override_settings(TASK_MAX_REMINDERS=3)
+    def test_reminder_offsets_are_normalized_and_limited(self, reminders_redis, versions_redis):
+        response = self.client.post('/api/tasks/bulk/', [self.item(reminder_offsets=[10, 1440, 10]), self.item()],
+                                    format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(list(Task.objects.order_by('id').values_list('reminder_offsets', flat=True)),
+                         [[1440, 10], settings.TASK_REMINDER_OFFSETS])
+
+        response = self.client.post('/api/tasks/bulk/', [self.item(reminder_offsets=[1, 2, 3, 4])], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('reminder_offsets', response.data[0])
+
+    def test_out_of_range_reminder_offsets_are_rejected(self, reminders_redis, versions_redis):
+        for offsets in ([10 ** 10], [0], [MAX_REMINDER_OFFSET + 1]):
+            with self.subTest(offsets=offsets):
+                response = self.client.post('/api/tasks/', self.item(reminder_offsets=offsets), format='json')
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('reminder_offsets', response.data)
+                response = self.client.post('/api/tasks/bulk/', [self.item(reminder_offsets=offsets)], format='json')
+                self.assertEqual(response.status_code, 400)
+        with self.assertRaises(ValidationError):
+            validate_reminder_offsets([10 ** 10])
+        self.assertFalse(Task.objects.exists())
+
+    @override_settings(TASKS_BULK_MAX_ITEMS=2)
+    def test_rejects_oversized_batches(self, reminders_redis, versions_redis):
+        response = self.client.post('/api/tasks/bulk/', [self.item() for _ in range(3)], format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_query_count_does_not_grow_per_item(self, reminders_redis, versions_redis):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post('/api/tasks/bulk/', [self.item() for _ in range(50)], format='json')
+        self.assertLess(len(queries), 5)
+
+
+@mock.patch('tasks.services.task_versions.get_redis')
+@mock.patch('tasks.services.reminder_schedule.get_redis')
+class BulkStatusUpdateTests(APITestCase):
+    def test_reports_changed_unchanged_and_missing(self, reminders_redis, versions_redis):
+        undone = [make_task(telegram_user_id=1), make_task(telegram_user_id=2)]
+        done = make_task(status=Task.Status.DONE)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch('/api/tasks/status/', {
+                'ids': [undone[0].id, undone[1].id, done.id, 999], 'status': 'done'
+            }, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {
+            'changed': [undone[0].id, undone[1].id], 'unchanged': [done.id], 'missing': [999]
+        })
+        self.assertFalse(Task.objects.exclude(status=Task.Status.DONE).exists())
+        reminders_redis.return_value.pipeline.return_value.zrem.assert_called_once_with(
+            SCHEDULE_KEY, undone[0].id, undone[1].id)
+        bumped = versions_redis.return_value.pipeline.return_value.incr.call_args_list
+        self.assertEqual(len(bumped), 4)  # два пользователя и две изменённые задачи
+
+    def test_single_select_and_update(self, reminders_redis, versions_redis):
+        ids = [make_task().id for _ in range(20)]
+        with CaptureQueriesContext(connection) as queries:
+            self.client.patch('/api/tasks/status/', {'ids': ids, 'status': 'done'}, format='json')
+        statements = [q['sql'].split()[0] for q in queries if not q['sql'].startswith(('SAVEPOINT', 'RELEASE'))]
+        self.assertEqual(statements, ['SELECT', 'UPDATE'])
+
+    def test_rejects_invalid_status(self, reminders_redis, versions_redis):
+        response = self.client.patch('/api/tasks/status/', {'ids': [1], 'status': 'lost'}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+@mock.patch('tasks.services.task_versions.get_redis', mock.MagicMock())
+class FastReadPathTests(APITestCase):
+    def setUp(self):
+        self.tasks = [
+            make_task(telegram_user_id=9, title=f'Задача «{i}»', description='Описание\n' * i,
+                      deadline=timezone.now() + timedelta(minutes=5 + i))
+            for i in range(3)
+        ]
+
+    def expected_results(self, queryset):
+        return TaskSerializer(queryset.order_by('deadline', 'id'), many=True).data
+
+    def test_list_matches_model_serializer_output(self):
+        for tz in ('UTC', 'Europe/Moscow'):
+            with self.subTest(tz=tz), self.settings(TIME_ZONE=tz):
+                response = self.client.get('/api/tasks/?telegram_user_id=9')
+                expected = {'next': None, 'previous': None,
+                            'results': self.expected_results(Task.objects.filter(telegram_user_id=9))}
+                self.assertEqual(response.content, JSONRenderer().render(expected))
+
+    def test_deadline_soon_matches_model_serializer_output(self):
+        response = self.client.get('/api/tasks/deadline_soon/')
+        expected = self.expected_results(Task.objects.filter(deadline__lte=timezone.now() + timedelta(minutes=10)))
+        self.assertEqual(response.content, JSONRenderer().render(expected))
+
+    def test_list_is_a_single_query(self):
+        with self.assertNumQueries(1):
+            self.client.get('/api/tasks/?telegram_user_id=9')
+
+    def test_indented_output_still_available(self):
+        response = self.client.get('/api/tasks/?telegram_user_id=9', HTTP_ACCEPT='application/json; indent=2')
+        self.assertIn(b'\n  "next"', response.content)
+
+
+@mock.patch('tasks.services.task_versions.get_redis')
+class ConditionalGetTests(APITestCase):
+    def setUp(self):
+        self.task = make_task(telegram_user_id=4)
+
+    def test_list_returns_304_without_touching_database(self, get_redis):
+        get_redis.return_value.pipeline.return_value.execute.return_value = [None, b'3']
+        response = self.client.get('/api/tasks/?telegram_user_id=4')
+        etag = response['ETag']
+        self.assertTrue(etag.startswith('W/"user4-3-'))
+
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/tasks/?telegram_user_id=4', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_version_bump_or_other_query_changes_etag(self, get_redis):
+        get_redis.return_value.pipeline.return_value.execute.return_value = [None, b'3']
+        etag = self.client.get('/api/tasks/?telegram_user_id=4')['ETag']
+
+        self.assertNotEqual(self.client.get('/api/tasks/?telegram_user_id=4&status=done')['ETag'], etag)
+
+        get_redis.return_value.pipeline.return_value.execute.return_value = [None, b'4']
+        response = self.client.get('/api/tasks/?telegram_user_id=4', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_detail_uses_task_version(self, get_redis):
+        get_redis.return_value.pipeline.return_value.execute.return_value = [None, b'1']
+        response = self.client.get(f'/api/tasks/{self.task.id}/')
+        pipe = get_redis.return_value.pipeline.return_value
+        pipe.get.assert_called_with(TASK_VERSION_KEY.format(task_id=self.task.id))
+
+        with self.assertNumQueries(0):
+            response = self.client.get(f'/api/tasks/{self.task.id}/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_lost_counter_restarts_from_random_base(self, get_redis):
+        pipe = get_redis.return_value.pipeline.return_value
+        key = USER_VERSION_KEY.format(user_id=4)
+        with mock.patch('tasks.services.task_versions.secrets.randbits', return_value=5000) as randbits:
+            pipe.execute.return_value = [True, b'5000']
+            etag = self.client.get('/api/tasks/?telegram_user_id=4')['ETag']
+            pipe.set.assert_called_with(key, 5000, nx=True)
+
+            # Redis потерял счётчик (FLUSH, вытеснение): правка создаёт его заново с другого числа, а не с 1
+            randbits.return_value = 9000
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.patch(f'/api/tasks/{self.task.id}/', {'status': 'done'}, format='json')
+            self.assertLess(pipe.mock_calls.index(mock.call.set(key, 9000, nx=True)),
+                            pipe.mock_calls.index(mock.call.incr(key)))
+            pipe.execute.return_value = [True, b'9001']
+            response = self.client.get('/api/tasks/?telegram_user_id=4', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_no_etag_when_redis_is_unavailable(self, get_redis):
+        get_redis.return_value.pipeline.return_value.execute.side_effect = redis.ConnectionError
+        response = self.client.get('/api/tasks/?telegram_user_id=4', HTTP_IF_NONE_MATCH='*')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('ETag', response)
+
+
+@override_settings(DATABASE_REPLICAS=['replica_0'], REPLICA_PIN_SECONDS=5)
+class ReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = PrimaryReplicaRouter()
+        self.enterContext(pinning_scope())
+
+    def test_reads_go_to_replica_until_first_write(self):
+        self.assertEqual(self.router.db_for_read(Task), 'replica_0')
+        self.assertEqual(self.router.db_for_write(Task), 'default')
+        self.assertEqual(self.router.db_for_read(Task), 'default')
+
+        with pinning_scope():
+            self.assertEqual(self.router.db_for_read(Task), 'replica_0')
+
+    def test_each_celery_task_has_own_scope(self):
+        from task_manager.celery import app
+
+        router = self.router
+
+        @app.task(name='tests.pinning.write')
+        def write():
+            router.db_for_write(Task)
+            return router.db_for_read(Task)
+
+        @app.task(name='tests.pinning.read')
+        def read():
+            return router.db_for_read(Task)
+
+        self.assertEqual(write.apply().get(), 'default')
+        # Запись предыдущей задачи не закрепляет основную БД за воркером
+        self.assertEqual(read.apply().get(), 'replica_0')
+
+        @app.task(name='tests.pinning.nested', bind=True)
+        def nested(self):
+            router.db_for_write(Task)
+            # Вложенный вызов с тем же id получает свою область и не сбрасывает область внешнего
+            return read.apply(task_id=self.request.id).get(), router.db_for_read(Task)
+
+        self.assertEqual(list(nested.apply().get()), ['replica_0', 'default'])
+        self.assertEqual(read.apply().get(), 'replica_0')
+
+    def test_reads_inside_transaction_stay_on_primary(self):
+        # Захват задач читает SELECT ... FOR UPDATE в той же транзакции, что и UPDATE
+        with mock.patch.object(connections['default'], 'in_atomic_block', True):
+            self.assertEqual(self.router.db_for_read(Task), 'default')
+
+    def test_without_replicas_everything_uses_primary(self):
+        with self.settings(DATABASE_REPLICAS=[]):
+            self.assertEqual(self.router.db_for_read(Task), 'default')
+
+    def test_replicas_are_not_migrated(self):
+        self.assertTrue(self.router.allow_migrate('default', 'tasks'))
+        self.assertFalse(self.router.allow_migrate('replica_0', 'tasks'))
+
+
+@override_settings(DATABASE_REPLICAS=['replica_0'], REPLICA_PIN_SECONDS=5)
+class ReplicaPinningMiddlewareTests(SimpleTestCase):
+    def call(self, request, write=False):
+        reads = []
+
+        def view(request):
+            if write:
+                PrimaryReplicaRouter().db_for_write(Task)
+            reads.append(PrimaryReplicaRouter().db_for_read(Task))
+            return HttpResponse()
+
+        return ReplicaPinningMiddleware(view)(request), reads[0]
+
+    def test_write_sets_pin_cookie(self):
+        response, read_from = self.call(RequestFactory().post('/api/tasks/'), write=True)
+        self.assertEqual(read_from, 'default')
+        self.assertEqual(response.cookies[ReplicaPinningMiddleware.COOKIE_NAME]['max-age'], 5)
+
+    def test_pin_cookie_routes_next_reads_to_primary(self):
+        request = RequestFactory().get('/api/tasks/')
+        self.assertEqual(self.call(request)[1], 'replica_0')
+
+        request.COOKIES[ReplicaPinningMiddleware.COOKIE_NAME] = '1'
+        response, read_from = self.call(request)
+        self.assertEqual(read_from, 'default')
+        self.assertNotIn(ReplicaPinningMiddleware.COOKIE_NAME, response.cookies)
+
+
+@mock.patch('tasks.services.task_versions.get_redis')
+@mock.patch('tasks.services.reminder_schedule.get_redis')
+class ArchiveTests(APITestCase):
+    def setUp(self):
+        now = timezone.now()
+        self.old_done = make_task(status=Task.Status.DONE, deadline=now + timedelta(days=1),
+                                  reminder_offsets=[1440, 60], completed_at=now - timedelta(days=35))
+        self.old_created_at = now - timedelta(days=40)
+        Task.objects.filter(id=self.old_done.id).update(created_at=self.old_created_at)
+        self.expired = [make_task(telegram_user_id=2, deadline=now - timedelta(days=31 + i)) for i in range(4)]
+        self.fresh_done = make_task(status=Task.Status.DONE, completed_at=now)
+        self.recently_expired = make_task(deadline=now - timedelta(days=1))
+        # Создана давно, выполнена только что: срок хранения считается от выполнения
+        self.just_completed = make_task(deadline=now + timedelta(days=1))
+        Task.objects.filter(id=self.just_completed.id).update(created_at=self.old_created_at)
+        update_task_status(self.just_completed, Task.Status.DONE)
+
+    @override_settings(TASKS_ARCHIVE_AFTER_DAYS=30)
+    def test_moves_old_done_and_expired_tasks(self, reminders_redis, versions_redis):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(archive_tasks(batch_size=2), 5)
+
+        archived_ids = sorted([self.old_done.id] + [task.id for task in self.expired])
+        self.assertEqual(sorted(ArchivedTask.objects.values_list('id', flat=True)), archived_ids)
+        self.assertEqual(sorted(Task.objects.values_list('id', flat=True)),
+                         [self.fresh_done.id, self.recently_expired.id, self.just_completed.id])
+
+        archived = ArchivedTask.objects.get(id=self.old_done.id)
+        self.assertEqual((archived.title, archived.status, archived.reminder_offsets, archived.created_at,
+                          archived.completed_at),
+                         (self.old_done.title, Task.Status.DONE, [1440, 60], self.old_created_at,
+                          self.old_done.completed_at))
+        cancelled = sorted(task_id for call in reminders_redis.return_value.zrem.call_args_list
+                           for task_id in call.args[1:])
+        self.assertEqual(cancelled, archived_ids)
+
+    def test_query_count_depends_on_batches_not_rows(self, reminders_redis, versions_redis):
+        with CaptureQueriesContext(connection) as five_rows:
+            archive_tasks(older_than=timedelta(days=30), batch_size=10)
+
+        # По одной задаче на каждый проход: выполненная давно и давно просроченная
+        make_task(status=Task.Status.DONE, completed_at=timezone.now() - timedelta(days=60))
+        make_task(deadline=timezone.now() - timedelta(days=60))
+        with CaptureQueriesContext(connection) as two_rows:
+            archive_tasks(older_than=timedelta(days=30), batch_size=10)
+
+        self.assertEqual(len(five_rows), len(two_rows))
+
+    def test_management_command(self, reminders_redis, versions_redis):
+        out = io.StringIO()
+        call_command('archive_tasks', '--days', '30', '--batch-size', '2', stdout=out)
+        self.assertIn('5', out.getvalue())
+        self.assertEqual(ArchivedTask.objects.count(), 5)
+
+    @override_settings(TASKS_PAGE_SIZE=3)
+    def test_list_includes_archive_only_on_request(self, reminders_redis, versions_redis):
+        archive_tasks(older_than=timedelta(days=30))
+        live = make_task(telegram_user_id=2)
+        url = '/api/tasks/?telegram_user_id=2'
+
+        self.assertEqual([task['id'] for task in self.client.get(url).data['results']], [live.id])
+
+        pages, next_url = [], f'{url}&include_archived=1'
+        while next_url:
+            response = self.client.get(next_url)
+            pages.append([task['id'] for task in response.data['results']])
+            next_url = response.data['next']
+        expected = [task.id for task in reversed(self.expired)] + [live.id]
+        self.assertEqual(pages, [expected[:3], expected[3:]])
+        # Набор напоминаний в архиве тот же, что был у задачи
+        response = self.client.get('/api/tasks/?telegram_user_id=1&include_archived=1')
+        offsets = {task['id']: task['reminder_offsets'] for task in response.data['results']}
+        self.assertEqual(offsets[self.old_done.id], [1440, 60])
+
+
+@mock.patch('tasks.services.reminder_schedule.get_redis', mock.MagicMock())
+@mock.patch('tasks.services.task_versions.get_redis')
+class AsyncViewsTests(TestCase):
+    """Async-представления (ASGI) отвечают так же, как TaskViewSet."""
+    factory = AsyncRequestFactory()
+
+    def setUp(self):
+        deadline = timezone.now() + timedelta(days=1)
+        self.tasks = [make_task(telegram_user_id=5, title=f'Задача {i}', deadline=deadline + timedelta(hours=i))
+                      for i in range(3)]
+
+    async def assertSameResponse(self, async_view, method, url, *args, data=None):
+        kwargs = {'data': json.dumps(data), 'content_type': 'application/json'} if data is not None else {}
+        expected = await getattr(self.async_client, method)(url, **kwargs)
+        actual = await async_view(getattr(self.factory, method)(url, **kwargs), *args)
+        self.assertEqual((actual.status_code, json.loads(actual.content or b'null')),
+                         (expected.status_code, json.loads(expected.content or b'null')))
+        return actual
+
+    async def test_list_matches_sync_view(self, get_redis):
+        get_redis.return_value.pipeline.return_value.execute.return_value = [None, b'0']
+        response = await self.assertSameResponse(task_list_create, 'get', '/api/tasks/?telegram_user_id=5&page_size=2')
+        self.assertIsNotNone(json.loads(response.content)['next'])
+        await self.assertSameResponse(task_list_create, 'get', '/api/tasks/?telegram_user_id=abc')
+
+    async def test_retrieve_matches_sync_view(self, get_redis):
+        get_redis.return_value.pipeline.return_value.execute.return_value = [None, b'0']
+        await self.assertSameResponse(task_detail, 'get', f'/api/tasks/{self.tasks[0].id}/', self.tasks[0].id)
+        await self.assertSameResponse(task_detail, 'get', '/api/tasks/999/', 999)
+
+    async def test_create(self, get_redis):
+        data = {'title': 'Новая', 'telegram_user_id': 5, 'deadline_input': '31.12.2099 23:59'}
+        response = await task_list_create(self.factory.post('/api/tasks/', data, content_type='application/json'))
+        self.assertEqual(response.status_code, 201)
+        task = await Task.objects.aget(id=json.loads(response.content)['id'])
+        self.assertEqual(json.loads(response.content), json.loads(JSONRenderer().render(TaskSerializer(task).data)))
+        get_redis.return_value.pipeline.return_value.incr.assert_any_call(USER_VERSION_KEY.format(user_id=5))
+
+        await self.assertSameResponse(task_list_create, 'post', '/api/tasks/',
+                                      data=dict(data, deadline_input='01.01.2000 00:00'))
+
+    async def test_status_update_matches_sync_view(self, get_redis):
+        task_id = self.tasks[0].id
+        url = f'/api/tasks/{task_id}/'
+        await self.assertSameResponse(task_detail, 'patch', url, task_id, data={'status': 'done', 'title': 'x'})
+
+        response = await task_detail(self.factory.patch(url, {'status': 'done'}, content_type='application/json'),
+                                     task_id)
+        self.assertEqual((response.status_code, json.loads(response.content)), (200, {'status': 'done'}))
+        self.assertEqual((await Task.objects.aget(id=task_id)).status, Task.Status.DONE)
+
+        # Повторная смена на тот же статус — ошибка валидации в обоих режимах
+        await self.assertSameResponse(task_detail, 'patch', url, task_id, data={'status': 'done'})
+
+    def test_async_status_update_follows_sync_transaction_rules(self, get_redis):
+        task = self.tasks[0]
+        with self.captureOnCommitCallbacks() as callbacks:
+            async_to_sync(aupdate_task_status)(task, Task.Status.DONE)
+            # Версии и расписание меняются только после коммита, а не сразу после UPDATE
+            get_redis.return_value.pipeline.return_value.incr.assert_not_called()
+        self.assertEqual(len(callbacks), 2)
+        stored = Task.objects.get(pk=task.pk)
+        self.assertEqual((stored.status, stored.next_notification_at), (Task.Status.DONE, None))
+        self.assertIsNotNone(stored.completed_at)
+
+    async def test_list_honours_etag(self, get_redis):
+        get_redis.return_value.pipeline.return_value.execute.return_value = [None, b'7']
+        response = await task_list_create(self.factory.get('/api/tasks/?telegram_user_id=5'))
+        etag = response['ETag']
+        response = await task_list_create(self.factory.get('/api/tasks/?telegram_user_id=5',
+                                                           headers={'If-None-Match': etag}))
+        self.assertEqual(response.status_code, 304)
+
+    async def test_access_policy_matches_sync_view(self, get_redis):
+        from rest_framework.permissions import IsAuthenticated
+        from rest_framework.throttling import BaseThrottle
+
+        class Closed(BaseThrottle):
+            def allow_request(self, request, view):
+                return False
+
+            def wait(self):
+                return 7
+
+        # Политика задаётся только на TaskViewSet — ASGI-путь обязан её соблюдать
+        with mock.patch.object(TaskViewSet, 'permission_classes', [IsAuthenticated]):
+            response = await self.assertSameResponse(task_list_create, 'get', '/api/tasks/?telegram_user_id=5')
+        self.assertEqual(response.status_code, 403)
+
+        url = f'/api/tasks/{self.tasks[0].id}/'
+        with mock.patch.object(TaskViewSet, 'throttle_classes', [Closed]):
+            response = await self.assertSameResponse(task_detail, 'patch', url, self.tasks[0].id,
+                                                     data={'status': 'done'})
+        self.assertEqual((response.status_code, response['Retry-After']), (429, '7'))
+        self.assertEqual((await Task.objects.aget(id=self.tasks[0].id)).status, Task.Status.UNDONE)
+
+    async def test_browsable_api_is_served_by_viewset(self, get_redis):
+        request = self.factory.get('/api/tasks/?telegram_user_id=5', headers={'Accept': 'text/html'})
+        response = await task_list_create(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('text/html', response['Content-Type'])
+
+    async def test_unsupported_method(self, get_redis):
+        response = await task_detail(self.factory.delete('/api/tasks/1/'), 1)
+        self.assertEqual((response.status_code, response['Allow']), (405, 'GET, PATCH'))
+
+    @override_settings(DATABASE_REPLICAS=['replica_0'], REPLICA_PIN_SECONDS=5)
+    async def test_async_middleware_sees_writes_made_by_the_orm(self, get_redis):
+        async def view(request):
+            await Task.objects.filter(id=self.tasks[0].id).aupdate(title='Изменена')
+            return HttpResponse()
+
+        middleware = ReplicaPinningMiddleware(view)
+        response = await middleware(self.factory.post('/api/tasks/'))
+        self.assertIn(ReplicaPinningMiddleware.COOKIE_NAME, response.cookies)
+
+
+def sample(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+@mock.patch('tasks.services.reminder_schedule.get_redis', mock.MagicMock())
+@mock.patch('tasks.services.task_versions.get_redis', mock.MagicMock())
+class MetricsTests(APITestCase):
+    def test_endpoint_exposes_prometheus_format(self):
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        self.assertIn(b'# TYPE task_api_request_duration_seconds histogram', response.content)
+
+    def test_api_request_latency_and_queries_per_action(self):
+        make_task(telegram_user_id=5)
+        requests = sample('task_api_request_duration_seconds_count', action='list', status='200')
+        queries = sample('task_api_db_queries_sum', action='list')
+
+        self.client.get('/api/tasks/?telegram_user_id=5')
+
+        self.assertEqual(sample('task_api_request_duration_seconds_count', action='list', status='200'), requests + 1)
+        self.assertGreaterEqual(sample('task_api_db_queries_sum', action='list'), queries + 1)
+
+    async def test_async_view_queries_are_counted(self):
+        task = await Task.objects.acreate(title='Задача', deadline=timezone.now() + timedelta(days=1),
+                                          telegram_user_id=5)
+        request = AsyncRequestFactory().get(f'/api/tasks/{task.id}/')
+        request.resolver_match = mock.Mock(func=task_detail)
+        queries = sample('task_api_db_queries_sum', action='retrieve')
+
+        async def view(request):
+            return await task_detail(request, task.id)
+
+        response = await MetricsMiddleware(view)(request)
+
+        self.assertEqual(response.status_code, 200)
+        # aget выполняется в потоке sync_to_async — запрос всё равно учтён
+        self.assertEqual(sample('task_api_db_queries_sum', action='retrieve'), queries + 1)
+
+    @override_settings(DEADLINE_CLAIM_BATCH_SIZE=2)
+    @mock.patch('tasks.tasks.send_telegram_notifications.delay')
+    def test_check_deadlines_batch_sizes(self, delay):
+        for _ in range(3):
+            make_task()
+        batches = sample('reminder_claim_batch_size_count', task='check_deadlines')
+        claimed = sample('reminder_claim_batch_size_sum', task='check_deadlines')
+        runs = sample('reminder_scan_duration_seconds_count', task='check_deadlines')
+
+        check_deadlines()
+
+        self.assertEqual(sample('reminder_claim_batch_size_count', task='check_deadlines'), batches + 2)
+        self.assertEqual(sample('reminder_claim_batch_size_sum', task='check_deadlines'), claimed + 3)
+        self.assertEqual(sample('reminder_scan_duration_seconds_count', task='check_deadlines'), runs + 1)
+
+    @mock.patch('tasks.tasks.get_redis', mock.Mock())
+    @mock.patch('tasks.tasks.TelegramCircuitBreaker', mock.Mock())
+    @mock.patch('tasks.tasks.TelegramRateLimiter')
+    @mock.patch('tasks.tasks.send_message')
+    def test_send_outcomes_and_reminder_lag(self, send_message, limiter):
+        limiter.return_value.try_acquire.return_value = 0
+        send_message.side_effect = [None, TelegramAPIError('Forbidden: bot was blocked by the user', status_code=403)]
+        remind_at = timezone.now() - timedelta(seconds=30)
+        batch = [dict(make_notification(i, i), remind_at=remind_at.isoformat()) for i in range(2)]
+        sent, failed = sample('telegram_send_total', outcome='sent'), sample('telegram_send_total', outcome='failed')
+        lag_count, lag_sum = sample('reminder_lag_seconds_count'), sample('reminder_lag_seconds_sum')
+
+        send_telegram_notifications(batch)
+
+        self.assertEqual(sample('telegram_send_total', outcome='sent'), sent + 1)
+        self.assertEqual(sample('telegram_send_total', outcome='failed'), failed + 1)
+        self.assertEqual(sample('reminder_lag_seconds_count'), lag_count + 1)
+        self.assertAlmostEqual(sample('reminder_lag_seconds_sum') - lag_sum, 30, delta=5)
+
+    @mock.patch('tasks.tasks.get_redis', mock.Mock())
+    @mock.patch('tasks.tasks.TelegramCircuitBreaker', mock.Mock())
+    @mock.patch('tasks.tasks.TelegramRateLimiter')
+    @mock.patch('tasks.tasks.send_message')
+    def test_rate_limited_send_counts_retry(self, send_message, limiter):
+        limiter.return_value.try_acquire.return_value = 0
+        send_message.side_effect = TelegramAPIError('Too Many Requests', status_code=429, retry_after=3)
+        retries = sample('telegram_send_retries_total', reason='rate_limited')
+
+        with mock.patch.object(send_telegram_notifications, 'apply_async'):
+            send_telegram_notifications([make_notification(1, 1)])
+
+        self.assertEqual(sample('telegram_send_retries_total', reason='rate_limited'), retries + 1)
+
+
+class BotWebhookTests(SimpleTestCase):
+    """Webhook-реплика бота: подтверждает обновления сразу, но обрабатывает не больше max_concurrency."""
+
+    async def test_bounded_concurrency_and_secret(self):
+        from aiogram import Bot, Dispatcher
+        from aiohttp import web
+        from aiohttp.test_utils import TestClient, TestServer
+
+        from benchmarks.fake_servers import make_command_update
+        from telegram_bot.core import BoundedRequestHandler
+
+        dispatcher = Dispatcher()
+        release = asyncio.Event()
+        running, peak, handled = 0, 0, []
+
+        @dispatcher.message()
+        async def handle(message):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await release.wait()
+            running -= 1
+            handled.append(message.chat.id)
+
+        app = web.Application()
+        BoundedRequestHandler(dispatcher, Bot('123456:TEST'), max_concurrency=2, secret_token='s').register(
+            app, path='/webhook')
+        headers = {'X-Telegram-Bot-Api-Secret-Token': 's'}
+
+        async with TestClient(TestServer(app)) as client:
+            response = await client.post('/webhook', json=make_command_update(1, 1, '/start'))
+            self.assertEqual(response.status, 401)
+
+            posts = [asyncio.ensure_future(client.post('/webhook', json=make_command_update(i, i, '/start'),
+                                                       headers=headers)) for i in range(4)]
+            await asyncio.sleep(0.1)
+            # Два слота заняты — остальные запросы ждут, не получив подтверждения
+            self.assertEqual(sum(post.done() for post in posts), 2)
+            release.set()
+            self.assertEqual([(await post).status for post in posts], [200] * 4)
+
+        # Остановка сервера дожидается уже подтверждённых обновлений
+        self.assertEqual((sorted(handled), peak), ([0, 1, 2, 3], 2))
+
+
+class BotShardingTests(SimpleTestCase):
+    """Воркеры бота: обновления одного чата — в одном процессе и по порядку, разные чаты — параллельно."""
+
+    def test_shard_key_is_chat(self):
+        from aiogram.types import Update
+
+        from benchmarks.fake_servers import make_command_update
+        from telegram_bot.sharding import shard_key
+
+        update = Update.model_validate(make_command_update(1, 42, '/start'))
+        self.assertEqual(shard_key(update), 42)
+
+    async def test_feeder_keeps_chat_order(self):
+        from aiogram import Bot, Dispatcher
+        from aiogram.types import Update
+
+        from benchmarks.fake_servers import make_command_update
+        from telegram_bot.sharding import ChatOrderedFeeder
+
+        dispatcher = Dispatcher()
+        handled = []
+
+        @dispatcher.message()
+        async def handle(message):
+            # Первое обновление чата 0 — медленное
+            await asyncio.sleep(0.05 if message.message_id == 0 else 0)
+            handled.append((message.chat.id, message.message_id))
+
+        feeder = ChatOrderedFeeder(mock.Mock(dp=dispatcher, bot=Bot('123456:TEST')), max_concurrency=4)
+        for update_id in range(6):
+            await feeder.feed(Update.model_validate(make_command_update(update_id, update_id % 2, '/start')))
+        await feeder.join()
+
+        self.assertEqual([message_id for chat, message_id in handled if chat == 0], [0, 2, 4])
+        self.assertEqual([message_id for chat, message_id in handled if chat == 1], [1, 3, 5])
+        # Пока чат 0 ждёт медленное обновление, чат 1 обрабатывается целиком
+        self.assertEqual(handled[:3], [(1, 1), (1, 3), (1, 5)])
+
+
+class BotOutboxTests(SimpleTestCase):
+    """Исходящие вызовы бота: пауза по retry_after, приоритеты, общий лимит с напоминаниями, схлопывание правок."""
+
+    async def test_retry_after_order_and_collapsed_edits(self):
+        from aiogram.exceptions import TelegramRetryAfter
+        from aiogram.methods import EditMessageText, SendMessage
+
+        from telegram_bot.outbox import Outbox
+
+        requests = []
+
+        async def make_request(bot, method):
+            if not requests:
+                requests.append(None)
+                raise TelegramRetryAfter(method=method, message='Too Many Requests', retry_after=0.2)
+            requests.append((method.chat_id, method.text))
+            return method.text
+
+        shared_limit = mock.Mock(try_acquire=mock.AsyncMock(return_value=0), pause=mock.AsyncMock())
+        outbox = Outbox(global_rate=100, shared_limit=shared_limit)
+        await outbox.start()
+        try:
+            first = asyncio.ensure_future(outbox(make_request, None, SendMessage(chat_id=1, text='первый')))
+            await asyncio.sleep(0.05)
+            # Пока отправка на паузе, в очередь встают два ответа и две правки одного сообщения
+            second = asyncio.ensure_future(outbox(make_request, None, SendMessage(chat_id=2, text='второй')))
+            await asyncio.sleep(0)
+            reply = asyncio.ensure_future(outbox(make_request, None, SendMessage(chat_id=3, text='ответ')))
+            edits = [asyncio.ensure_future(outbox(make_request, None, EditMessageText(chat_id=4, message_id=7, text=text)))
+                     for text in ('страница 1', 'страница 2')]
+
+            results = await asyncio.gather(first, second, reply, *edits)
+        finally:
+            await outbox.close()
+
+        self.assertEqual(results, ['первый', 'второй', 'ответ', 'страница 2', 'страница 2'])
+        self.assertEqual(requests[1:], [(1, 'первый'), (2, 'второй'), (3, 'ответ'), (4, 'страница 2')])
+        self.assertEqual((outbox.stats['rate_limited'], outbox.stats['collapsed']), (1, 1))
+        # 429 останавливает и другие процессы; каждая попытка берёт токен общей корзины
+        shared_limit.pause.assert_awaited_once_with(0.2)
+        self.assertEqual(shared_limit.try_acquire.await_count, 5)
+
+    async def test_interactive_reply_overtakes_bulk(self):
+        from aiogram.exceptions import TelegramRetryAfter
+        from aiogram.methods import SendMessage
+
+        from telegram_bot.outbox import Outbox, bulk
+
+        requests = []
+
+        async def make_request(bot, method):
+            if not requests:
+                requests.append(None)
+                raise TelegramRetryAfter(method=method, message='Too Many Requests', retry_after=0.2)
+            requests.append((method.chat_id, method.text))
+            return method.text
+
+        outbox = Outbox(global_rate=100)
+        await outbox.start()
+        try:
+            first = asyncio.ensure_future(outbox(make_request, None, SendMessage(chat_id=9, text='первый')))
+            await asyncio.sleep(0.05)
+            # Пока отправка на паузе, в очередь встаёт рассылка в два чата, затем ответы в один из них и в третий
+            with bulk():
+                broadcast = [asyncio.ensure_future(outbox(make_request, None, SendMessage(chat_id=chat_id, text=text)))
+                             for chat_id, text in ((1, 'рассылка 1'), (1, 'рассылка 2'), (2, 'рассылка'))]
+            await asyncio.sleep(0)
+            replies = [asyncio.ensure_future(outbox(make_request, None, SendMessage(chat_id=chat_id, text='ответ')))
+                       for chat_id in (1, 3)]
+
+            await asyncio.gather(first, *broadcast, *replies)
+        finally:
+            await outbox.close()
+
+        # Ответы обгоняют рассылку и в том же чате 1, и в других чатах; пока ответ в чат 1
+        # ещё отправляется, очередь чата 1 ждёт, а рассылка в чат 2 уходит
+        self.assertEqual(requests[1:], [(9, 'первый'), (1, 'ответ'), (3, 'ответ'),
+                                        (2, 'рассылка'), (1, 'рассылка 1'), (1, 'рассылка 2')])
+
+    async def test_shared_limit_holds_sends(self):
+        from aiogram.methods import SendMessage
+
+        from telegram_bot.outbox import Outbox
+
+        # Общую корзину уже выбрали напоминания: первая попытка ждёт 0.1 с
+        shared_limit = mock.Mock(try_acquire=mock.AsyncMock(side_effect=[0.1, 0]), pause=mock.AsyncMock())
+        make_request = mock.AsyncMock(return_value='ok')
+        outbox = Outbox(global_rate=100, shared_limit=shared_limit)
+        await outbox.start()
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        try:
+            self.assertEqual(await outbox(make_request, None, SendMessage(chat_id=1, text='ответ')), 'ok')
+        finally:
+            await outbox.close()
+        self.assertGreaterEqual(loop.time() - started, 0.1)
+        self.assertEqual((shared_limit.try_acquire.await_count, make_request.await_count), (2, 1))
+
+    async def test_calls_without_chat_bypass_queue(self):
+        from aiogram.methods import GetMe
+
+        from telegram_bot.outbox import Outbox
+
+        make_request = mock.AsyncMock(return_value='ok')
+        outbox = Outbox()
+        await outbox.start()
+        try:
+            self.assertEqual(await outbox(make_request, None, GetMe()), 'ok')
+        finally:
+            await outbox.close()
+        self.assertEqual(outbox.stats['sent'], 0)
+
+
+class BotTasksPageTests(SimpleTestCase):
+    """/mytasks по страницам: одна страница — одно сообщение, соседние — по курсору из кнопок."""
+
+    def make_bot(self, tasks, next_cursor=None, previous_cursor=None):
+        from telegram_bot.backends import TaskBackend
+        from telegram_bot.core import TelegramBot
+
+        backend = mock.Mock(spec=TaskBackend)
+        backend.get_user_tasks_page = mock.AsyncMock(
+            return_value={'results': tasks, 'next': next_cursor, 'previous': previous_cursor})
+        return TelegramBot(token='123456:TEST', backend=backend, page_size=len(tasks) or 10)
+
+    @staticmethod
+    def task(task_id, title='Задача', description=''):
+        return {'id': task_id, 'title': title, 'description': description, 'deadline_local': '31.12.2030 23:59',
+                'status': 'undone', 'notification_sent': False, 'created_at': '2025-05-20T21:17:00Z'}
+
+    async def test_page_fits_one_message_and_escapes_markup(self):
+        from telegram_bot.core import MESSAGE_LIMIT
+
+        tasks = [self.task(i, title='<&>' * 85, description='&' * 100) for i in range(15)]
+        bot = self.make_bot(tasks)
+
+        page = await bot._render_tasks_page(7)
+
+        self.assertLessEqual(len(page['text']), MESSAGE_LIMIT)
+        self.assertNotIn('<&>', page['text'])
+        # Не влезающие целиком задачи сокращены, но каждая осталась на странице
+        self.assertEqual(page['text'].count('<code>'), 15)
+        bot.backend.get_user_tasks_page.assert_awaited_once_with(7, None, 15)
+
+    async def test_page_too_long_even_when_short_is_refetched_smaller(self):
+        from telegram_bot.core import MESSAGE_LIMIT
+
+        tasks = [self.task(i, title='&' * 40) for i in range(40)]
+        bot = self.make_bot(tasks)
+
+        async def get_page(user_id, cursor, page_size):
+            return {'results': tasks[:page_size], 'next': f'after-{page_size - 1}', 'previous': None}
+        bot.backend.get_user_tasks_page.side_effect = get_page
+
+        page = await bot._render_tasks_page(7)
+
+        self.assertLessEqual(len(page['text']), MESSAGE_LIMIT)
+        calls = bot.backend.get_user_tasks_page.await_args_list
+        (_, _, first_size), (_, cursor, fitting) = [call.args for call in calls]
+        self.assertEqual((first_size, cursor), (40, None))
+        # На страницу попали только влезающие задачи, а «дальше» начинается сразу за последней из них
+        self.assertEqual(page['text'].count('<code>'), fitting)
+        self.assertEqual(page['next'], f'after-{fitting - 1}')
+        self.assertLess(fitting, 40)
+
+    async def test_navigation_buttons_carry_cursors(self):
+        from telegram_bot.core import TasksPage
+
+        bot = self.make_bot([self.task(1)], next_cursor='MHwyMDMwLTEyLTMxfDE', previous_cursor='MXwyMDMwfDE')
+
+        page = await bot._render_tasks_page(7, 'c3RhcnQ')
+        buttons = bot._page_markup(page).inline_keyboard[0]
+
+        self.assertEqual([button.text for button in buttons], ['◀', '▶'])
+        self.assertEqual(TasksPage.unpack(buttons[1].callback_data).cursor, 'MHwyMDMwLTEyLTMxfDE')
+        bot.backend.get_user_tasks_page.assert_awaited_once_with(7, 'c3RhcnQ', 1)
+        self.assertIsNone(bot._page_markup({'text': '', 'next': None, 'previous': None}))
+
+
+@mock.patch('tasks.services.reminder_schedule.get_redis', mock.MagicMock())
+@mock.patch('tasks.services.task_versions.get_redis', mock.MagicMock())
+class DirectBotBackendTests(APITestCase):
+    """Бот без HTTP: те же данные, что отдаёт API, за один запрос к БД."""
+
+    def setUp(self):
+        from telegram_bot.backends import DirectTaskBackend
+
+        self.backend = DirectTaskBackend()
+        deadline = timezone.now() + timedelta(days=1)
+        self.tasks = [make_task(telegram_user_id=7, title=f'Задача {i}', deadline=deadline - timedelta(hours=i))
+                      for i in range(3)]
+        make_task(telegram_user_id=8)
+
+    def test_status_update_uses_service(self):
+        task_ids = [self.tasks[0].id, 999]
+
+        result = async_to_sync(self.backend.update_tasks_status)(task_ids)
+
+        self.assertEqual(result, {'changed': [self.tasks[0].id], 'unchanged': [], 'missing': [999]})
+        self.tasks[0].refresh_from_db()
+        self.assertEqual(self.tasks[0].status, Task.Status.DONE)
+
+    def test_pages_match_api_cursors(self):
+        first = async_to_sync(self.backend.get_user_tasks_page)(7, page_size=2)
+        api = self.client.get('/api/tasks/?telegram_user_id=7&page_size=2').json()
+        self.assertEqual(first['results'], api['results'])
+        self.assertIn(f"cursor={first['next']}", api['next'])
+
+        second = async_to_sync(self.backend.get_user_tasks_page)(7, first['next'], page_size=2)
+        self.assertEqual([task['id'] for task in second['results']], [self.tasks[0].id])
+        self.assertIsNone(second['next'])
+
+        back = async_to_sync(self.backend.get_user_tasks_page)(7, second['previous'], page_size=2)
+        self.assertEqual(back['results'], first['results'])
@@ -1,13 +1,30 @@
+from django.conf import settings
 from django.urls import path
 from .views import TaskViewSet
 
-urlpatterns = [
-    path('tasks/', TaskViewSet.as_view({
+if settings.ASYNC_API_VIEWS:
+    # ASGI: основные эндпоинты — нативные async-представления (см. async_views.py)
+    from .async_views import task_detail, task_list_create
+else:
+    task_list_create = TaskViewSet.as_view({
         'post': 'create',
         'get': 'list' # для фильтрации  в TaskViewSet есть filter_backends и filterset_fields
-    }), name='task-list-create'),
-    path('tasks/<int:pk>/', TaskViewSet.as_view({
+    })
+    task_detail = TaskViewSet.as_view({
         'get': 'retrieve',
         'patch': 'partial_update'
-    }), name='task-detail'),
+    })
+
+urlpatterns = [
+    path('tasks/', task_list_create, name='task-list-create'),
+    path('tasks/bulk/', TaskViewSet.as_view({
+        'post': 'bulk_create'
+    }), name='task-bulk-create'),
+    path('tasks/status/', TaskViewSet.as_view({
+        'patch': 'bulk_status_update'
+    }), name='task-bulk-status'),
+    path('tasks/deadline_soon/', TaskViewSet.as_view({
+        'get': 'deadline_soon'
+    }), name='task-deadline-soon'),
+    path('tasks/<int:pk>/', task_detail, name='task-detail'),
 ]
\ No newline at end of file
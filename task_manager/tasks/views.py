@@ -1,10 +1,20 @@
-from typing import List
+from typing import List, Optional
+from django.conf import settings
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import viewsets, status
+from rest_framework.renderers import BrowsableAPIRenderer
 from rest_framework.response import Response
 from rest_framework.decorators import action
-from .models import Task
-from .serializers import TaskSerializer, TaskStatusUpdateSerializer
+from task_manager.db_router import pin_primary
+from .etags import etag_matches, make_etag, wants_archived
+from .models import ArchivedTask, Task
+from .pagination import DeadlineCursorPagination
+from .renderers import FastJSONRenderer
+from .services.task_versions import get_task_version, get_user_version, recently_written
+from .serializers import (
+    TaskSerializer, TaskStatusUpdateSerializer, TaskBulkStatusUpdateSerializer,
+    TASK_READ_FIELDS, serialize_task_rows,
+)
 from django.utils import timezone
 from datetime import timedelta
 
@@ -18,8 +28,12 @@ class TaskViewSet(viewsets.ModelViewSet):
         'deadline',  # Для проверки в Celery + вывод в API
         'telegram_user_id',  # Для фильтрации (?telegram_user_id=) и Celery
         'status',  # Для PATCH /tasks/<id>/ (обновление статуса)
+        'notification_sent',  # Вывод в API и пересчёт напоминаний при смене статуса
+        'reminder_offsets',  # То же
     )
     serializer_class = TaskSerializer
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
+    pagination_class = DeadlineCursorPagination  # ?cursor=&page_size=
     filter_backends = [DjangoFilterBackend] # Только фильтрация по telegram_user_id
     filterset_fields: List[str] = ['telegram_user_id', 'status']  # Именно это поле позволяет фильтровать
     lookup_field = 'pk'
@@ -27,8 +41,49 @@ class TaskViewSet(viewsets.ModelViewSet):
     def get_serializer_class(self):
         if self.action == 'partial_update':
             return TaskStatusUpdateSerializer  # Только статус
+        if self.action == 'bulk_status_update':
+            return TaskBulkStatusUpdateSerializer  # Список ID + статус
         return TaskSerializer  # Все поля для GET/POST
 
+    def _conditional(self, etag: Optional[str], render) -> Response:
+        if etag_matches(self.request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+        response = render()
+        if etag and response.status_code == status.HTTP_200_OK:
+            response['ETag'] = etag
+        return response
+
+    def list(self, request, *args, **kwargs):
+        """
+        Список задач по быстрому пути: кортежи values_list вместо моделей и ModelSerializer.
+        ?include_archived=1 добавляет задачи из архива в общий порядок по дедлайну.
+        """
+        etag = None
+        user_id = request.query_params.get('telegram_user_id')
+        if user_id and user_id.isdigit():
+            etag = make_etag(request, f"user{user_id}", get_user_version(int(user_id)), request.accepted_renderer.format)
+            if recently_written(user_id=int(user_id)):
+                pin_primary()  # Бот перечитывает список сразу после /done — реплика может отставать
+
+        def render():
+            querysets = [self.filter_queryset(self.get_queryset())]
+            if wants_archived(request.query_params):
+                querysets.append(self.filter_queryset(ArchivedTask.objects.all()))
+            page = self.paginator.paginate_querysets(
+                [queryset.values_list(*TASK_READ_FIELDS, named=True) for queryset in querysets], request)
+            return self.get_paginated_response(serialize_task_rows(page))
+
+        return self._conditional(etag, render)
+
+    def retrieve(self, request, *args, **kwargs):
+        etag = None
+        if str(kwargs.get(self.lookup_field, '')).isdigit():
+            task_id = int(kwargs[self.lookup_field])
+            etag = make_etag(request, f"task{task_id}", get_task_version(task_id), request.accepted_renderer.format)
+            if recently_written(task_id=task_id):
+                pin_primary()
+        return self._conditional(etag, lambda: super(TaskViewSet, self).retrieve(request, *args, **kwargs))
+
     # обновление статуса задачи
     def partial_update(self, request, *args, **kwargs):
         instance = self.get_object()
@@ -48,15 +103,33 @@ class TaskViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)  # Вернёт только {"status": "done"}
 
 
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk_create(self, request):
+        """Пакетное создание задач: массив задач в теле, в ответе — ID созданных"""
+        serializer = self.get_serializer(data=request.data, many=True, max_length=settings.TASKS_BULK_MAX_ITEMS)
+        serializer.is_valid(raise_exception=True)
+        tasks = serializer.save()
+        return Response({'ids': [task.id for task in tasks]}, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['patch'], url_path='status')
+    def bulk_status_update(self, request):
+        """Пакетное обновление статуса: {"ids": [...], "status": "done"}"""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response(serializer.save())
+
     @action(detail=False, methods=['get'])
     def deadline_soon(self, request):
-        """Дополнительный endpoint для Celery чтобы находить задачи с приближающимся дедлайном"""
-        soon_deadline = timezone.now() + timedelta(minutes=10)
+        """
+        Невыполненные задачи с дедлайном в ближайшие ?within=<минуты>.
+        По умолчанию окно — самое раннее напоминание из TASK_REMINDER_OFFSETS.
+        """
+        within = request.query_params.get('within', '')
+        minutes = int(within) if within.isdigit() else max(settings.TASK_REMINDER_OFFSETS, default=0)
+        now = timezone.now()
         tasks = Task.objects.filter(
-            deadline__lte=soon_deadline,
-            deadline__gte=timezone.now(),
+            deadline__lte=now + timedelta(minutes=minutes),
+            deadline__gte=now,
             status=Task.Status.UNDONE
-        )
-        serializer = self.get_serializer(tasks, many=True)
-        return Response(serializer.data)
-
+        ).values_list(*TASK_READ_FIELDS)
+        return Response(serialize_task_rows(tasks))
@@ -0,0 +1,167 @@
+"""Where the bot reads and changes tasks: the REST API over HTTP or the Django ORM in-process."""
+import asyncio
+import logging
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+import aiohttp
+from asgiref.sync import sync_to_async
+
+logger = logging.getLogger(__name__)
+
+
+class TaskBackend:
+    """Task operations used by the bot. Task dicts have the same shape as the API list items."""
+
+    async def start(self) -> None:
+        """Acquire resources when the dispatcher starts."""
+
+    async def close(self) -> None:
+        """Release resources when the dispatcher stops."""
+
+    async def get_user_tasks_page(self, user_id: int, cursor: Optional[str] = None,
+                                  page_size: int = 10) -> Optional[Dict]:
+        """Fetch one page of a user's tasks, ordered by deadline.
+
+        Args:
+            user_id: Telegram user ID
+            cursor: Cursor token of the page; the first page if not set
+            page_size: Tasks per page
+
+        Returns:
+            Dict with 'results' and the 'next' and 'previous' cursor tokens (None at the ends),
+            or None if error occurs
+        """
+        raise NotImplementedError
+
+    async def update_tasks_status(self, task_ids: List[int], status: str = 'done') -> Optional[Dict[str, List[int]]]:
+        """Set the status of several tasks at once.
+
+        Args:
+            task_ids: IDs of the tasks to update
+            status: New status
+
+        Returns:
+            IDs grouped into 'changed', 'unchanged' and 'missing', or None if the update failed
+        """
+        raise NotImplementedError
+
+
+class HttpTaskBackend(TaskBackend):
+    """Task API over HTTP with a shared keep-alive session."""
+
+    def __init__(self, api_url: str, request_timeout: int = 10, max_connections: int = 100) -> None:
+        """
+        Args:
+            api_url: Base URL of the task API
+            request_timeout: Total timeout of one API request, seconds
+            max_connections: Size of the keep-alive connection pool to the API
+        """
+        self.api_url = api_url.rstrip('/')
+        self.request_timeout = request_timeout
+        self.max_connections = max_connections
+        self.session: Optional[aiohttp.ClientSession] = None
+
+    async def start(self) -> None:
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.max_connections),
+            timeout=aiohttp.ClientTimeout(total=self.request_timeout),
+        )
+
+    async def close(self) -> None:
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def get_user_tasks_page(self, user_id: int, cursor: Optional[str] = None,
+                                  page_size: int = 10) -> Optional[Dict]:
+        params = {'telegram_user_id': user_id, 'page_size': page_size}
+        if cursor:
+            params['cursor'] = cursor
+        try:
+            async with self.session.get(f"{self.api_url}/tasks/", params=params) as response:
+                response.raise_for_status()
+                page = await response.json()
+            return {
+                'results': page['results'],
+                'next': self._cursor_token(page['next']),
+                'previous': self._cursor_token(page['previous']),
+            }
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.error(f"API request error for user {user_id}: {e}")
+            return None
+        except Exception as e:
+            logger.error(f"Unexpected error while fetching tasks: {e}")
+            return None
+
+    @staticmethod
+    def _cursor_token(link: Optional[str]) -> Optional[str]:
+        """Cursor token from a page link of the API."""
+        if not link:
+            return None
+        return parse_qs(urlsplit(link).query).get('cursor', [None])[0]
+
+    async def update_tasks_status(self, task_ids: List[int], status: str = 'done') -> Optional[Dict[str, List[int]]]:
+        try:
+            async with self.session.patch(
+                f"{self.api_url}/tasks/status/",
+                json={'ids': task_ids, 'status': status}
+            ) as response:
+                if not response.ok:
+                    return None
+                return await response.json()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.error(f"API request error for tasks {task_ids}: {e}")
+            return None
+        except Exception as e:
+            logger.error(f"Unexpected error while updating tasks {task_ids}: {e}")
+            return None
+
+
+def _list_user_tasks_page(user_id: int, cursor: Optional[str], page_size: int) -> Dict:
+    from task_manager.db_router import pin_primary, pinning_scope
+    from tasks.models import Task
+    from tasks.pagination import DeadlineCursorPagination
+    from tasks.serializers import TASK_READ_FIELDS, serialize_task_rows
+    from tasks.services.task_versions import recently_written
+
+    with pinning_scope():
+        if recently_written(user_id=user_id):
+            pin_primary()
+        paginator = DeadlineCursorPagination()
+        tasks = Task.objects.filter(telegram_user_id=user_id).values_list(*TASK_READ_FIELDS, named=True)
+        rows = paginator.paginate_from_token([tasks], cursor, page_size)
+        return {
+            'results': serialize_task_rows(rows),
+            'next': paginator.next_token(),
+            'previous': paginator.previous_token(),
+        }
+
+
+def _update_tasks_status(task_ids: List[int], status: str) -> Dict[str, List[int]]:
+    from tasks.services.task_status import bulk_update_task_status
+
+    return bulk_update_task_status(task_ids, status)
+
+
+class DirectTaskBackend(TaskBackend):
+    """Django ORM and tasks/services in the bot process: one query per command, no HTTP or DRF.
+
+    Requires ``django.setup()``. Database calls run in Django's shared sync thread
+    (``sync_to_async(thread_sensitive=True)``), as the ORM does under ASGI.
+    """
+
+    async def get_user_tasks_page(self, user_id: int, cursor: Optional[str] = None,
+                                  page_size: int = 10) -> Optional[Dict]:
+        try:
+            return await sync_to_async(_list_user_tasks_page)(user_id, cursor, page_size)
+        except Exception as e:
+            logger.error(f"Database error while fetching tasks of user {user_id}: {e}")
+            return None
+
+    async def update_tasks_status(self, task_ids: List[int], status: str = 'done') -> Optional[Dict[str, List[int]]]:
+        try:
+            return await sync_to_async(_update_tasks_status)(task_ids, status)
+        except Exception as e:
+            logger.error(f"Database error while updating tasks {task_ids}: {e}")
+            return None
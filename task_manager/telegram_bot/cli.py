@@ -1,9 +1,18 @@
 import os
+import argparse
 import asyncio
+import functools
 import logging
 import django
+import redis.asyncio as aioredis
 from django.conf import settings
-from core import TelegramBot
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.fsm.storage.redis import RedisStorage
+from telegram_bot.backends import DirectTaskBackend, HttpTaskBackend
+from telegram_bot.core import TelegramBot
+from telegram_bot.outbox import Outbox
+from telegram_bot.sharding import run_sharded
+from tasks.services.rate_limit import AsyncTelegramRateLimiter
 
 # Настройка Django
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'task_manager.settings')
@@ -11,17 +20,80 @@ django.setup()
 
 logger = logging.getLogger(__name__)
 
-def start_bot():
+def build_bot(backend_name: str = settings.BOT_BACKEND, storage_name: str = settings.BOT_FSM_STORAGE,
+              workers: int = 1) -> TelegramBot:
+    """Бот с настройками из Django; вызывается и в процессах-обработчиках"""
+    if backend_name == 'direct':
+        # Бот работает с той же БД, что и Django: ORM и tasks/services без HTTP
+        backend = DirectTaskBackend()
+    else:
+        backend = HttpTaskBackend(
+            api_url=settings.API_URL,
+            request_timeout=settings.API_REQUEST_TIMEOUT,
+            max_connections=settings.BOT_API_MAX_CONNECTIONS,
+        )
+    if storage_name == 'redis':
+        # Состояние диалога видно всем репликам и воркерам
+        storage = RedisStorage.from_url(settings.REDIS_URL)
+    else:
+        storage = MemoryStorage()
+    return TelegramBot(
+        token=settings.TELEGRAM_BOT_TOKEN,
+        redis_url=settings.REDIS_URL,
+        cache_ttl=settings.BOT_TASKS_CACHE_TTL,
+        backend=backend,
+        storage=storage,
+        page_size=settings.BOT_TASKS_PAGE_SIZE,
+        # Глобальный лимит Telegram один на бота: токены берутся из той же корзины в Redis,
+        # что и у напоминаний Celery; BOT_SEND_RATE — только потолок для всех воркеров процесса
+        outbox=Outbox(
+            global_rate=settings.BOT_SEND_RATE / workers,
+            per_chat_rate=settings.BOT_SEND_PER_CHAT_RATE,
+            per_chat_burst=settings.BOT_SEND_PER_CHAT_BURST,
+            shared_limit=AsyncTelegramRateLimiter(aioredis.Redis.from_url(settings.REDIS_URL)),
+        ),
+    )
+
+def start_bot(mode: str = settings.BOT_MODE, port: int = settings.BOT_WEBHOOK_PORT,
+              backend_name: str = settings.BOT_BACKEND, storage_name: str = settings.BOT_FSM_STORAGE,
+              workers: int = settings.BOT_WORKERS):
     """Запуск бота с настройками из Django"""
     try:
-        bot = TelegramBot(
-            token=settings.TELEGRAM_BOT_TOKEN,
-            api_url=settings.API_URL
-        )
-        asyncio.run(bot.run())
+        bot = build_bot(backend_name, storage_name)
+        if mode == 'webhook':
+            # Реплик может быть несколько: каждая слушает свой порт за балансировщиком
+            asyncio.run(bot.run_webhook(
+                host=settings.BOT_WEBHOOK_HOST,
+                port=port,
+                path=settings.BOT_WEBHOOK_PATH,
+                webhook_url=settings.BOT_WEBHOOK_URL,
+                secret_token=settings.BOT_WEBHOOK_SECRET,
+                max_concurrency=settings.BOT_MAX_CONCURRENT_UPDATES,
+                max_connections=settings.BOT_WEBHOOK_MAX_CONNECTIONS,
+            ))
+        elif workers > 1:
+            # Этот процесс только получает обновления; обрабатывают их воркеры, каждый — свои чаты
+            asyncio.run(run_sharded(
+                bot,
+                functools.partial(build_bot, backend_name, storage_name, workers),
+                workers=workers,
+                max_concurrency=settings.BOT_MAX_CONCURRENT_UPDATES,
+            ))
+        else:
+            asyncio.run(bot.run())
     except Exception as e:
         logger.critical(f"Ошибка при запуске бота: {str(e)}")
         raise
 
 if __name__ == '__main__':
-    start_bot()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Telegram-бот задач')
+    parser.add_argument('--mode', choices=('polling', 'webhook'), default=settings.BOT_MODE)
+    parser.add_argument('--port', type=int, default=settings.BOT_WEBHOOK_PORT, help='Порт webhook-реплики')
+    parser.add_argument('--backend', choices=('http', 'direct'), default=settings.BOT_BACKEND,
+                        help='Задачи через API или напрямую через ORM')
+    parser.add_argument('--storage', choices=('memory', 'redis'), default=settings.BOT_FSM_STORAGE,
+                        help='Хранилище FSM')
+    parser.add_argument('--workers', type=int, default=settings.BOT_WORKERS,
+                        help='Процессы-обработчики в режиме polling (шардирование по chat id)')
+    args = parser.parse_args()
+    start_bot(args.mode, args.port, args.backend, args.storage, args.workers)
@@ -1,94 +1,155 @@
+import asyncio
+import html
+import json
 import logging
+import signal
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional, Set, Tuple
 
-import pytz
-import requests
+import redis.asyncio as aioredis
 from aiogram import Bot, Dispatcher, F, types
+from aiogram.exceptions import TelegramBadRequest
 from aiogram.filters import Command, CommandObject
+from aiogram.filters.callback_data import CallbackData
+from aiogram.methods import TelegramMethod
+from aiogram.fsm.storage.base import BaseStorage
 from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram.types import BotCommand
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 from aiogram.utils.markdown import hbold
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
 
-from utils.timezone import get_local_timezone
+from .backends import HttpTaskBackend, TaskBackend
+from .outbox import Outbox, bulk
 
 logger = logging.getLogger(__name__)
 
+# Version counter bumped by the Django side on every change of a user's tasks
+# (see tasks/services/task_versions.py)
+USER_VERSION_KEY = 'tasks:user_version:{user_id}'
+# Rendered /mytasks pages (hash field: page cursor) together with the version they were rendered for
+TASKS_VIEW_KEY = 'bot:mytasks:pages:{user_id}'
+# Telegram rejects longer message texts
+MESSAGE_LIMIT = 4096
+
+
+class TasksPage(CallbackData, prefix='tp'):
+    """Navigation button of the /mytasks list; ``cursor`` is the API cursor token of the page."""
+    cursor: str = ''
+
+
+class BoundedRequestHandler(SimpleRequestHandler):
+    """Webhook handler that acknowledges updates at once but runs at most ``max_concurrency`` of them.
+
+    When every slot is busy the next request waits for one before it is acknowledged. Telegram and
+    the load balancer in front of the replicas then see back-pressure, instead of one replica
+    queueing an unbounded number of updates in memory. Only the public handler API is used
+    (``handle``, ``resolve_bot``, ``verify_secret``, ``Dispatcher.feed_raw_update``), so aiogram's
+    own background mode is left off and the handler keeps track of its tasks itself.
+    """
+
+    def __init__(self, dispatcher: Dispatcher, bot: Bot, max_concurrency: int, **kwargs: Any) -> None:
+        super().__init__(dispatcher, bot, handle_in_background=False, **kwargs)
+        self.slots = asyncio.Semaphore(max_concurrency)
+        self.in_flight: Set[asyncio.Task] = set()
+
+    async def handle(self, request: web.Request) -> web.Response:
+        bot = await self.resolve_bot(request)
+        if not self.verify_secret(request.headers.get('X-Telegram-Bot-Api-Secret-Token', ''), bot):
+            return web.Response(body='Unauthorized', status=401)
+        update = await request.json(loads=bot.session.json_loads)
+        await self.slots.acquire()
+        task = asyncio.create_task(self._process(bot, update))
+        self.in_flight.add(task)
+        task.add_done_callback(self.in_flight.discard)
+        task.add_done_callback(lambda _: self.slots.release())
+        return web.json_response({}, dumps=bot.session.json_dumps)
+
+    __call__ = handle
+
+    async def _process(self, bot: Bot, update: Dict[str, Any]) -> None:
+        result = await self.dispatcher.feed_raw_update(bot=bot, update=update, **self.data)
+        # A handler may return an API method as its reply; the webhook response is already sent
+        if isinstance(result, TelegramMethod):
+            await self.dispatcher.silent_call_request(bot=bot, result=result)
+
+    async def close(self) -> None:
+        """Finish updates already acknowledged to Telegram, then close the bot session."""
+        if self.in_flight:
+            await asyncio.gather(*self.in_flight, return_exceptions=True)
+        await super().close()
+
 
 class TelegramBot:
-    """Telegram bot for managing tasks with an external API."""
+    """Telegram bot for managing tasks through the task API or directly through the ORM."""
 
-    def __init__(self, token: str, api_url: str) -> None:
-        """Initialize the bot with token and API URL."""
-        self.bot = Bot(token=token)
-        self.dp = Dispatcher(storage=MemoryStorage())
-        self.api_url = api_url.rstrip('/')
+    def __init__(self, token: str, api_url: Optional[str] = None, request_timeout: int = 10,
+                 max_connections: int = 100, redis_url: Optional[str] = None,
+                 cache_ttl: int = 3600, backend: Optional[TaskBackend] = None,
+                 storage: Optional[BaseStorage] = None, page_size: int = 10,
+                 outbox: Optional[Outbox] = None) -> None:
+        """Initialize the bot with token and task backend.
 
+        Args:
+            token: Telegram bot token
+            api_url: Base URL of the task API, used when no backend is given
+            request_timeout: Total timeout of one API request, seconds
+            max_connections: Size of the keep-alive connection pool to the API
+            redis_url: Redis for the rendered task list cache; no caching if not set
+            cache_ttl: Lifetime of a cached task list, seconds
+            backend: Where tasks are read and changed; HTTP to ``api_url`` by default
+            storage: FSM storage; in-process memory by default, which is not shared between
+                processes, so several replicas or workers need a shared one (RedisStorage)
+            page_size: Tasks on one page of /mytasks
+            outbox: Pacing of outbound calls; Telegram's default limits if not given
+        """
+        if backend is None:
+            if api_url is None:
+                raise ValueError("Either api_url or backend is required")
+            backend = HttpTaskBackend(api_url, request_timeout=request_timeout, max_connections=max_connections)
+        self.bot = Bot(token=token)
+        self.dp = Dispatcher(storage=storage or MemoryStorage())
+        self.backend = backend
+        self.redis_url = redis_url
+        self.cache_ttl = cache_ttl
+        self.page_size = page_size
+        self.outbox = outbox or Outbox()
+        self.redis: Optional[aioredis.Redis] = None
+
+        self.dp.startup.register(self._on_startup)
+        self.dp.shutdown.register(self._on_shutdown)
         self._register_handlers()
 
+    async def _on_startup(self, bot: Bot) -> None:
+        """Start the task backend, the outbox and the cache connection when the dispatcher starts."""
+        # Attached to the bot the dispatcher runs with, which may differ from the one built in __init__
+        if self.outbox not in bot.session.middleware:
+            bot.session.middleware(self.outbox)
+        await self.outbox.start()
+        await self.backend.start()
+        if self.redis_url:
+            self.redis = aioredis.Redis.from_url(self.redis_url)
+
+    async def _on_shutdown(self) -> None:
+        """Send what is left in the outbox, close the task backend and the cache connection."""
+        await self.outbox.close()
+        await self.backend.close()
+        if self.redis is not None:
+            await self.redis.aclose()
+            self.redis = None
+
     def _register_handlers(self) -> None:
         """Register all message and callback handlers."""
         self.dp.message.register(self._handle_start, Command('start'))
         self.dp.message.register(self._handle_mytasks, Command('mytasks'))
         self.dp.message.register(self._handle_done, Command('done'))
+        self.dp.callback_query.register(self._handle_tasks_page, TasksPage.filter())
         self.dp.callback_query.register(
             self._handle_callbacks,
-            F.data.startswith("show_my_tasks")
+            F.data.in_({"show_my_tasks", "delete_message"})
         )
 
-    async def _get_user_tasks(self, user_id: int, status: Optional[str] = None) -> Optional[List[Dict]]:
-        """Fetch user tasks from API.
-
-        Args:
-            user_id: Telegram user ID
-            status: Optional task status filter
-
-        Returns:
-            List of tasks or None if error occurs
-        """
-        try:
-            params = {'telegram_user_id': user_id}
-            if status:
-                params['status'] = status
-
-            response = requests.get(
-                f"{self.api_url}/tasks/",
-                params=params,
-                timeout=10
-            )
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            logger.error(f"API request error for user {user_id}: {e}")
-            return None
-        except Exception as e:
-            logger.error(f"Unexpected error while fetching tasks: {e}")
-            return None
-
-    async def _update_task_status(self, task_id: int) -> bool:
-        """Update task status to 'done'.
-
-        Args:
-            task_id: ID of the task to update
-
-        Returns:
-            True if update was successful, False otherwise
-        """
-        try:
-            response = requests.patch(
-                f"{self.api_url}/tasks/{task_id}/",
-                json={'status': 'done'},
-                timeout=10
-            )
-            return response.ok
-        except requests.exceptions.RequestException as e:
-            logger.error(f"API request error for task {task_id}: {e}")
-            return False
-        except Exception as e:
-            logger.error(f"Unexpected error while updating task {task_id}: {e}")
-            return False
-
     async def _format_task(self, task: Dict) -> str:
         """Format task data into a readable string.
 
@@ -100,11 +161,12 @@ class TelegramBot:
         """
         try:
             task_id = task['id']
-            title = task['title']
+            # Titles and descriptions are user text: unescaped "<" or "&" would break the HTML markup
+            title = html.escape(task['title'], quote=False)
             status = "✅ Выполнена" if task.get('status') == 'done' else "🕒 В работе"
-            description = (task.get('description') or "Нет описания")[:100] + "..." if len(
+            description = html.escape((task.get('description') or "Нет описания")[:100] + "..." if len(
                 task.get('description', '')
-            ) > 100 else (task.get('description') or "Нет описания")
+            ) > 100 else (task.get('description') or "Нет описания"), quote=False)
 
             deadline_text = "Не указан"
             if task.get('deadline_local'):
@@ -152,48 +214,175 @@ class TelegramBot:
             "• Отмечать выполненные задачи\n\n"
             "<u>Доступные команды</u>:\n"
             "/mytasks - Показать все ваши задачи\n"
-            "/done &lt;ID&gt; - Отметить задачу выполненной\n\n"
+            "/done &lt;ID&gt; [ID ...] - Отметить задачи выполненными\n\n"
             "Задачи создаются через веб-интерфейс или API."
         )
         await message.answer(welcome_text, parse_mode='HTML')
 
-    async def _handle_mytasks(self, message: types.Message) -> None:
-        """Handle /mytasks command."""
-        user_id = message.from_user.id
-        tasks = await self._get_user_tasks(user_id)
+    @staticmethod
+    def _format_task_short(task: Dict) -> str:
+        """One-line form of a task for pages that do not fit a message in full."""
+        title = task.get('title') or ''
+        title = html.escape(title[:40] + "..." if len(title) > 40 else title, quote=False)
+        return f"<b>🔹 {title}</b>\n<u>ID</u>: <code>{task.get('id', 'unknown')}</code>"
 
-        if tasks is None:
-            await message.answer("⚠️ Произошла ошибка при получении задач. Попробуйте позже.")
+    def _fit_message(self, header: str, tasks: List[Dict], blocks: List[str]) -> Optional[str]:
+        """Join the page into one message, shortening the longest tasks until it fits.
+
+        The text is only ever cut between tasks, so no HTML tag is split.
+
+        Returns:
+            Message text, or None if the page does not fit even with every task shortened
+        """
+        blocks = list(blocks)
+        shorts = [self._format_task_short(task) for task in tasks]
+        while len("\n\n".join([header] + blocks)) > MESSAGE_LIMIT:
+            shrinkable = [i for i in range(len(blocks)) if len(shorts[i]) < len(blocks[i])]
+            if not shrinkable:
+                return None
+            longest = max(shrinkable, key=lambda i: len(blocks[i]))
+            blocks[longest] = shorts[longest]
+        return "\n\n".join([header] + blocks)
+
+    def _short_tasks_fitting(self, header: str, tasks: List[Dict]) -> int:
+        """How many of ``tasks``, from the first, fit one message in the short form (at least one)."""
+        length = len(header)
+        for count, task in enumerate(tasks):
+            length += 2 + len(self._format_task_short(task))
+            if length > MESSAGE_LIMIT:
+                return max(1, count)
+        return len(tasks)
+
+    async def _get_cached_page(self, user_id: int, cursor: str) -> Tuple[int, Optional[Dict]]:
+        """Read a cached /mytasks page and the current version of the user's tasks.
+
+        Returns:
+            Current version and the cached page, or None if it is missing or stale
+        """
+        if self.redis is None:
+            return 0, None
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                version, cached = await (
+                    pipe.get(USER_VERSION_KEY.format(user_id=user_id))
+                    .hget(TASKS_VIEW_KEY.format(user_id=user_id), cursor)
+                    .execute()
+                )
+        except aioredis.RedisError as e:
+            logger.warning(f"Task cache unavailable for user {user_id}: {e}")
+            return 0, None
+
+        version = int(version or 0)
+        if cached:
+            view = json.loads(cached)
+            if view['version'] == version:
+                return version, view['page']
+        return version, None
+
+    async def _store_cached_page(self, user_id: int, cursor: str, version: int, page: Dict) -> None:
+        """Cache a rendered /mytasks page for the version it was rendered from."""
+        if self.redis is None:
             return
+        key = TASKS_VIEW_KEY.format(user_id=user_id)
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                await (
+                    pipe.hset(key, cursor, json.dumps({'version': version, 'page': page}))
+                    .expire(key, self.cache_ttl)
+                    .execute()
+                )
+        except aioredis.RedisError as e:
+            logger.warning(f"Failed to cache tasks of user {user_id}: {e}")
+
+    async def _render_tasks_page(self, user_id: int, cursor: str = '') -> Optional[Dict]:
+        """Render one page of the user's task list, using the cache when it is fresh.
+
+        Args:
+            user_id: Telegram user ID
+            cursor: Cursor token of the page; the first page if empty
+
+        Returns:
+            Dict with the message 'text' and the 'next' and 'previous' cursor tokens,
+            or None if the tasks could not be fetched
+        """
+        version, page = await self._get_cached_page(user_id, cursor)
+        if page is not None:
+            return page
+
+        header = hbold('📋 Ваши задачи:')
+        page_size = self.page_size
+        while True:
+            data = await self.backend.get_user_tasks_page(user_id, cursor or None, page_size)
+            if data is None:
+                return None
+
+            tasks = data['results']
+            if not tasks:
+                # A page can empty out when its tasks are deleted while the list is open
+                text = "📭 У вас пока нет задач!" if not cursor else "📭 Здесь больше нет задач. /mytasks"
+                break
+            text = self._fit_message(header, tasks, [await self._format_task(task) for task in tasks])
+            if text is not None:
+                break
+            # Too many tasks even in the short form: fetch as many as fit from the same position,
+            # so the backend's cursors point right after (or before) what is shown
+            page_size = min(self._short_tasks_fitting(header, tasks), len(tasks) - 1)
+        page = {'text': text, 'next': data['next'], 'previous': data['previous']}
+
+        # The version was read before the fetch, so a concurrent change makes this entry stale at once
+        await self._store_cached_page(user_id, cursor, version, page)
+        return page
+
+    @staticmethod
+    def _page_markup(page: Dict) -> Optional[types.InlineKeyboardMarkup]:
+        """◀ / ▶ buttons for the pages around ``page``."""
+        builder = InlineKeyboardBuilder()
+        for text, cursor in (("◀", page['previous']), ("▶", page['next'])):
+            if not cursor:
+                continue
+            # Cursor tokens are fixed-size (23 characters), well within the 64 bytes of callback data
+            builder.button(text=text, callback_data=TasksPage(cursor=cursor).pack())
+        return builder.as_markup() if builder.export() else None
 
-        if not tasks:
-            await message.answer("📭 У вас пока нет задач!")
+    async def _handle_mytasks(self, message: types.Message) -> None:
+        """Handle /mytasks command: the first page of the list."""
+        page = await self._render_tasks_page(message.from_user.id)
+        if page is None:
+            await message.answer("⚠️ Произошла ошибка при получении задач. Попробуйте позже.")
             return
+        await message.answer(page['text'], reply_markup=self._page_markup(page), parse_mode='HTML')
 
-        response_parts = [f"{hbold('📋 Ваши задачи:')}\n"]
-        response_parts.extend([await self._format_task(task) for task in tasks])
-        full_response = "\n\n".join(response_parts)
-
-        # Split long messages
-        max_length = 4000
-        if len(full_response) > max_length:
-            for i in range(0, len(full_response), max_length):
-                await message.answer(
-                    full_response[i:i + max_length],
-                    parse_mode='HTML'
-                )
-        else:
-            await message.answer(full_response, parse_mode='HTML')
+    async def _show_page_in_place(self, callback: types.CallbackQuery, cursor: str) -> None:
+        """Replace the text of the pressed message with a page of the user's tasks."""
+        # callback.message is the bot's own message, the user is the one who pressed the button
+        page = await self._render_tasks_page(callback.from_user.id, cursor)
+        if page is None:
+            await callback.answer("⚠️ Ошибка, попробуйте позже", show_alert=True)
+            return
+        await callback.answer()
+        try:
+            # The press is already answered above; redrawing the page yields to replies in other chats
+            with bulk():
+                await callback.message.edit_text(page['text'], reply_markup=self._page_markup(page), parse_mode='HTML')
+        except TelegramBadRequest as e:
+            # Repeated press on an unchanged page
+            if 'message is not modified' not in str(e):
+                raise
+
+    async def _handle_tasks_page(self, callback: types.CallbackQuery, callback_data: TasksPage) -> None:
+        """Handle ◀ / ▶ of the /mytasks list."""
+        try:
+            await self._show_page_in_place(callback, callback_data.cursor)
+        except Exception as e:
+            logger.error(f"Callback error: {str(e)}")
 
     async def _handle_callbacks(self, callback: types.CallbackQuery) -> None:
-        """Handle all callback queries."""
+        """Handle buttons of the /done confirmation."""
         try:
-            await callback.answer()  # Acknowledge the callback
-
             if callback.data == "show_my_tasks":
-                await self._handle_mytasks(callback.message)
-                await callback.message.delete()
+                await self._show_page_in_place(callback, '')
             elif callback.data == "delete_message":
+                await callback.answer()
                 await callback.message.delete()
 
         except Exception as e:
@@ -205,7 +394,8 @@ class TelegramBot:
         await message.answer(
             "✏️ <b>Как отметить задачу выполненной?</b>\n\n"
             "Используйте: <code>/done ID_задачи</code>\n\n"
-            "Пример: <code>/done 42</code>\n\n"
+            "Пример: <code>/done 42</code>\n"
+            "Несколько задач сразу: <code>/done 4 8 15</code>\n\n"
             "Чтобы посмотреть ID задач, используйте /mytasks",
             parse_mode="HTML"
         )
@@ -218,33 +408,35 @@ class TelegramBot:
             parse_mode="HTML"
         )
 
+    @staticmethod
+    def _format_ids(task_ids: List[int]) -> str:
+        return ", ".join(f"<code>{task_id}</code>" for task_id in task_ids)
+
     async def _handle_done(self, message: types.Message, command: CommandObject) -> None:
-        """Handle /done command."""
+        """Handle /done command with one or more task IDs."""
         if not command.args:
             return await self._show_done_usage(message)
 
         try:
-            task_id = int(command.args.strip())
+            task_ids = list(dict.fromkeys(int(arg) for arg in command.args.replace(',', ' ').split()))
         except ValueError:
             return await self._show_invalid_id(message)
 
         loading_msg = await message.answer("⏳ Обновляем статус задачи...")
 
         try:
-            success = await self._update_task_status(task_id)
+            result = await self.backend.update_tasks_status(task_ids)
         except Exception as e:
-            logger.error(f"Error updating task {task_id}: {str(e)}")
-            await loading_msg.delete()
-            await message.answer(
+            logger.error(f"Error updating tasks {task_ids}: {str(e)}")
+            await loading_msg.edit_text(
                 "⚠️ <b>Ошибка сервера</b>\nПопробуйте позже",
                 parse_mode="HTML"
             )
             return
 
-        await loading_msg.delete()
-
-        if not success:
-            await message.answer(
+        # The placeholder turns into the answer: one outbound call instead of delete + send
+        if result is None or not result['changed']:
+            await loading_msg.edit_text(
                 "❌ <b>Не удалось обновить задачу</b>\n\n"
                 "Проверьте ID командой /mytasks",
                 parse_mode="HTML"
@@ -263,8 +455,17 @@ class TelegramBot:
             )
         )
 
-        await message.answer(
-            f"✅ <b>Задача ID {task_id} выполнена!</b>",
+        if len(task_ids) == 1:
+            text = f"✅ <b>Задача ID {task_ids[0]} выполнена!</b>"
+        else:
+            text = f"✅ <b>Выполнены задачи</b>: {self._format_ids(result['changed'])}"
+            if result['unchanged']:
+                text += f"\n☑️ Уже были выполнены: {self._format_ids(result['unchanged'])}"
+            if result['missing']:
+                text += f"\n❓ Не найдены: {self._format_ids(result['missing'])}"
+
+        await loading_msg.edit_text(
+            text,
             reply_markup=builder.as_markup(),
             parse_mode="HTML"
         )
@@ -282,4 +483,65 @@ class TelegramBot:
         """Run the bot."""
         await self.setup_commands()
         logger.info("Starting bot...")
-        await self.dp.start_polling(self.bot, skip_updates=True)
\ No newline at end of file
+        await self.dp.start_polling(self.bot, skip_updates=True)
+
+    def make_webhook_app(self, path: str, secret_token: Optional[str] = None,
+                         max_concurrency: int = 100) -> web.Application:
+        """Build the aiohttp application that receives updates on ``path``.
+
+        Args:
+            path: URL path Telegram posts updates to
+            secret_token: Expected X-Telegram-Bot-Api-Secret-Token header; not checked if not set
+            max_concurrency: Updates handled at the same time by this replica
+
+        Returns:
+            Application with the webhook route and a ``/healthz`` route for the load balancer
+        """
+        app = web.Application()
+        # Registered before the dispatcher hooks: in-flight updates finish before the API session closes
+        BoundedRequestHandler(
+            self.dp, self.bot, max_concurrency=max_concurrency, secret_token=secret_token
+        ).register(app, path=path)
+        app.router.add_get('/healthz', lambda request: web.Response(text='ok'))
+        setup_application(app, self.dp, bot=self.bot)
+        return app
+
+    async def run_webhook(self, host: str, port: int, path: str, webhook_url: Optional[str] = None,
+                          secret_token: Optional[str] = None, max_concurrency: int = 100,
+                          max_connections: int = 40) -> None:
+        """Serve updates from a webhook instead of long polling.
+
+        The bot keeps no state between updates, so any number of replicas can run behind a load balancer.
+
+        Args:
+            host: Interface to listen on
+            port: Port to listen on
+            path: URL path of the webhook
+            webhook_url: Public URL registered with setWebhook; registration is skipped if not set
+            secret_token: Secret Telegram sends with every update
+            max_concurrency: Updates handled at the same time by this replica
+            max_connections: Concurrent connections Telegram may open to the webhook
+        """
+        app = self.make_webhook_app(path, secret_token, max_concurrency)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+
+        # The same URL and options from every replica, so registering on each start is idempotent
+        if webhook_url:
+            await self.setup_commands()
+            await self.bot.set_webhook(webhook_url, secret_token=secret_token, max_connections=max_connections,
+                                       allowed_updates=self.dp.resolve_used_update_types())
+        logger.info(f"Serving webhook on {host}:{port}{path}")
+
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stop.set)
+            except NotImplementedError:  # Windows: Ctrl+C still interrupts asyncio.run
+                pass
+        try:
+            await stop.wait()
+        finally:
+            await runner.cleanup()
\ No newline at end of file
@@ -0,0 +1,334 @@
+"""Outbound Bot API calls of the bot: paced by global and per-chat limits, by priority.
+
+``Outbox`` is a request middleware of the bot session, so handlers keep awaiting
+``message.answer(...)`` as usual: every call addressed to a chat waits in the queue
+until both limits allow it. Calls without a chat (getUpdates, answerCallbackQuery,
+setMyCommands) go straight through.
+
+Telegram's global limit is per bot, not per process. With a ``shared_limit`` every call
+also takes a token from the bucket that the Celery reminder sender uses, so bot
+workers, webhook replicas and reminders stay under one limit together.
+"""
+import asyncio
+import contextlib
+import contextvars
+import heapq
+import itertools
+import logging
+from collections import deque
+from typing import Any, Deque, Dict, Iterator, List, Optional, Protocol, Tuple
+
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramNetworkError, TelegramRetryAfter, TelegramServerError
+from aiogram.methods import EditMessageText, TelegramMethod
+
+logger = logging.getLogger(__name__)
+
+# Replies to what the user just did go before bulk output
+INTERACTIVE = 0
+BULK = 1
+
+_priority: contextvars.ContextVar = contextvars.ContextVar('outbox_priority', default=INTERACTIVE)
+
+
+@contextlib.contextmanager
+def bulk() -> Iterator[None]:
+    """Calls made inside the block yield to interactive replies."""
+    token = _priority.set(BULK)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class SharedLimit(Protocol):
+    """Global limit shared with other processes (see ``tasks.services.rate_limit``)."""
+
+    async def try_acquire(self) -> float:
+        """Take a token; return 0 or the seconds to wait before trying again."""
+
+    async def pause(self, seconds: float) -> None:
+        """Hold every sender after a 429."""
+
+
+class TokenBucket:
+    """``rate`` calls per second on average with bursts of up to ``capacity``."""
+
+    def __init__(self, rate: float, capacity: float, now: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        """Seconds until a call is allowed; 0 if it is allowed now."""
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self, now: float) -> None:
+        self._refill(now)
+        self.tokens -= 1
+
+    def is_full(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+
+class _Call:
+    __slots__ = ('make_request', 'bot', 'method', 'future', 'priority', 'seq', 'attempts')
+
+    def __init__(self, make_request: NextRequestMiddlewareType, bot: Any, method: TelegramMethod,
+                 priority: int, seq: int) -> None:
+        self.make_request = make_request
+        self.bot = bot
+        self.method = method
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.priority = priority
+        self.seq = seq
+        self.attempts = 0
+
+
+class _Chat:
+    __slots__ = ('calls', 'bucket', 'busy', 'scheduled', 'ready_key', 'not_before')
+
+    def __init__(self, bucket: TokenBucket) -> None:
+        # One FIFO per priority: order within a chat is kept for calls of the same priority
+        self.calls: Tuple[Deque[_Call], Deque[_Call]] = (deque(), deque())
+        self.bucket = bucket
+        self.busy = False  # a call to this chat is in flight
+        self.scheduled = False  # the chat is in the ready or the waiting heap
+        self.ready_key: Optional[Tuple[int, int]] = None  # (priority, seq) of its live entry in the ready heap
+        self.not_before = 0.0  # backoff after a network error
+
+    def head(self) -> Optional[_Call]:
+        for calls in self.calls:
+            if calls:
+                return calls[0]
+        return None
+
+
+class Outbox(BaseRequestMiddleware):
+    """Queue of outbound calls shared by all handlers of one bot process.
+
+    - at most ``global_rate`` calls per second in total and ``per_chat_rate`` per chat
+      (with a burst of ``per_chat_burst``), one call per chat in flight at a time;
+    - with ``shared_limit`` each call also waits for a token of the bot-wide bucket;
+    - interactive calls go before bulk ones (see ``bulk()``), calls of one priority
+      in the order they were queued;
+    - 429 ``retry_after`` pauses every send for that long and the call is retried,
+      network and 5xx errors are retried with backoff up to ``max_attempts`` times;
+    - an editMessageText that has not been sent yet is replaced by a newer edit of the
+      same message, and both callers get the result of the newer one.
+    """
+
+    # Chats idle for this long with a full bucket are forgotten
+    SWEEP_INTERVAL = 60
+
+    def __init__(self, global_rate: float = 30, per_chat_rate: float = 1, per_chat_burst: float = 3,
+                 max_attempts: int = 3, shared_limit: Optional[SharedLimit] = None) -> None:
+        self.global_rate = global_rate
+        self.per_chat_rate = per_chat_rate
+        self.per_chat_burst = per_chat_burst
+        self.max_attempts = max_attempts
+        self.shared_limit = shared_limit
+        self.chats: Dict[Any, _Chat] = {}
+        self.pending_edits: Dict[Tuple[Any, int], _Call] = {}
+        self.stats = {'sent': 0, 'failed': 0, 'retried': 0, 'collapsed': 0, 'rate_limited': 0}
+        self._ready: List[Tuple[int, int, Any]] = []  # (priority, seq, chat) of chats allowed to send now
+        self._waiting: List[Tuple[float, int, Any]] = []  # (time, seq, chat) of chats over their limit
+        self._seq = itertools.count()
+        self._queued = 0  # accepted and not finished yet, including calls in flight
+        self._paused_until = 0.0
+        self._global: Optional[TokenBucket] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._idle: Optional[asyncio.Event] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        loop = asyncio.get_running_loop()
+        self._global = TokenBucket(self.global_rate, self.global_rate, loop.time())
+        self._wakeup = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._worker = asyncio.create_task(self._run())
+
+    async def close(self, timeout: float = 30) -> None:
+        """Send what is queued (up to ``timeout`` seconds), then stop; later calls go straight through."""
+        if self._worker is None:
+            return
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Outbox closed with {self._queued} calls unsent")
+        self._worker.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._worker
+        self._worker = None
+        for chat in self.chats.values():
+            for calls in chat.calls:
+                for call in calls:
+                    if not call.future.done():
+                        call.future.set_exception(RuntimeError("Outbox closed"))
+        self.chats.clear()
+        self.pending_edits.clear()
+
+    async def __call__(self, make_request: NextRequestMiddlewareType, bot: Any, method: TelegramMethod) -> Any:
+        chat_id = getattr(method, 'chat_id', None)
+        if chat_id is None or self._worker is None:
+            return await make_request(bot, method)
+
+        if isinstance(method, EditMessageText):
+            queued = self.pending_edits.get((chat_id, method.message_id))
+            if queued is not None:
+                # The queued edit is superseded before it was sent: send only the newest text
+                queued.method = method
+                self.stats['collapsed'] += 1
+                return await asyncio.shield(queued.future)
+
+        call = _Call(make_request, bot, method, _priority.get(), next(self._seq))
+        if isinstance(method, EditMessageText):
+            self.pending_edits[(chat_id, method.message_id)] = call
+        chat = self.chats.get(chat_id)
+        if chat is None:
+            chat = self.chats[chat_id] = _Chat(
+                TokenBucket(self.per_chat_rate, self.per_chat_burst, asyncio.get_running_loop().time()))
+        chat.calls[min(call.priority, BULK)].append(call)
+        self._queued += 1
+        self._idle.clear()
+        self._schedule(chat_id, chat)
+        self._wakeup.set()
+        return await asyncio.shield(call.future)
+
+    def _schedule(self, chat_id: Any, chat: _Chat) -> None:
+        """Put a chat with queued calls into the ready or the waiting heap."""
+        head = chat.head()
+        if chat.busy or head is None:
+            return
+        if chat.scheduled:
+            if chat.ready_key is not None and (head.priority, head.seq) < chat.ready_key:
+                # An interactive call overtook the chat's bulk ones: move the chat up, the old entry goes stale
+                self._push_ready(chat_id, chat, head)
+            return
+        now = asyncio.get_running_loop().time()
+        ready_at = max(now + chat.bucket.wait_time(now), chat.not_before)
+        chat.scheduled = True
+        if ready_at <= now:
+            self._push_ready(chat_id, chat, head)
+        else:
+            heapq.heappush(self._waiting, (ready_at, head.seq, chat_id))
+
+    def _push_ready(self, chat_id: Any, chat: _Chat, head: _Call) -> None:
+        chat.ready_key = (head.priority, head.seq)
+        heapq.heappush(self._ready, (head.priority, head.seq, chat_id))
+
+    def _drop_stale(self) -> None:
+        """Pop ready entries superseded by a newer entry of the same chat."""
+        while self._ready:
+            priority, seq, chat_id = self._ready[0]
+            chat = self.chats.get(chat_id)
+            if chat is not None and chat.ready_key == (priority, seq):
+                return
+            heapq.heappop(self._ready)
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        next_sweep = loop.time() + self.SWEEP_INTERVAL
+        while True:
+            now = loop.time()
+            while self._waiting and self._waiting[0][0] <= now:
+                _, _, chat_id = heapq.heappop(self._waiting)
+                chat = self.chats[chat_id]
+                chat.scheduled = False
+                self._schedule(chat_id, chat)
+
+            self._drop_stale()
+            wait = max(self._paused_until - now, self._global.wait_time(now))
+            if self._ready and wait <= 0 and self.shared_limit is not None:
+                # Taken last, so no bot-wide token is spent while this process would wait anyway
+                wait = await self.shared_limit.try_acquire()
+                now = loop.time()
+            if self._ready and wait <= 0:
+                _, _, chat_id = heapq.heappop(self._ready)
+                self._send(chat_id, self.chats[chat_id], now)
+                continue
+
+            if now >= next_sweep:
+                self._sweep(now)
+                next_sweep = now + self.SWEEP_INTERVAL
+
+            timeout = None
+            if self._ready:
+                timeout = wait
+            elif self._waiting:
+                timeout = self._waiting[0][0] - now
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def _send(self, chat_id: Any, chat: _Chat, now: float) -> None:
+        chat.scheduled = False
+        chat.ready_key = None
+        call = next(calls for calls in chat.calls if calls).popleft()
+        if isinstance(call.method, EditMessageText):
+            self.pending_edits.pop((chat_id, call.method.message_id), None)
+        chat.busy = True
+        chat.bucket.take(now)
+        self._global.take(now)
+        asyncio.create_task(self._execute(chat_id, chat, call))
+
+    async def _execute(self, chat_id: Any, chat: _Chat, call: _Call) -> None:
+        loop = asyncio.get_running_loop()
+        retry = False
+        try:
+            result = await call.make_request(call.bot, call.method)
+        except TelegramRetryAfter as e:
+            # Flood control applies to the whole bot: hold every send, as the Celery sender does
+            self._paused_until = max(self._paused_until, loop.time() + e.retry_after)
+            logger.warning(f"Telegram flood control, pausing outbound calls for {e.retry_after} s")
+            self.stats['rate_limited'] += 1
+            if self.shared_limit is not None:
+                await self.shared_limit.pause(e.retry_after)
+            retry = True
+        except (TelegramNetworkError, TelegramServerError) as e:
+            call.attempts += 1
+            if call.attempts < self.max_attempts:
+                chat.not_before = loop.time() + min(2 ** call.attempts, 30)
+                logger.warning(f"Outbound call to chat {chat_id} failed, retrying: {e}")
+                retry = True
+            else:
+                self._fail(call, e)
+        except Exception as e:
+            self._fail(call, e)
+        else:
+            self.stats['sent'] += 1
+            self._queued -= 1
+            call.future.set_result(result)
+
+        if retry:
+            self.stats['retried'] += 1
+            chat.calls[min(call.priority, BULK)].appendleft(call)
+            if isinstance(call.method, EditMessageText):
+                self.pending_edits.setdefault((chat_id, call.method.message_id), call)
+        chat.busy = False
+        self._schedule(chat_id, chat)
+        if not self._queued:
+            self._idle.set()
+        self._wakeup.set()
+
+    def _fail(self, call: _Call, error: Exception) -> None:
+        self.stats['failed'] += 1
+        self._queued -= 1
+        call.future.set_exception(error)
+
+    def _sweep(self, now: float) -> None:
+        """Forget chats with nothing queued whose bucket has refilled: they have no state left."""
+        idle = [chat_id for chat_id, chat in self.chats.items()
+                if not chat.busy and not chat.scheduled and chat.head() is None and chat.bucket.is_full(now)]
+        for chat_id in idle:
+            del self.chats[chat_id]
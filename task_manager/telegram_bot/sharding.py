@@ -0,0 +1,178 @@
+"""Run the bot in several processes: one poller and N workers sharded by chat id.
+
+The poller fetches updates with getUpdates and hands each one to worker ``chat_id % N``,
+so all updates of a chat are handled by one process, in the order Telegram sent them.
+Inside a worker, updates of different chats are handled concurrently.
+"""
+import asyncio
+import logging
+import multiprocessing
+import queue
+import threading
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from aiogram.dispatcher.middlewares.user_context import UserContextMiddleware
+from aiogram.types import Update
+
+logger = logging.getLogger(__name__)
+
+# Updates buffered per worker before the poller waits for it
+QUEUE_SIZE = 1000
+
+
+def shard_key(update: Update) -> int:
+    """Chat of the update (or its user for chat-less updates such as inline queries)."""
+    context = UserContextMiddleware.resolve_event_context(update)
+    return context.chat_id or context.user_id or 0
+
+
+class ChatOrderedFeeder:
+    """Feeds updates to the dispatcher: concurrently across chats, strictly in order within a chat.
+
+    At most ``max_concurrency`` updates are handled at a time and at most ``max_pending`` are
+    accepted but unfinished; ``feed`` waits when that backlog is full.
+    """
+
+    def __init__(self, telegram_bot: Any, max_concurrency: int, max_pending: Optional[int] = None) -> None:
+        self.telegram_bot = telegram_bot
+        self.running = asyncio.Semaphore(max_concurrency)
+        self.pending = asyncio.Semaphore(max_pending or 4 * max_concurrency)
+        self.last_by_chat: Dict[int, asyncio.Task] = {}
+        self.tasks: Set[asyncio.Task] = set()
+
+    async def feed(self, update: Update) -> None:
+        await self.pending.acquire()
+        key = shard_key(update)
+        task = asyncio.create_task(self._handle(update, self.last_by_chat.get(key)))
+        self.last_by_chat[key] = task
+        self.tasks.add(task)
+        task.add_done_callback(lambda done: self._finished(key, done))
+
+    async def _handle(self, update: Update, previous: Optional[asyncio.Task]) -> None:
+        if previous is not None:
+            # The previous update of this chat goes first; its failure does not stop the chain
+            await asyncio.gather(previous, return_exceptions=True)
+        async with self.running:
+            try:
+                await self.telegram_bot.dp.feed_update(self.telegram_bot.bot, update)
+            except Exception as e:
+                logger.error(f"Error handling update {update.update_id}: {e}")
+
+    def _finished(self, key: int, task: asyncio.Task) -> None:
+        self.tasks.discard(task)
+        if self.last_by_chat.get(key) is task:
+            del self.last_by_chat[key]
+        self.pending.release()
+
+    async def join(self) -> None:
+        """Wait for every update fed so far."""
+        while self.tasks:
+            await asyncio.gather(*self.tasks, return_exceptions=True)
+
+
+async def _serve_worker(updates: multiprocessing.Queue, telegram_bot: Any, max_concurrency: int) -> int:
+    loop = asyncio.get_running_loop()
+    inbox: asyncio.Queue = asyncio.Queue(maxsize=max_concurrency)
+
+    def read() -> None:
+        # multiprocessing.Queue only blocks, so it is drained by a thread into the event loop
+        while True:
+            item = updates.get()
+            asyncio.run_coroutine_threadsafe(inbox.put(item), loop).result()
+            if item is None:
+                return
+
+    threading.Thread(target=read, daemon=True).start()
+    feeder = ChatOrderedFeeder(telegram_bot, max_concurrency)
+    handled = 0
+    await telegram_bot.dp.emit_startup(bot=telegram_bot.bot)
+    try:
+        while (raw := await inbox.get()) is not None:
+            await feeder.feed(Update.model_validate(raw, context={'bot': telegram_bot.bot}))
+            handled += 1
+        await feeder.join()
+    finally:
+        await telegram_bot.dp.emit_shutdown(bot=telegram_bot.bot)
+        await telegram_bot.bot.session.close()
+    return handled
+
+
+def worker_main(index: int, updates: multiprocessing.Queue, make_bot: Callable[[], Any],
+                max_concurrency: int, results: Optional[multiprocessing.Queue] = None) -> None:
+    """Entry point of a worker process: handle updates from ``updates`` until ``None`` arrives."""
+    handled = asyncio.run(_serve_worker(updates, make_bot(), max_concurrency))
+    logger.info(f"Bot worker {index} stopped after {handled} updates")
+    if results is not None:
+        results.put((index, handled))
+
+
+class ShardedRunner:
+    """Worker processes with one inbound queue each; ``dispatch`` routes an update by its chat."""
+
+    def __init__(self, make_bot: Callable[[], Any], workers: int, max_concurrency: int = 100,
+                 results: Optional[multiprocessing.Queue] = None, context=None) -> None:
+        """
+        Args:
+            make_bot: Picklable factory of the TelegramBot each worker runs
+            workers: Number of worker processes
+            max_concurrency: Updates handled at the same time by one worker
+            results: Receives ``(worker index, handled updates)`` when a worker stops
+            context: multiprocessing context; spawn by default (also works on Windows)
+        """
+        context = context or multiprocessing.get_context('spawn')
+        self.queues: List[multiprocessing.Queue] = [context.Queue(QUEUE_SIZE) for _ in range(workers)]
+        self.processes = [
+            context.Process(target=worker_main, args=(index, updates, make_bot, max_concurrency, results),
+                            name=f'bot-worker-{index}', daemon=True)
+            for index, updates in enumerate(self.queues)
+        ]
+
+    def start(self) -> None:
+        for process in self.processes:
+            process.start()
+
+    async def dispatch(self, update: Update) -> None:
+        updates = self.queues[shard_key(update) % len(self.queues)]
+        raw = update.model_dump(mode='json', exclude_unset=True)
+        try:
+            updates.put_nowait(raw)
+        except queue.Full:
+            # The worker is behind: wait for it instead of buffering without bound
+            await asyncio.to_thread(updates.put, raw)
+
+    def stop(self, timeout: float = 30) -> None:
+        """Let workers finish the updates they already have, then wait for them to exit."""
+        for updates in self.queues:
+            updates.put(None)
+        for process in self.processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+
+
+async def run_sharded(telegram_bot: Any, make_bot: Callable[[], Any], workers: int,
+                      max_concurrency: int = 100, poll_timeout: int = 30) -> None:
+    """Long-poll updates with ``telegram_bot`` and handle them in ``workers`` processes built by ``make_bot``."""
+    runner = ShardedRunner(make_bot, workers, max_concurrency)
+    runner.start()
+    bot = telegram_bot.bot
+    try:
+        await telegram_bot.setup_commands()
+        await bot.delete_webhook(drop_pending_updates=True)
+        allowed_updates = telegram_bot.dp.resolve_used_update_types()
+        offset = None
+        logger.info(f"Starting bot with {workers} worker processes...")
+        while True:
+            try:
+                updates = await bot.get_updates(offset=offset, timeout=poll_timeout, allowed_updates=allowed_updates)
+            except Exception as e:
+                logger.error(f"Failed to fetch updates: {e}")
+                await asyncio.sleep(1)
+                continue
+            for update in updates:
+                await runner.dispatch(update)
+                offset = update.update_id + 1
+    finally:
+        await bot.session.close()
+        await telegram_bot.dp.storage.close()
+        await asyncio.to_thread(runner.stop)